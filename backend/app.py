@@ -1,48 +1,129 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from sqlalchemy.orm import configure_mappers
 from datetime import timedelta, datetime
 import os
+import importlib
 import logging
-from logging.handlers import RotatingFileHandler
 from extensions import db
-from routes.patients import patients_bp
-from routes.doctors import doctors_bp
-from routes.appointments import appointments_bp
-from routes.inventory import inventory_bp
-from routes.billing import billing_bp
-from routes.prescriptions import prescriptions_bp
-from routes.lab_tests import lab_tests_bp
-from logger import setup_logger
-from routes.role_dashboards import doctor_dashboard_bp, patient_dashboard_bp, manager_dashboard_bp
-from routes.admin_dashboard import admin_dashboard_bp
+from logger import setup_logger, REQUEST_LOGGER
+from utils.db_metrics import init_db_metrics
+from utils.db_engine import engine_options, init_db_engine
+from utils.db_routing import init_db_replicas
+from utils.schema import init_schema, migrate_database, seed_sample_data
+from utils.money import MoneyJSONEncoder
+
+# Blueprints per feature: (module, blueprint names, url_prefix). Only the
+# features listed in APP_FEATURES are imported and registered.
+FEATURE_BLUEPRINTS = {
+    'patients': ('routes.patients', ('patients_bp',), '/api'),
+    'doctors': ('routes.doctors', ('doctors_bp',), '/api'),
+    'appointments': ('routes.appointments', ('appointments_bp',), '/api'),
+    'inventory': ('routes.inventory', ('inventory_bp',), '/api'),
+    'billing': ('routes.billing', ('billing_bp',), '/api'),
+    'prescriptions': ('routes.prescriptions', ('prescriptions_bp',), '/api'),
+    'lab_tests': ('routes.lab_tests', ('lab_tests_bp',), '/api'),
+    'export': ('routes.export', ('export_bp',), '/api'),
+    'bulk': ('routes.bulk', ('bulk_bp',), '/api'),
+    'dashboard': ('routes.dashboard', ('dashboard_bp',), '/api/dashboard'),
+    # Role dashboards (these pull in flask_jwt_extended)
+    'role_dashboards': ('routes.role_dashboards',
+                        ('doctor_dashboard_bp', 'patient_dashboard_bp', 'manager_dashboard_bp'), None),
+    # Admin stats and the /api/admin endpoints (these need an admin JWT)
+    'admin': ('routes.admin_dashboard', ('admin_dashboard_bp',), None),
+    'auth': ('routes.auth', ('auth_bp',), '/api/auth'),
+}
+
+# Features whose routes issue or check JWTs; flask_jwt_extended is set up only when one is enabled
+JWT_FEATURES = ('role_dashboards', 'admin', 'auth')
+
+# Per-feature setup, run in this order: (module, init function, features that need it,
+# None for every app). Hooks that keep derived data in step with writes are listed
+# under every feature that writes the rows they watch, not just the one that reads them.
+FEATURE_INITS = (
+    ('utils.availability', 'init_availability', ('doctors', 'appointments')),
+    ('utils.billing_engine', 'init_billing_engine', ('billing',)),
+    # After the billing hook: the dashboard and rollup flush deltas count the totals it derives
+    ('utils.dashboard_aggregates', 'init_dashboard_aggregates',
+     ('patients', 'appointments', 'inventory', 'billing', 'bulk', 'dashboard', 'admin')),
+    ('utils.analytics_rollup', 'init_analytics_rollup', ('appointments', 'billing', 'lab_tests', 'dashboard')),
+    ('utils.patient_search', 'init_patient_search', ('patients', 'bulk')),
+    ('utils.entity_cache', 'init_entity_cache',
+     ('patients', 'doctors', 'appointments', 'inventory', 'billing', 'prescriptions', 'lab_tests')),
+    ('utils.conditional', 'init_conditional', None),
+    ('utils.bulk_import', 'init_bulk_import', ('bulk',)),
+    # Quotas first, so a rejected request never holds an admission slot
+    ('utils.rate_limit', 'init_rate_limits', None),
+    ('utils.admission', 'init_admission', None),
+    ('utils.passwords', 'init_password_hashing', ('auth', 'admin')),
+)
+
+
+def enabled_features(value):
+    """Parse APP_FEATURES: 'all' or a comma-separated subset of FEATURE_BLUEPRINTS."""
+    if value.strip() in ('', 'all'):
+        return list(FEATURE_BLUEPRINTS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(FEATURE_BLUEPRINTS))
+    if unknown:
+        raise ValueError(f"Unknown APP_FEATURES: {', '.join(unknown)}; choose from {', '.join(FEATURE_BLUEPRINTS)}")
+    return [name for name in FEATURE_BLUEPRINTS if name in names]
+
+
+def init_features(app):
+    """Import and run the FEATURE_INITS the enabled features need; the rest are never imported."""
+    features = enabled_features(app.config.get('APP_FEATURES', 'all'))
+    for module_name, function_name, needed_by in FEATURE_INITS:
+        if needed_by is None or any(feature in features for feature in needed_by):
+            getattr(importlib.import_module(module_name), function_name)(app)
+
+
+def register_features(app):
+    features = enabled_features(app.config.get('APP_FEATURES', 'all'))
+    if any(feature in features for feature in JWT_FEATURES):
+        from flask_jwt_extended import JWTManager
+        JWTManager(app)
+    for feature in features:
+        module_name, blueprint_names, url_prefix = FEATURE_BLUEPRINTS[feature]
+        module = importlib.import_module(module_name)
+        for name in blueprint_names:
+            if url_prefix:
+                app.register_blueprint(getattr(module, name), url_prefix=url_prefix)
+            else:
+                app.register_blueprint(getattr(module, name))
+
 
 def create_app():
     app = Flask(__name__)
+    # Billing amounts are Decimal; serialize them as JSON numbers
+    app.json_encoder = MoneyJSONEncoder
     
-    # Configure logging
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    # Use a different log file name format to avoid conflicts
-    log_file = os.path.join('logs', f'hospital_{datetime.now().strftime("%Y%m%d")}.log')
-    
-    # Configure logging with a simpler handler
-    handler = logging.FileHandler(log_file)
-    handler.setFormatter(logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-    ))
-    app.logger.addHandler(handler)
-    app.logger.setLevel(logging.INFO)
-    
-    app.logger.info("Hospital Management System startup")
+    app.config.from_object('config.Config')
+
+    # Queue-backed logging: handlers run on a background listener thread
+    setup_logger(app)
+    request_logger = logging.getLogger(REQUEST_LOGGER)
     
     # Configure the Flask application
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-123')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hospital.db'
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', app.config['SECRET_KEY'])
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # SQLALCHEMY_DATABASE_URI comes from config.Config (DATABASE_URL, default sqlite:///hospital.db)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    # Max SQL statements per request, enforced only when app.testing is set
+    app.config['SQL_STATEMENT_BUDGET'] = int(os.environ.get('SQL_STATEMENT_BUDGET', 0)) or None
+    app.config['SLOW_QUERY_TOP_N'] = int(os.environ.get('SLOW_QUERY_TOP_N', 20))
+    app.config['DB_METRICS_HEADERS'] = os.environ.get('DB_METRICS_HEADERS', '1') == '1'
     
     # Initialize extensions with app
     db.init_app(app)
+    init_db_engine(app, db)
+    init_db_metrics(app, db)
+    init_db_replicas(app)
+    # Tables and sample data come from `flask migrate` / `flask seed`; workers only check the version
+    init_schema(app, db)
+    # Caches, flush hooks, limits and worker pools of the enabled features (APP_FEATURES)
+    init_features(app)
     
     # Configure CORS
     CORS(app, resources={
@@ -55,9 +136,10 @@ def create_app():
                 "https://hospital-management-system-v3.vercel.app"
             ],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type"],
+            "allow_headers": ["Content-Type", "If-None-Match", "If-Modified-Since", "X-Primary-Until"],
             "supports_credentials": True,
-            "expose_headers": ["Content-Type"]
+            "expose_headers": ["Content-Type", "Server-Timing", "X-DB-Query-Count", "X-DB-Time-Ms",
+                                "ETag", "Last-Modified", "Retry-After", "X-Primary-Until"]
         }
     })
     
@@ -68,183 +150,19 @@ def create_app():
             response = jsonify({"status": "ok"})
             return response
 
-    # Add request debugging
+    # Add request debugging (sampled through LOG_SAMPLE_RATES)
     @app.before_request
     def before_request():
-        app.logger.info(f"Request Method: {request.method}")
-        app.logger.info(f"Request URL: {request.url}")
-        app.logger.info(f"Request Headers: {dict(request.headers)}")
-
-    # Register blueprints
-    app.register_blueprint(patients_bp, url_prefix='/api')
-    app.register_blueprint(doctors_bp, url_prefix='/api')
-    app.register_blueprint(appointments_bp, url_prefix='/api')
-    app.register_blueprint(inventory_bp, url_prefix='/api')
-    app.register_blueprint(billing_bp, url_prefix='/api')
-    app.register_blueprint(prescriptions_bp, url_prefix='/api')
-    app.register_blueprint(lab_tests_bp, url_prefix='/api')
-    # Register new role dashboards
-    app.register_blueprint(doctor_dashboard_bp)
-    app.register_blueprint(patient_dashboard_bp)
-    app.register_blueprint(manager_dashboard_bp)
-    app.register_blueprint(admin_dashboard_bp)
-
-    with app.app_context():
-        # Import models here to avoid circular imports
-        from models.patient import Patient
-        from models.doctor import Doctor
-        from models.appointment import Appointment
-        from models.inventory import InventoryItem
-        from models.billing import BillingRecord, BillingItem
-        from models.prescription import Prescription, Medication
-        
-        try:
-            # Create database directory if it doesn't exist
-            db_dir = os.path.dirname(app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', ''))
-            if db_dir and not os.path.exists(db_dir):
-                os.makedirs(db_dir)
-                app.logger.info(f"Created database directory: {db_dir}")
-            
-            # Create tables if they don't exist
-            db.create_all()
-            app.logger.info("Database tables created/verified successfully")
-            
-            # Create sample data if no patients exist
-            if Patient.query.count() == 0:
-                # Create sample patients
-                patients = [
-                    Patient(
-                        first_name="John",
-                        last_name="Doe",
-                        date_of_birth=datetime.strptime("1980-01-01", "%Y-%m-%d").date(),
-                        gender="Male",
-                        address="123 Main St",
-                        phone="1234567890",
-                        email="john.doe@example.com"
-                    ),
-                    Patient(
-                        first_name="Jane",
-                        last_name="Smith",
-                        date_of_birth=datetime.strptime("1985-05-15", "%Y-%m-%d").date(),
-                        gender="Female",
-                        address="456 Oak Ave",
-                        phone="0987654321",
-                        email="jane.smith@example.com"
-                    )
-                ]
-                db.session.add_all(patients)
-                app.logger.info("Created sample patients")
+        if request_logger.isEnabledFor(logging.DEBUG):
+            request_logger.debug("Request Headers: %s", dict(request.headers))
+        request_logger.info("%s %s", request.method, request.url)
 
-            # Create sample doctors if none exist
-            if Doctor.query.count() == 0:
-                # Create sample doctors
-                doctors = [
-                    Doctor(
-                        first_name="Robert",
-                        last_name="Johnson",
-                        specialization="Cardiology",
-                        phone="1112223333",
-                        email="dr.johnson@example.com"
-                    ),
-                    Doctor(
-                        first_name="Sarah",
-                        last_name="Williams",
-                        specialization="General Medicine",
-                        phone="4445556666",
-                        email="dr.williams@example.com"
-                    )
-                ]
-                db.session.add_all(doctors)
-                app.logger.info("Created sample doctors")
+    # Register the blueprints of the enabled features (APP_FEATURES)
+    register_features(app)
 
-            # Create sample prescriptions if none exist
-            if Prescription.query.count() == 0:
-                # Get the first patient and doctor
-                patient = Patient.query.first()
-                doctor = Doctor.query.first()
-                
-                if patient and doctor:
-                    # Create a sample prescription with medications
-                    prescription = Prescription(
-                        patient_id=patient.id,
-                        doctor_id=doctor.id,
-                        diagnosis="Hypertension",
-                        notes="Patient should monitor blood pressure regularly",
-                        medications=[
-                            Medication(
-                                name="Lisinopril",
-                                dosage="10mg",
-                                frequency="Once daily",
-                                duration="30 days",
-                                instructions="Take in the morning with water"
-                            ),
-                            Medication(
-                                name="Aspirin",
-                                dosage="81mg",
-                                frequency="Once daily",
-                                duration="30 days",
-                                instructions="Take with food"
-                            )
-                        ]
-                    )
-                    db.session.add(prescription)
-                    app.logger.info("Created sample prescription with medications")
+    # Set up ORM mappers now, before gunicorn --preload forks, not on each worker's first query
+    configure_mappers()
 
-            db.session.commit()
-            
-            # Verify the tables exist
-            if Patient.__table__.exists(db.engine):
-                app.logger.info("Patients table exists")
-            else:
-                app.logger.error("Patients table does not exist")
-                raise Exception("Patients table creation failed")
-
-            if Doctor.__table__.exists(db.engine):
-                app.logger.info("Doctors table exists")
-            else:
-                app.logger.error("Doctors table does not exist")
-                raise Exception("Doctors table creation failed")
-
-            if Appointment.__table__.exists(db.engine):
-                app.logger.info("Appointments table exists")
-            else:
-                app.logger.error("Appointments table does not exist")
-                raise Exception("Appointments table creation failed")
-
-            if InventoryItem.__table__.exists(db.engine):
-                app.logger.info("Inventory table exists")
-            else:
-                app.logger.error("Inventory table does not exist")
-                raise Exception("Inventory table creation failed")
-
-            if BillingRecord.__table__.exists(db.engine):
-                app.logger.info("Billing records table exists")
-            else:
-                app.logger.error("Billing records table does not exist")
-                raise Exception("Billing records table creation failed")
-
-            if BillingItem.__table__.exists(db.engine):
-                app.logger.info("Billing items table exists")
-            else:
-                app.logger.error("Billing items table does not exist")
-                raise Exception("Billing items table creation failed")
-
-            if Prescription.__table__.exists(db.engine):
-                app.logger.info("Prescriptions table exists")
-            else:
-                app.logger.error("Prescriptions table does not exist")
-                raise Exception("Prescriptions table creation failed")
-
-            if Medication.__table__.exists(db.engine):
-                app.logger.info("Medications table exists")
-            else:
-                app.logger.error("Medications table does not exist")
-                raise Exception("Medications table creation failed")
-                
-        except Exception as e:
-            app.logger.error(f"Error during database initialization: {str(e)}")
-            raise
-    
     return app
 
 if __name__ == '__main__':
@@ -253,4 +171,8 @@ if __name__ == '__main__':
     host = os.environ.get('FLASK_RUN_HOST', '0.0.0.0')
     port = int(os.environ.get('FLASK_RUN_PORT', 5000))
     app = create_app()
+    # The development server sets up its own database; deployments run `flask migrate` and `flask seed`
+    with app.app_context():
+        migrate_database(app)
+        seed_sample_data(app.logger)
     app.run(debug=debug, host=host, port=port)
\ No newline at end of file
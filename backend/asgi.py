@@ -0,0 +1,6 @@
+# ASGI mode: read-heavy GETs run on an async engine, the rest on the Flask app.
+#     uvicorn asgi:application --workers 4
+from app import create_app
+from utils.async_api import create_asgi_app
+
+application = create_asgi_app(create_app())
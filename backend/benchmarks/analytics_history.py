@@ -0,0 +1,126 @@
+"""
+Time /api/dashboard/analytics on years of generated history: one
+appointment, billing record and billing item every 3 minutes and a lab test
+every 9. Each metric is timed once as a GROUP BY over its source table (how
+every call used to run) and then for every grouping and bucket over the
+analytics_daily rollup.
+
+    python benchmarks/analytics_history.py --years 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+CHUNK = 50000
+START = datetime(2020, 1, 1)
+DOCTORS = 20
+PATIENTS = 5000
+
+
+def _chunks(count, build):
+    for start in range(0, count, CHUNK):
+        yield [build(i) for i in range(start, min(start + CHUNK, count))]
+
+
+def load(engine, rows):
+    from models.appointment import Appointment
+    from models.billing import BillingItem, BillingRecord
+    from models.doctor import Doctor
+    from models.lab_test import LabTest
+    from models.patient import Patient
+
+    rnd = random.Random(42)
+    now = datetime.utcnow()
+    stamps = dict(is_active=True, created_at=now, updated_at=now)
+
+    def at(i):
+        return START + timedelta(minutes=i * 3)
+
+    def bill(i):
+        paid = rnd.choice((0, 50, 100))
+        return dict(id=i + 1, patient_id=i % PATIENTS + 1, appointment_id=i + 1, total_amount=100, paid_amount=paid,
+                    payment_status={0: 'pending', 50: 'partial', 100: 'paid'}[paid],
+                    payment_method=rnd.choice(('cash', 'card', 'insurance', 'upi')), is_active=True,
+                    created_at=at(i), updated_at=at(i))
+
+    with engine.begin() as connection:
+        connection.execute(Patient.__table__.insert(), [dict(
+            first_name=f'Patient{i}', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Other',
+            address='12 Long Street', phone=f'98{i:08d}', email=f'p{i}@example.com', name_phonetic='', **stamps
+        ) for i in range(PATIENTS)])
+        connection.execute(Doctor.__table__.insert(), [dict(
+            first_name=f'Doctor{i}', last_name='Test', specialization=('General', 'Cardiology', 'Orthopedics')[i % 3],
+            phone=f'97{i:08d}', email=f'd{i}@example.com', **stamps
+        ) for i in range(DOCTORS)])
+    tables = [
+        (Appointment.__table__, rows, lambda i: dict(
+            id=i + 1, patient_id=i % PATIENTS + 1, doctor_id=i % DOCTORS + 1, date=at(i).strftime('%Y-%m-%d'),
+            time=at(i).strftime('%H:%M'), status='completed', notes='', created_at=at(i), updated_at=at(i))),
+        (BillingRecord.__table__, rows, bill),
+        (BillingItem.__table__, rows, lambda i: dict(
+            billing_record_id=i + 1, item_type=rnd.choice(('consultation', 'test', 'medication')),
+            description='Visit', quantity=1, unit_price=100, total_price=100, is_active=True,
+            created_at=at(i), updated_at=at(i))),
+        (LabTest.__table__, rows // 3, lambda i: dict(
+            patient_id=i % PATIENTS + 1, doctor_id=i % DOCTORS + 1, test_name='CBC', test_type='blood',
+            test_date=at(i * 3), status='completed', is_active=True, created_at=at(i * 3), updated_at=at(i * 3))),
+    ]
+    for table, count, build in tables:
+        for chunk in _chunks(count, build):
+            with engine.begin() as connection:
+                connection.execute(table.insert(), chunk)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=5)
+    args = parser.parse_args()
+    rows = int(args.years * 365 * 24 * 20)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'analytics.db')}",
+                          LOG_FILE=os.path.join(tmp, 'logs', 'app.log'), LOG_LEVEL='WARNING',
+                          ANALYTICS_RECONCILE_SECONDS='0')
+        import app as app_module
+        from extensions import db
+        from utils import analytics_rollup
+        from utils.analytics import METRICS, TOTAL, run_analytics, source_select
+
+        app = app_module.create_app()
+        with app.app_context():
+            app_module.migrate_database(app)
+            load(db.engine, rows)
+            print(f"{rows:,} appointments, billing records and items, {rows // 3:,} lab tests")
+            # Core inserts bypass the flush hook, so build the rollup the way migration 0006 does
+            _, ms = timed(analytics_rollup.reconcile)
+            print(f"rollup built in {ms / 1000:.1f}s\n")
+
+            worst = 0
+            for metric in METRICS:
+                with db.engine.connect() as connection:
+                    _, ms = timed(lambda: connection.execute(source_select(metric, TOTAL)).fetchall())
+                print(f"{metric:14} source tables  day     {ms:8.0f} ms")
+                for group_by in [None] + list(METRICS[metric]()[5]):
+                    for bucket in ('day', 'week', 'month'):
+                        result, ms = timed(run_analytics, metric, bucket, group_by)
+                        worst = max(worst, ms)
+                        print(f"{metric:14} {group_by or '-':14} {bucket:6} {ms:8.0f} ms  {len(result):6} rows")
+            print(f"\nslowest rollup call {worst:.0f} ms")
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Compare the WSGI app (threaded Werkzeug server, as `python app.py` runs it)
+with the ASGI mode (asgi.py under uvicorn) at many concurrent connections.
+Each client connection loops over GET requests to the read endpoints for
+--seconds; --idle extra connections send a partial request and then sit
+there, like slow portal clients on poor networks.
+
+    python benchmarks/async_serving.py --connections 1000 --idle 200 --seconds 20
+
+Needs uvicorn, asgiref and aiosqlite (see requirements.txt).
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREPARE = """
+import sys
+from datetime import date, datetime
+sys.path.insert(0, {backend!r})
+import app as app_module
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.patient import Patient
+app = app_module.create_app()
+with app.app_context():
+    app_module.migrate_database(app)
+    now = datetime.utcnow()
+    stamps = dict(is_active=True, created_at=now, updated_at=now)
+    with db.engine.begin() as connection:
+        connection.execute(Patient.__table__.insert(), [dict(
+            first_name=f'Patient{{i}}', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Other',
+            address='12 Long Street', phone=f'98{{i:08d}}', email=f'p{{i}}@example.com', name_phonetic='', **stamps
+        ) for i in range({patients})])
+        connection.execute(Doctor.__table__.insert(), [dict(
+            first_name=f'Doctor{{i}}', last_name='Test', specialization='General', phone=f'97{{i:08d}}',
+            email=f'd{{i}}@example.com', **stamps
+        ) for i in range(50)])
+        connection.execute(Appointment.__table__.insert(), [dict(
+            patient_id=i % {patients} + 1, doctor_id=i % 50 + 1, date=f'2024-{{i % 12 + 1:02d}}-{{i % 28 + 1:02d}}',
+            time='09:00', status='completed', notes='Follow-up', created_at=now, updated_at=now
+        ) for i in range({patients} * 2)])
+"""
+
+WSGI_SERVER = """
+import sys
+sys.path.insert(0, {backend!r})
+from werkzeug.serving import ThreadedWSGIServer, make_server
+from app import create_app
+ThreadedWSGIServer.request_queue_size = 2048
+make_server('127.0.0.1', {port}, create_app(), threaded=True).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+async def fetch(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode('ascii'))
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    return int(data.split(b' ', 2)[1]) if data else 0
+
+
+async def client(port, paths, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(fetch(port, random.choice(paths)), timeout=30)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+            status = type(e).__name__
+        if status == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(status)
+
+
+async def idle_client(port, deadline):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        return
+    writer.write(b"GET /api/doctors HTTP/1.1\r\nHost: localhost\r\n")
+    await asyncio.sleep(max(deadline - time.monotonic(), 0))
+    writer.close()
+
+
+async def load(port, paths, connections, idle, seconds):
+    deadline = time.monotonic() + seconds
+    latencies, errors = [], []
+    idlers = [asyncio.create_task(idle_client(port, deadline)) for _ in range(idle)]
+    await asyncio.sleep(0.5)
+    started = time.monotonic()
+    await asyncio.gather(*(client(port, paths, deadline, latencies, errors) for _ in range(connections)))
+    elapsed = time.monotonic() - started
+    await asyncio.gather(*idlers)
+    return latencies, errors, elapsed
+
+
+def report(label, latencies, errors, elapsed):
+    if not latencies:
+        print(f"  {label:6} no successful requests, errors {dict(Counter(errors))}")
+        return
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    print(f"  {label:6} {len(latencies) / elapsed:8.1f} req/s  p50 {statistics.median(ordered) * 1000:8.1f} ms  "
+          f"p95 {pick(0.95):8.1f} ms  p99 {pick(0.99):8.1f} ms  errors {dict(Counter(errors))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--idle', type=int, default=200, help='Slow clients that never finish their request.')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--patients', type=int, default=5000)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    paths = ['/api/patients?limit=20', '/api/appointments?limit=20&include=patient'] + \
+            [f'/api/patients/{i}' for i in range(1, 51)] + [f'/api/doctors/{i}' for i in range(1, 11)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'serving.db')}",
+                   LOG_FILE=os.path.join(tmp, 'logs', 'app.log'), LOG_LEVEL='WARNING')
+        subprocess.run([sys.executable, '-c', PREPARE.format(backend=BACKEND, patients=args.patients)],
+                       env=env, cwd=tmp, check=True, capture_output=True)
+
+        print(f"{args.connections} connections + {args.idle} idle, {args.seconds:.0f}s per mode")
+        modes = [
+            ('wsgi', lambda port: [sys.executable, '-c', WSGI_SERVER.format(backend=BACKEND, port=port)]),
+            ('asgi', lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port),
+                                   '--log-level', 'warning', '--no-access-log', '--backlog', '2048']),
+        ]
+        for label, command in modes:
+            port = free_port()
+            server = subprocess.Popen(command(port), env=env, cwd=BACKEND,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for(port)
+                report(label, *asyncio.run(load(port, paths, args.connections, args.idle, args.seconds)))
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
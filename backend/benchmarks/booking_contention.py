@@ -0,0 +1,101 @@
+"""
+Fire many parallel bookings at a handful of doctor slots and check that
+each slot ends up with exactly one scheduled appointment.
+
+    python benchmarks/booking_contention.py --bookings 5000 --slots 20 --threads 64
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func
+
+import migrations
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.patient import Patient
+from routes.appointments import appointments_bp
+from utils.availability import init_availability
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['BOOKING_RETRIES'] = 5
+    db.init_app(app)
+    init_availability(app)
+    app.register_blueprint(appointments_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine)
+        db.session.add_all(
+            Doctor(id=i, first_name='Dr', last_name=str(i), specialization='General', phone='9000000000',
+                   email=f'dr{i}@example.com')
+            for i in range(1, 5)
+        )
+        db.session.add_all(
+            Patient(id=i, first_name='Patient', last_name=str(i), date_of_birth=date(1990, 1, 1),
+                    gender='Other', phone='9000000000')
+            for i in range(1, 1001)
+        )
+        db.session.commit()
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--slots', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'booking.db'))
+        slots = [(1 + i % 4, '2030-01-02', f"{9 + i // 4:02d}:{(i % 4) * 15:02d}") for i in range(args.slots)]
+        rnd = random.Random(7)
+        payloads = [
+            dict(zip(('doctor_id', 'date', 'time'), rnd.choice(slots)), patient_id=rnd.randint(1, 1000))
+            for _ in range(args.bookings)
+        ]
+
+        def book(payload):
+            started = time.perf_counter()
+            response = app.test_client().post('/api/appointments', json=payload)
+            return response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(book, payloads))
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(status for status, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        with app.app_context():
+            per_slot = db.session.query(func.count()).filter(Appointment.status == 'scheduled').group_by(
+                Appointment.doctor_id, Appointment.date, Appointment.time
+            ).all()
+            double_booked = sum(1 for (count,) in per_slot if count > 1)
+
+        print(f"{args.bookings} bookings on {args.slots} slots with {args.threads} threads in {elapsed:.2f}s "
+              f"({args.bookings / elapsed:.0f} req/s)")
+        print(f"status codes: {dict(statuses)}")
+        print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+        print(f"booked slots: {len(per_slot)}, double-booked slots: {double_booked}")
+        if double_booked or statuses[201] != len(per_slot):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare loading patients one ORM object at a time (as seed_data.py does)
+with the chunked bulk import pipeline behind /api/bulk/<entity>.
+
+    python benchmarks/bulk_import.py --rows 500000 --orm-rows 20000
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from extensions import db
+from models.patient import Patient
+from utils.bulk_import import import_rows, read_rows
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def patient_row(i):
+    return {
+        'first_name': f'Patient{i}', 'last_name': 'Test', 'date_of_birth': '1990-01-01',
+        'gender': ('Male', 'Female', 'Other')[i % 3], 'phone': f'98{i:08d}', 'email': f'p{i}@example.com'
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--orm-rows', type=int, default=20000, help='ORM is slow; time a sample and extrapolate')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'orm.db'))
+        with app.app_context():
+            started = time.perf_counter()
+            for i in range(args.orm_rows):
+                row = patient_row(i)
+                row['date_of_birth'] = date.fromisoformat(row['date_of_birth'])
+                db.session.add(Patient(**row))
+                # seed_data.py commits per entity; commit every chunk to keep the comparison fair
+                if i % args.chunk_size == args.chunk_size - 1:
+                    db.session.commit()
+            db.session.commit()
+            orm_rate = args.orm_rows / (time.perf_counter() - started)
+
+        app = build_app(os.path.join(tmp, 'bulk.db'))
+        stream = io.StringIO(''.join(json.dumps(patient_row(i)) + '\n' for i in range(args.rows)))
+        with app.app_context():
+            started = time.perf_counter()
+            report = import_rows('patients', read_rows(stream, 'ndjson'), args.chunk_size)
+            elapsed = time.perf_counter() - started
+            count = Patient.query.count()
+
+    print(f"ORM: {orm_rate:,.0f} rows/s ({args.rows / orm_rate:.1f}s projected for {args.rows:,} rows)")
+    print(f"bulk: {report['inserted']:,} rows in {elapsed:.1f}s ({report['inserted'] / elapsed:,.0f} rows/s), "
+          f"{report['failed']} failed, {count:,} in table")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold import report: runs `import app; app.create_app()` in a fresh
+interpreter under `python -X importtime`, then lists the slowest backend
+modules (cumulative, i.e. including what they pull in) and the third-party
+and stdlib packages that cost the most (self time summed per package).
+Exits with status 1 when the median total import time of --runs runs
+exceeds --budget-ms, so CI can gate on it without failing on one slow run.
+
+    python benchmarks/import_time.py --top 15 --runs 5 --budget-ms 800
+    python benchmarks/import_time.py --features patients,doctors,appointments
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {backend!r})
+started = time.perf_counter()
+import app
+app.create_app()
+print(time.perf_counter() - started)
+"""
+
+
+def backend_packages():
+    """Top-level module names that belong to the backend (app, routes, utils, models, ...)."""
+    names = set()
+    for entry in os.listdir(BACKEND):
+        path = os.path.join(BACKEND, entry)
+        if entry.endswith('.py'):
+            names.add(entry[:-3])
+        elif os.path.isfile(os.path.join(path, '__init__.py')) or entry in ('routes', 'utils'):
+            names.add(entry)
+    return names
+
+
+def parse(stderr):
+    """(depth, module, self_us, cumulative_us) per `-X importtime` line."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--features', default='all', help='APP_FEATURES for the measured app.')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs; the median one is reported (default 3).')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Fail when the median total import time exceeds this.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, APP_FEATURES=args.features, LOG_LEVEL='WARNING',
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'import.db')}",
+                   LOG_FILE=os.path.join(tmp, 'logs', 'app.log'))
+        # Untimed run to write .pyc files, so the report measures imports rather than compilation
+        warm = subprocess.run([sys.executable, '-c', CHILD.format(backend=BACKEND)], env=env, cwd=tmp,
+                              capture_output=True, text=True)
+        if warm.returncode:
+            sys.exit(warm.stderr.strip().splitlines()[-1])
+        runs = []
+        for _ in range(max(args.runs, 1)):
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD.format(backend=BACKEND)],
+                                    env=env, cwd=tmp, capture_output=True, text=True, check=True)
+            entries = parse(result.stderr)
+            total_ms = sum(cumulative for depth, _, _, cumulative in entries if depth == 0) / 1000
+            runs.append((total_ms, entries, result.stdout))
+
+    total_ms, entries, stdout = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+    wall_ms = float(stdout.strip().splitlines()[-1]) * 1000
+    ours = backend_packages()
+
+    backend = sorted((entry for entry in entries if entry[1].split('.')[0] in ours),
+                     key=lambda entry: entry[3], reverse=True)
+    packages = {}
+    for _, name, self_us, _ in entries:
+        top = name.split('.')[0]
+        if top not in ours:
+            packages[top] = packages.get(top, 0) + self_us
+
+    print(f"APP_FEATURES={args.features}: {len(entries)} modules, {total_ms:.1f} ms importing, "
+          f"{wall_ms:.1f} ms for import + create_app() (median of {len(runs)} runs, "
+          f"{', '.join(f'{run[0]:.0f}' for run in runs)} ms)")
+    print("\nSlowest backend modules (cumulative / self ms)")
+    for _, name, self_us, cumulative_us in backend[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+    print("\nCostliest packages (self ms, all submodules)")
+    for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f}  {name}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nCold import {total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
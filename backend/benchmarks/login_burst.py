@@ -0,0 +1,199 @@
+"""
+Login throughput and clinical-endpoint latency during a login burst, like a
+shift change. --logins threads post to /api/auth/login as different users
+while clinical clients read patient records and appointment lists, against
+the threaded Werkzeug server. Runs with no logins (baseline), with hashing on
+the request thread (PASSWORD_HASH_WORKERS=0, the previous behaviour) and on
+the bounded hashing pool (the PASSWORD_HASH_* settings in the environment,
+or the defaults).
+
+    python benchmarks/login_burst.py --logins 16 --clinical 4 --seconds 15
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USERS = 200
+
+PREPARE = """
+import sys
+from datetime import date, datetime
+sys.path.insert(0, {backend!r})
+import app as app_module
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.patient import Patient
+from models.user import User
+from utils.passwords import generate, normalize_method
+app = app_module.create_app()
+with app.app_context():
+    app_module.migrate_database(app)
+    now = datetime.utcnow()
+    stamps = dict(is_active=True, created_at=now, updated_at=now)
+    # One hash for every user: the benchmark measures verifying it, not preparing it
+    password_hash = generate('shift-change', normalize_method(app.config['PASSWORD_HASH_METHOD']))
+    with db.engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [dict(
+            username=f'user{{i}}', role='doctor', password_hash=password_hash, is_active=True,
+            created_at=now, updated_at=now
+        ) for i in range({users})])
+        connection.execute(Patient.__table__.insert(), [dict(
+            first_name=f'Patient{{i}}', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Other',
+            address='12 Long Street', phone=f'98{{i:08d}}', email=f'p{{i}}@example.com', name_phonetic='', **stamps
+        ) for i in range(1000)])
+        connection.execute(Doctor.__table__.insert(), [dict(
+            first_name=f'Doctor{{i}}', last_name='Test', specialization='General', phone=f'97{{i:08d}}',
+            email=f'd{{i}}@example.com', **stamps
+        ) for i in range(20)])
+        connection.execute(Appointment.__table__.insert(), [dict(
+            patient_id=i % 1000 + 1, doctor_id=i % 20 + 1, date=f'2024-{{i % 12 + 1:02d}}-{{i % 28 + 1:02d}}',
+            time='09:00', status='completed', notes='Follow-up', created_at=now, updated_at=now
+        ) for i in range(2000)])
+"""
+
+SERVER = """
+import sys
+sys.path.insert(0, {backend!r})
+from werkzeug.serving import make_server
+from app import create_app
+make_server('127.0.0.1', {port}, create_app(), threaded=True).serve_forever()
+"""
+
+CLINICAL_PATHS = ['/api/patients/{n}', '/api/appointments?limit=20&patient_id={n}']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def timed(port, method, path, body, statuses, latencies):
+    started = time.perf_counter()
+    try:
+        status = request(port, method, path, body)
+    except OSError as e:
+        status = type(e).__name__
+    statuses.append(status)
+    if status == 200:
+        latencies.append(time.perf_counter() - started)
+    return status
+
+
+def login_worker(port, offset, deadline, statuses, latencies):
+    n = offset
+    while time.monotonic() < deadline:
+        body = {'username': f'user{n % USERS}', 'password': 'shift-change'}
+        n += 1
+        if timed(port, 'POST', '/api/auth/login', body, statuses, latencies) == 503:
+            time.sleep(0.05)
+
+
+def clinical_worker(port, offset, deadline, statuses, latencies):
+    n = offset
+    while time.monotonic() < deadline:
+        timed(port, 'GET', CLINICAL_PATHS[n % 2].format(n=n % 1000 + 1), None, statuses, latencies)
+        n += 1
+        # Paced like a clinician's screen rather than a load generator
+        time.sleep(0.02)
+
+
+def run(port, logins, clinical, seconds):
+    deadline = time.monotonic() + seconds
+    results = {'login': ([], []), 'clinical': ([], [])}
+    threads = [threading.Thread(target=login_worker, args=(port, i * 7, deadline, *results['login']))
+               for i in range(logins)]
+    threads += [threading.Thread(target=clinical_worker, args=(port, i * 13, deadline, *results['clinical']))
+                for i in range(clinical)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(label, results, seconds):
+    print(label)
+    for name, (statuses, latencies) in results.items():
+        if not statuses:
+            continue
+        if not latencies:
+            print(f"  {name:9} no successful requests, statuses {dict(Counter(statuses))}")
+            continue
+        ordered = sorted(latencies)
+        pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+        print(f"  {name:9} {len(latencies) / seconds:8.1f} req/s  p50 {statistics.median(ordered) * 1000:8.1f} ms  "
+              f"p99 {pick(0.99):8.1f} ms  statuses {dict(Counter(statuses))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=16, help='Threads logging in back to back.')
+    parser.add_argument('--clinical', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Quotas and admission slots are left out, so only the hashing pool differs between modes
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'logins.db')}",
+                   LOG_FILE=os.path.join(tmp, 'logs', 'app.log'), LOG_LEVEL='WARNING',
+                   RATE_LIMIT_BACKEND='none', ADMISSION_LIMITS='', ADMISSION_DB_LATENCY_MS='0')
+        subprocess.run([sys.executable, '-c', PREPARE.format(backend=BACKEND, users=USERS)],
+                       env=env, cwd=tmp, check=True, capture_output=True)
+
+        modes = [
+            ('no logins (baseline)', 0, {}),
+            ('hashing on the request thread', args.logins, dict(PASSWORD_HASH_WORKERS='0')),
+            ('bounded hashing pool', args.logins, {}),
+        ]
+        print(f"{args.logins} login threads, {args.clinical} clinical clients, {args.seconds:.0f}s per mode")
+        for label, logins, overrides in modes:
+            port = free_port()
+            server = subprocess.Popen([sys.executable, '-c', SERVER.format(backend=BACKEND, port=port)],
+                                      env=dict(env, **overrides), cwd=tmp,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for(port)
+                report(label, run(port, logins, args.clinical, args.seconds), args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
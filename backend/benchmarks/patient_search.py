@@ -0,0 +1,83 @@
+"""
+Load synthetic patients into a temporary SQLite database with the FTS5
+search index and time /api/patients/search style queries against it.
+
+    python benchmarks/patient_search.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+import migrations
+from extensions import db
+from models.patient import Patient
+from utils.patient_search import phonetic_key, search_patients
+
+FIRST = ['John', 'Jon', 'Jane', 'Priya', 'Rahul', 'Anita', 'Catherine', 'Kathryn', 'Mohammed', 'Aisha',
+         'Vikram', 'Sneha', 'Arjun', 'Meera', 'Rohan', 'Kavya', 'Suresh', 'Lakshmi', 'David', 'Maria']
+LAST = ['Smith', 'Smyth', 'Sharma', 'Verma', 'Iyer', 'Nair', 'Reddy', 'Khan', 'Patel', 'Gupta',
+        'Johnson', 'Jones', 'Menon', 'Das', 'Rao', 'Singh', 'Kumar', 'Pillai', 'Bose', 'Joshi']
+QUERIES = ['priya sharma', 'Prya Sharma', 'smyth', 'Kathrin', 'iyer', 'mohamed khan', '98765', 'gupta1234']
+
+
+def build_app(path, rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    rnd = random.Random(11)
+    with app.app_context():
+        db.create_all()
+        migrations.upgrade(db.engine)
+        now = datetime.utcnow()
+        table = Patient.__table__
+        for start in range(0, rows, 50000):
+            batch = []
+            for i in range(start, min(start + 50000, rows)):
+                first, last = rnd.choice(FIRST), rnd.choice(LAST)
+                # Mix in numbered surnames so names are not all duplicates
+                last = f"{last}{i % 5000}" if i % 3 else last
+                batch.append(dict(
+                    first_name=first, last_name=last, date_of_birth=date(1990, 1, 1), gender='Other',
+                    address='', phone=f"9{rnd.randrange(10 ** 9):09d}", email=f"{first.lower()}{i}@example.com",
+                    name_phonetic=phonetic_key(first, last), is_active=True, created_at=now, updated_at=now
+                ))
+            with db.engine.begin() as connection:
+                connection.execute(table.insert(), batch)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        app = build_app(os.path.join(tmp, 'search.db'), args.rows)
+        print(f"loaded {args.rows:,} patients (FTS kept in sync by triggers) in {time.perf_counter() - started:.1f}s")
+        with app.app_context():
+            for q in QUERIES:
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    results = search_patients(q, 10)
+                    timings.append(time.perf_counter() - started)
+                    db.session.remove()
+                timings.sort()
+                top = ', '.join(f"{p.first_name} {p.last_name} ({score})" for p, score in results[:3])
+                print(f"{q!r:18} p50 {timings[len(timings) // 2] * 1000:7.1f} ms  "
+                      f"max {timings[-1] * 1000:7.1f} ms  top: {top}")
+
+
+if __name__ == '__main__':
+    main()
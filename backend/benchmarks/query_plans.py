@@ -0,0 +1,139 @@
+"""
+Compare SQLite query plans and timings for the hot lookups before and after
+the indexes from migration 0001.
+
+    python benchmarks/query_plans.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from extensions import db
+from migrations import m0001_hot_path_indexes
+from models.appointment import Appointment
+from models.billing import BillingRecord, BillingItem
+from models.inventory import InventoryItem
+from models.lab_test import LabTest
+from models.prescription import Prescription
+
+CHUNK = 50000
+START = datetime(2020, 1, 1)
+
+QUERIES = [
+    ('doctor availability',
+     "SELECT id FROM appointments WHERE doctor_id = 17 AND date = '2024-03-04' "
+     "AND time = '10:15' AND status = 'scheduled' LIMIT 1"),
+    ('prescriptions by patient',
+     "SELECT id FROM prescriptions WHERE patient_id = 4242 AND is_active = 1 ORDER BY created_at DESC"),
+    ('lab tests page',
+     "SELECT id FROM lab_tests WHERE is_active = 1 ORDER BY created_at DESC LIMIT 50"),
+    ('monthly revenue',
+     "SELECT sum(paid_amount) FROM billing_records WHERE is_active = 1 AND created_at >= '2024-06-01'"),
+    ('invoice items',
+     "SELECT id FROM billing_items WHERE billing_record_id = 31337 AND is_active = 1"),
+    ('low stock',
+     "SELECT id FROM inventory_items WHERE quantity - minimum_stock <= 0 AND is_active = 1"),
+]
+
+
+def _rows(count, build):
+    for start in range(0, count, CHUNK):
+        yield [build(i) for i in range(start, min(start + CHUNK, count))]
+
+
+def load(engine, rows):
+    rnd = random.Random(42)
+    now = datetime.utcnow()
+
+    def created(i):
+        return START + timedelta(minutes=i * 3)
+
+    def appointment(i):
+        row = {'patient_id': rnd.randint(1, 100000), 'status': rnd.choice(('scheduled', 'completed', 'cancelled')),
+               'created_at': created(i), 'updated_at': now}
+        if row['status'] == 'scheduled':
+            # uq_appointments_scheduled_slot allows one scheduled row per slot: give row i its own
+            # (doctor, day, quarter hour between 08:00 and 18:00)
+            slot = i // 200
+            row.update(doctor_id=i % 200 + 1, date=(START + timedelta(days=slot // 40)).strftime('%Y-%m-%d'),
+                       time=f"{8 + slot % 40 // 4:02d}:{slot % 4 * 15:02d}")
+        else:
+            row.update(doctor_id=rnd.randint(1, 200),
+                       date=(START + timedelta(days=rnd.randint(0, 1800))).strftime('%Y-%m-%d'),
+                       time=f"{rnd.randint(8, 17):02d}:{rnd.choice((0, 15, 30, 45)):02d}")
+        return row
+
+    builders = {
+        Appointment.__table__: appointment,
+        Prescription.__table__: lambda i: {
+            'patient_id': rnd.randint(1, 100000), 'doctor_id': rnd.randint(1, 200), 'diagnosis': 'x',
+            'is_active': rnd.random() > 0.05, 'created_at': created(i), 'updated_at': now},
+        LabTest.__table__: lambda i: {
+            'patient_id': rnd.randint(1, 100000), 'doctor_id': rnd.randint(1, 200), 'test_name': 'x',
+            'test_type': 'x', 'test_date': created(i), 'status': 'pending',
+            'is_active': rnd.random() > 0.05, 'created_at': created(i), 'updated_at': now},
+        BillingRecord.__table__: lambda i: {
+            'patient_id': rnd.randint(1, 100000), 'total_amount': 100.0, 'paid_amount': rnd.random() * 100,
+            'is_active': rnd.random() > 0.05, 'created_at': created(i), 'updated_at': now},
+        BillingItem.__table__: lambda i: {
+            'billing_record_id': rnd.randint(1, rows), 'item_type': 'x', 'description': 'x',
+            'quantity': 1, 'unit_price': 10.0, 'total_price': 10.0,
+            'is_active': rnd.random() > 0.05, 'created_at': created(i), 'updated_at': now},
+        InventoryItem.__table__: lambda i: {
+            'name': 'x', 'category': 'x', 'quantity': rnd.randint(0, 10000), 'unit': 'x',
+            'price_per_unit': 1.0, 'minimum_stock': rnd.randint(0, 200),
+            'is_active': rnd.random() > 0.05, 'created_at': created(i), 'updated_at': now},
+    }
+    for table, build in builders.items():
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            for chunk in _rows(rows, build):
+                connection.execute(table.insert(), chunk)
+        print(f"  loaded {rows:,} rows into {table.name} in {time.perf_counter() - started:.1f}s")
+
+
+def report(engine, label):
+    print(f"\n== {label} ==")
+    with engine.connect() as connection:
+        connection.execute(text('ANALYZE'))
+        for name, sql in QUERIES:
+            plan = '; '.join(row[-1] for row in connection.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+            started = time.perf_counter()
+            connection.execute(text(sql)).fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{name:<26} {elapsed:>10.2f} ms  {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='rows per table (default 1,000,000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            for index in m0001_hot_path_indexes.INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+
+        load(engine, args.rows)
+        report(engine, 'without indexes')
+
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            m0001_hot_path_indexes.upgrade(connection)
+        print(f"\nmigration 0001 built indexes in {time.perf_counter() - started:.1f}s")
+        report(engine, 'with indexes')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Booking latency under a runaway reporting script. Booking clients check a
+doctor's free slots and list appointments while --reporters threads
+repeatedly pull full appointment exports, against the threaded Werkzeug
+server. Runs once with rate limiting and admission control
+off and once with the configured defaults (or the RATE_LIMITS /
+ADMISSION_* variables in the environment).
+
+    python benchmarks/report_flood.py --reporters 8 --bookers 4 --seconds 15
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREPARE = """
+import sys
+from datetime import date, datetime
+sys.path.insert(0, {backend!r})
+import app as app_module
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.patient import Patient
+app = app_module.create_app()
+with app.app_context():
+    app_module.migrate_database(app)
+    now = datetime.utcnow()
+    stamps = dict(is_active=True, created_at=now, updated_at=now)
+    with db.engine.begin() as connection:
+        connection.execute(Patient.__table__.insert(), [dict(
+            first_name=f'Patient{{i}}', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Other',
+            address='12 Long Street', phone=f'98{{i:08d}}', email=f'p{{i}}@example.com', name_phonetic='', **stamps
+        ) for i in range({patients})])
+        connection.execute(Doctor.__table__.insert(), [dict(
+            first_name=f'Doctor{{i}}', last_name='Test', specialization='General', phone=f'97{{i:08d}}',
+            email=f'd{{i}}@example.com', **stamps
+        ) for i in range(20)])
+        connection.execute(Appointment.__table__.insert(), [dict(
+            patient_id=i % {patients} + 1, doctor_id=i % 20 + 1, date=f'2024-{{i % 12 + 1:02d}}-{{i % 28 + 1:02d}}',
+            time='09:00', status='completed', notes='Follow-up', created_at=now, updated_at=now
+        ) for i in range({patients})])
+"""
+
+SERVER = """
+import sys
+sys.path.insert(0, {backend!r})
+from werkzeug.serving import make_server
+from app import create_app
+make_server('127.0.0.1', {port}, create_app(), threaded=True).serve_forever()
+"""
+
+REPORT_PATHS = ['/api/export/appointments?format=ndjson', '/api/export/appointments?format=csv']
+BOOKING_PATHS = ['/api/doctors/{doctor}/free-slots?start=2024-03-04&days=7',
+                 '/api/appointments?limit=20&doctor_id={doctor}']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def worker(port, paths, deadline, statuses, latencies=None, pause=0.0):
+    n = 0
+    while time.monotonic() < deadline:
+        path = paths[n % len(paths)].format(doctor=n % 20 + 1)
+        n += 1
+        started = time.perf_counter()
+        try:
+            status = get(port, path)
+        except OSError as e:
+            status = type(e).__name__
+        statuses.append(status)
+        if latencies is not None and status == 200:
+            latencies.append(time.perf_counter() - started)
+        if status != 200 and pause:
+            time.sleep(pause)
+
+
+def run(port, reporters, bookers, seconds):
+    deadline = time.monotonic() + seconds
+    reports, bookings, latencies = [], [], []
+    threads = [threading.Thread(target=worker, args=(port, REPORT_PATHS, deadline, reports))
+               for _ in range(reporters)]
+    # Booking clients pace themselves like a receptionist's screen, not a load generator
+    threads += [threading.Thread(target=worker, args=(port, BOOKING_PATHS, deadline, bookings, latencies, 0.05))
+                for _ in range(bookers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return reports, bookings, latencies
+
+
+def report(label, reports, bookings, latencies, seconds):
+    print(label)
+    print(f"  reports   {len(reports) / seconds:8.1f} req/s  statuses {dict(Counter(reports))}")
+    if not latencies:
+        print(f"  booking   no successful requests, statuses {dict(Counter(bookings))}")
+        return
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    print(f"  booking   {len(latencies) / seconds:8.1f} req/s  p50 {statistics.median(ordered) * 1000:8.1f} ms  "
+          f"p99 {pick(0.99):8.1f} ms  statuses {dict(Counter(bookings))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reporters', type=int, default=8, help='Threads pulling full exports.')
+    parser.add_argument('--bookers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--patients', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'flood.db')}",
+                   LOG_FILE=os.path.join(tmp, 'logs', 'app.log'), LOG_LEVEL='WARNING',
+                   RATE_LIMIT_STORE=os.path.join(tmp, 'rate_limits.db'), ENTITY_CACHE_BACKEND='none')
+        subprocess.run([sys.executable, '-c', PREPARE.format(backend=BACKEND, patients=args.patients)],
+                       env=env, cwd=tmp, check=True, capture_output=True)
+
+        modes = [
+            ('unprotected', dict(RATE_LIMIT_BACKEND='none', ADMISSION_LIMITS='', ADMISSION_DB_LATENCY_MS='0')),
+            ('rate limits + admission control', {}),
+        ]
+        print(f"{args.reporters} reporting threads, {args.bookers} booking clients, {args.seconds:.0f}s per mode")
+        for label, overrides in modes:
+            port = free_port()
+            server = subprocess.Popen([sys.executable, '-c', SERVER.format(backend=BACKEND, port=port)],
+                                      env=dict(env, **overrides), cwd=tmp,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for(port)
+                report(label, *run(port, args.reporters, args.bookers, args.seconds), args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare list serialization paths on Appointment, BillingRecord and Prescription:
+ORM objects + to_dict() + jsonify (the old list endpoints) against Core rows
+through the compiled RowSerializer, with orjson and with stdlib json.
+
+    python benchmarks/serialization.py --rows 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+
+from extensions import db
+from models.appointment import Appointment
+from models.billing import BillingRecord
+from models.doctor import Doctor
+from models.patient import Patient
+from models.prescription import Prescription, Medication
+from utils.money import MoneyJSONEncoder
+from utils.query_options import eager_query
+from utils.serializer import json_response, serializer_for
+
+
+def build_app(path, rows):
+    app = Flask(__name__)
+    app.json_encoder = MoneyJSONEncoder
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    now = datetime.utcnow()
+    stamps = dict(is_active=True, created_at=now, updated_at=now)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            connection.execute(Patient.__table__.insert(), [dict(
+                first_name=f'Patient{i}', last_name='Test', date_of_birth=date(1990, 1, 1), gender='Other',
+                address='12 Long Street, Some Town', phone=f'98{i:08d}', email=f'p{i}@example.com', **stamps
+            ) for i in range(1000)])
+            connection.execute(Doctor.__table__.insert(), [dict(
+                first_name=f'Doctor{i}', last_name='Test', specialization='General', phone=f'97{i:08d}',
+                email=f'd{i}@example.com', **stamps
+            ) for i in range(50)])
+            connection.execute(Appointment.__table__.insert(), [dict(
+                patient_id=i % 1000 + 1, doctor_id=i % 50 + 1, date=f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+                time=f'{9 + i % 8:02d}:00', status='completed', notes='Follow-up visit',
+                created_at=now, updated_at=now
+            ) for i in range(rows)])
+            connection.execute(BillingRecord.__table__.insert(), [dict(
+                patient_id=i % 1000 + 1, total_amount=Decimal('1250.50'), paid_amount=Decimal('500.00'),
+                payment_status='partial', payment_method='card', notes='Consultation', **stamps
+            ) for i in range(rows)])
+            connection.execute(Prescription.__table__.insert(), [dict(
+                patient_id=i % 1000 + 1, doctor_id=i % 50 + 1, diagnosis='Hypertension', notes='Monitor BP', **stamps
+            ) for i in range(rows)])
+            connection.execute(Medication.__table__.insert(), [dict(
+                prescription_id=i // 2 + 1, name=('Lisinopril', 'Aspirin')[i % 2], dosage='10mg',
+                frequency='Once daily', duration='30 days', instructions='Take with water', **stamps
+            ) for i in range(rows * 2)])
+    return app
+
+
+def timed(label, rows, run, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(run().get_data())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        db.session.remove()
+    print(f"  {label:28} {best * 1000:8.1f} ms  {rows / best:10,.0f} rows/s  {size / 1e6:6.1f} MB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'serialization.db'), args.rows)
+        for model in (Appointment, BillingRecord, Prescription):
+            print(f"{model.__name__} x {args.rows:,}")
+            with app.test_request_context():
+                old = timed('ORM + to_dict + jsonify', args.rows,
+                            lambda: jsonify([obj.to_dict() for obj in eager_query(model).order_by(model.id)]),
+                            args.repeat)
+                for backend in ('json', 'orjson'):
+                    app.config['JSON_BACKEND'] = backend
+                    serializer = serializer_for(model)
+                    new = timed(f'Core rows + {backend}', args.rows,
+                                lambda: json_response(serializer.dicts(serializer.query().order_by(model.id))),
+                                args.repeat)
+                print(f"  speed-up with orjson: {old / new:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure cold worker startup in fresh interpreters: importing app, running
+create_app() and serving the first request, against a migrated and seeded
+temporary SQLite database. --legacy adds the schema creation and seeding
+that create_app() used to run in every worker, for comparison. Exits with
+status 1 when the median total exceeds --budget-ms.
+
+    python benchmarks/startup.py --runs 10 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per measurement; prints phase timings as JSON
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+if {legacy!r}:
+    with app.app_context():
+        app_module.migrate_database(app)
+        app_module.seed_sample_data(app.logger)
+created = time.perf_counter()
+response = app.test_client().get('/api/patients')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'create_app': created - imported,
+                  'first_request': served - created, 'total': served - started}}))
+"""
+
+# What `flask migrate` and `flask seed` do, without depending on FLASK_APP discovery
+PREPARE = """
+import sys
+sys.path.insert(0, {backend!r})
+import app as app_module
+app = app_module.create_app()
+with app.app_context():
+    app_module.migrate_database(app)
+    app_module.seed_sample_data(app.logger)
+"""
+
+PHASES = ('import', 'create_app', 'first_request', 'total')
+
+
+def run_child(env, legacy):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(backend=BACKEND, legacy=legacy)],
+        env=env, cwd=env['HMS_BENCH_DIR'], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label, samples):
+    print(label)
+    for phase in PHASES:
+        values = [sample[phase] * 1000 for sample in samples]
+        print(f"  {phase:14} median {statistics.median(values):8.1f} ms  min {min(values):8.1f} ms")
+    return statistics.median(sample['total'] * 1000 for sample in samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--legacy', action='store_true', help='Also time boot with migrate + seed in the worker.')
+    parser.add_argument('--budget-ms', type=float, default=None, help='Fail when the median total exceeds this.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   LOG_FILE=os.path.join(tmp, 'logs', 'app.log'), LOG_LEVEL='WARNING',
+                   DASHBOARD_RECONCILE_SECONDS='0', HMS_BENCH_DIR=tmp)
+        subprocess.run([sys.executable, '-c', PREPARE.format(backend=BACKEND)], env=env, cwd=tmp,
+                       capture_output=True, check=True)
+
+        # One untimed run warms the OS file cache and writes the .pyc files
+        run_child(env, False)
+        median = report(f"create_app() boot, {args.runs} runs", [run_child(env, False) for _ in range(args.runs)])
+        if args.legacy:
+            report("boot with migrate + seed in the worker (previous behaviour)",
+                   [run_child(env, True) for _ in range(args.runs)])
+
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"Median startup {median:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
 import os
 from datetime import timedelta
 
+# Relative paths (LOG_FILE) are resolved against the backend directory, not the CWD
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     # Flask settings
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-please-change-in-production'
@@ -8,10 +11,99 @@ class Config:
     # Database settings
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///hospital.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool (SQLite files and server databases); recycle and pre-ping apply to servers only
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    # SQLite tuning: WAL lets readers run alongside the single writer across worker processes
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # Read replicas for GET requests (comma-separated URLs) and how long a client's
+    # reads stay on the primary after it writes
+    SQLALCHEMY_REPLICA_URIS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    # How often a worker booted against an outdated schema looks again (see `flask migrate`)
+    SCHEMA_RECHECK_SECONDS = int(os.environ.get('SCHEMA_RECHECK_SECONDS', 5))
+    
+    # Route groups to serve: 'all', or a comma-separated subset of app.FEATURE_BLUEPRINTS
+    # (e.g. 'patients,doctors,appointments'); disabled ones are never imported
+    APP_FEATURES = os.environ.get('APP_FEATURES', 'all')
+
+    # Doctor availability slot index
+    AVAILABILITY_SLOT_MINUTES = int(os.environ.get('AVAILABILITY_SLOT_MINUTES', 15))
+    AVAILABILITY_DAY_START = os.environ.get('AVAILABILITY_DAY_START', '08:00')
+    AVAILABILITY_DAY_END = os.environ.get('AVAILABILITY_DAY_END', '18:00')
+    AVAILABILITY_TTL_SECONDS = int(os.environ.get('AVAILABILITY_TTL_SECONDS', 30))
+    AVAILABILITY_MAX_DAYS = 60
+    # Retries of a booking insert that hit a transient database lock
+    BOOKING_RETRIES = int(os.environ.get('BOOKING_RETRIES', 3))
+    
+    # Dashboard aggregates are kept incrementally and recomputed on this interval (0 disables)
+    DASHBOARD_RECONCILE_SECONDS = int(os.environ.get('DASHBOARD_RECONCILE_SECONDS', 300))
+
+    # The analytics_daily rollup is kept per flush and rebuilt on this interval (0 disables)
+    ANALYTICS_RECONCILE_SECONDS = int(os.environ.get('ANALYTICS_RECONCILE_SECONDS', 3600))
+    
+    # Rows fetched per keyset chunk by the streaming export endpoints
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    # Rows per INSERT batch for bulk imports, and how many row errors a report lists
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 5000))
+    BULK_MAX_ERRORS = int(os.environ.get('BULK_MAX_ERRORS', 1000))
+    
+    # Read-through cache for single-entity GETs: 'memory' (per process), 'redis' or 'none'
+    ENTITY_CACHE_BACKEND = os.environ.get('ENTITY_CACHE_BACKEND', 'memory')
+    ENTITY_CACHE_REDIS_URL = os.environ.get('ENTITY_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    ENTITY_CACHE_TTL = int(os.environ.get('ENTITY_CACHE_TTL', 300))
+    ENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('ENTITY_CACHE_MAX_ENTRIES', 10000))
+    
+    # JSON encoder for the list endpoints: 'orjson' (used when installed) or 'json'
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson')
+    
+    # Rate limits per endpoint class ('report', 'list', 'booking', 'auth', 'write', 'read') and JWT role:
+    # ';'-separated 'class[:role]=N per second|minute|hour|day'; classes without an entry are unlimited.
+    # 'report' is exports, bulk imports and analytics; 'list' (unpaginated list dumps, which the
+    # frontend still relies on) is left unlimited until the frontend paginates
+    RATE_LIMITS = os.environ.get(
+        'RATE_LIMITS',
+        'report=30 per minute;report:admin=120 per minute;report:manager=120 per minute;auth=20 per minute'
+    )
+    RATE_LIMIT_ALGORITHM = os.environ.get('RATE_LIMIT_ALGORITHM', 'token_bucket')  # or 'sliding_window'
+    # 'memory' (per process), 'sqlite' (RATE_LIMIT_STORE, shared by the workers on a host) or 'none'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'instance/rate_limits.db')
+    
+    # Concurrent requests per endpoint class and worker; over the cap, requests queue briefly, then get 503
+    ADMISSION_LIMITS = os.environ.get('ADMISSION_LIMITS', 'report=2;auth=4')
+    ADMISSION_QUEUE_SECONDS = float(os.environ.get('ADMISSION_QUEUE_SECONDS', 0.5))
+    # Shed these classes while other requests' DB time per statement averages above this (0 disables)
+    ADMISSION_DB_LATENCY_MS = float(os.environ.get('ADMISSION_DB_LATENCY_MS', 50))
+    ADMISSION_SHED_CLASSES = os.environ.get('ADMISSION_SHED_CLASSES', 'report')
+    
+    # Role given to unauthenticated sign-ups; registering any other role needs an admin JWT
+    SELF_REGISTER_ROLE = os.environ.get('SELF_REGISTER_ROLE', 'patient')
     
-    # Rate limiting
-    RATELIMIT_DEFAULT = "200 per day;50 per hour"
+    # Password hashing for login/register: method for new hashes ('pbkdf2:sha256[:iterations]' or
+    # 'bcrypt[:rounds]'; older hashes are upgraded on login), and the bounded pool it runs on
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    PASSWORD_HASH_POOL = os.environ.get('PASSWORD_HASH_POOL', 'thread')  # or 'process'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes on the request thread
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    # CPU priority of the hashing workers below request threads (Linux nice increment)
+    PASSWORD_HASH_NICE = int(os.environ.get('PASSWORD_HASH_NICE', 10))
     
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
-    LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log') 
\ No newline at end of file
+    LOG_FILE = os.path.join(BASE_DIR, os.environ.get('LOG_FILE', os.path.join('logs', 'app.log')))
+    LOG_ROTATION = os.environ.get('LOG_ROTATION', 'size')  # 'size' or 'time'
+    LOG_ROTATION_WHEN = os.environ.get('LOG_ROTATION_WHEN', 'midnight')
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 10))
+    # Share of records kept per logger; per-request access lines default to 10%
+    LOG_SAMPLE_RATES = {
+        'hms.request': float(os.environ.get('LOG_REQUEST_SAMPLE_RATE', 0.1))
+    } 
\ No newline at end of file
@@ -1,3 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import orm
 
-db = SQLAlchemy() 
\ No newline at end of file
+from utils.db_routing import RoutingSession
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy whose db.session can send read requests to replicas (see utils/db_routing.py)."""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+db = RoutingSQLAlchemy()
@@ -1,17 +1,137 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import random
+from datetime import datetime, timezone
+from flask.logging import default_handler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+# Logger used for the per-request access lines, sampled via LOG_SAMPLE_RATES
+REQUEST_LOGGER = 'hms.request'
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records of selected loggers.
+    `rates` maps a logger name to the share of records kept (0.0 - 1.0);
+    child loggers inherit their parent's rate. WARNING and above are never dropped.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+def _file_handler(app):
+    log_file = app.config.get('LOG_FILE', 'logs/hospital.log')
+    log_dir = os.path.dirname(log_file)
+    if log_dir and not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    backup_count = app.config.get('LOG_BACKUP_COUNT', 10)
+    if app.config.get('LOG_ROTATION', 'size') == 'time':
+        return TimedRotatingFileHandler(
+            log_file, when=app.config.get('LOG_ROTATION_WHEN', 'midnight'), backupCount=backup_count
+        )
+    return RotatingFileHandler(
+        log_file, maxBytes=app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024), backupCount=backup_count
+    )
+
+
+# The running listener and queue handler of each logger we set up. There is one
+# per logger however many apps are created, and the exit and fork hooks below
+# are registered once per process, since neither can ever be unregistered.
+_listeners = {}
+
+
+def _stop_listener(name):
+    entry = _listeners.pop(name, None)
+    if entry:
+        listener = entry[0]
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def _stop_all():
+    for name in list(_listeners):
+        _stop_listener(name)
+
+
+def _restart_in_child():
+    # Workers forked from a preloaded app (gunicorn --preload) inherit the
+    # queues but not the listener threads; give them their own of both
+    for listener, queue_handler in _listeners.values():
+        listener.queue = queue_handler.queue = queue.Queue(-1)
+        listener.start()
+
+
+atexit.register(_stop_all)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_in_child)
+
 
 def setup_logger(app):
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-    
-    file_handler = RotatingFileHandler('logs/hospital.log', maxBytes=10240, backupCount=10)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+    """
+    Route app.logger and the request logger through a queue drained by a
+    background QueueListener, so request threads never block on disk or
+    console I/O. The file gets JSON lines; the console keeps the plain format.
+    Setting up another app in the same process replaces the previous listener.
+    """
+    _stop_listener(app.logger.name)
+
+    file_handler = _file_handler(app)
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(
+        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
     ))
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    
-    app.logger.setLevel(logging.INFO)
-    app.logger.info('Hospital Management System startup') 
\ No newline at end of file
+
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(app.config.get('LOG_SAMPLE_RATES', {})))
+
+    level = getattr(logging, str(app.config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    for logger in (app.logger, logging.getLogger(REQUEST_LOGGER)):
+        for handler in list(logger.handlers):
+            if handler is default_handler or isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+
+    listener.start()
+    _listeners[app.logger.name] = (listener, queue_handler)
+    app.logger.info('Hospital Management System startup')
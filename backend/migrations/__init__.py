@@ -0,0 +1,111 @@
+import importlib
+import os
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select
+from sqlalchemy.exc import DBAPIError
+
+from . import m0001_hot_path_indexes, m0002_unique_scheduled_slot, m0003_exact_billing_amounts, \
+    m0004_patient_search_index, m0005_exact_dashboard_revenue, m0006_analytics_daily_rollup, \
+    m0007_wider_password_hash, m0008_analytics_daily_unique_key
+
+# Ordered list of migration modules. Each exposes VERSION, DESCRIPTION and
+# upgrade(connection), and optionally REBUILDS; upgrades must be idempotent (see
+# ops.create_index) because fresh databases already get the current schema from
+# db.create_all(). Migrations never import models or utils: a migration describes the
+# schema as it was when written, so it keeps its own copy of any table or function.
+MIGRATIONS = [
+    m0001_hot_path_indexes,
+    m0002_unique_scheduled_slot,
+    m0003_exact_billing_amounts,
+    m0004_patient_search_index,
+    m0005_exact_dashboard_revenue,
+    m0006_analytics_daily_rollup,
+    m0007_wider_password_hash,
+    m0008_analytics_daily_unique_key,
+]
+
+# Derived data a migration can ask to recompute by listing names in its REBUILDS.
+# Migrations keep frozen copies of what they need, but these recomputations are the
+# application's own code, so they run once every migration has been applied and the
+# schema is the one that code expects; in this order, as later ones read earlier ones.
+REBUILDS = (
+    ('billing', 'utils.billing_engine', 'rederive_records'),
+    ('dashboard', 'utils.dashboard_aggregates', 'reconcile'),
+    ('analytics', 'utils.analytics_rollup', 'reconcile'),
+)
+
+metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200)),
+    Column('applied_at', DateTime)
+)
+
+
+def current_version(connection):
+    """Return the highest applied migration version, 0 for an unversioned database."""
+    schema_version.create(connection, checkfirst=True)
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def head():
+    """The version the code expects: the last migration's."""
+    return MIGRATIONS[-1].VERSION
+
+
+def _missing_sqlite_file(engine):
+    # Connecting would create an empty database file at the path
+    database = engine.url.database
+    return (engine.dialect.name == 'sqlite' and database not in (None, '', ':memory:')
+            and not database.startswith('file:') and not os.path.exists(database))
+
+
+def applied_version(engine):
+    """
+    The highest applied version with a single SELECT that creates nothing,
+    or None when the database or its schema_version table does not exist.
+    """
+    if _missing_sqlite_file(engine):
+        return None
+    try:
+        with engine.connect() as connection:
+            return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        return None
+
+
+def upgrade(engine, logger=None):
+    """
+    Apply all pending migrations in order, each in its own transaction, then
+    the REBUILDS they asked for in one more.
+    """
+    applied = []
+    requested = set()
+    with engine.begin() as connection:
+        version = current_version(connection)
+
+    for migration in MIGRATIONS:
+        if migration.VERSION <= version:
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(schema_version.insert().values(
+                version=migration.VERSION,
+                description=migration.DESCRIPTION,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration.VERSION)
+        requested.update(getattr(migration, 'REBUILDS', ()))
+        if logger:
+            logger.info(f"Applied migration {migration.VERSION}: {migration.DESCRIPTION}")
+
+    if requested:
+        with engine.begin() as connection:
+            for name, module, function in REBUILDS:
+                if name in requested:
+                    getattr(importlib.import_module(module), function)(connection)
+                    if logger:
+                        logger.info(f"Rebuilt {name} data")
+    return applied
@@ -0,0 +1,48 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, MetaData, String, Table
+
+from .ops import create_index
+
+VERSION = 1
+DESCRIPTION = 'Composite and partial indexes for hot lookup columns'
+
+# The tables as this migration knows them, only the indexed columns; later model
+# changes must not change what it creates
+metadata = MetaData()
+appointments = Table('appointments', metadata, Column('patient_id', Integer), Column('doctor_id', Integer),
+                     Column('date', String(10)), Column('time', String(5)), Column('status', String(20)))
+prescriptions = Table('prescriptions', metadata, Column('patient_id', Integer), Column('is_active', Boolean),
+                      Column('created_at', DateTime))
+medications = Table('medications', metadata, Column('prescription_id', Integer))
+lab_tests = Table('lab_tests', metadata, Column('patient_id', Integer), Column('doctor_id', Integer),
+                  Column('is_active', Boolean), Column('created_at', DateTime))
+billing_records = Table('billing_records', metadata, Column('patient_id', Integer), Column('is_active', Boolean),
+                        Column('created_at', DateTime), Column('paid_amount', Float))
+billing_items = Table('billing_items', metadata, Column('billing_record_id', Integer), Column('is_active', Boolean))
+inventory_items = Table('inventory_items', metadata, Column('quantity', Integer), Column('minimum_stock', Integer),
+                        Column('is_active', Boolean))
+
+INDEXES = [
+    Index('ix_appointments_doctor_slot', appointments.c.doctor_id, appointments.c.date, appointments.c.time,
+          appointments.c.status),
+    Index('ix_appointments_patient_id', appointments.c.patient_id),
+    Index('ix_appointments_date', appointments.c.date),
+    Index('ix_prescriptions_patient_active', prescriptions.c.patient_id, prescriptions.c.is_active,
+          prescriptions.c.created_at),
+    Index('ix_prescriptions_active_created', prescriptions.c.is_active, prescriptions.c.created_at),
+    Index('ix_medications_prescription_id', medications.c.prescription_id),
+    Index('ix_lab_tests_active_created', lab_tests.c.is_active, lab_tests.c.created_at),
+    Index('ix_lab_tests_patient_id', lab_tests.c.patient_id),
+    Index('ix_lab_tests_doctor_id', lab_tests.c.doctor_id),
+    Index('ix_billing_records_active_created', billing_records.c.is_active, billing_records.c.created_at,
+          billing_records.c.paid_amount),
+    Index('ix_billing_records_patient_id', billing_records.c.patient_id),
+    Index('ix_billing_items_record_active', billing_items.c.billing_record_id, billing_items.c.is_active),
+    Index('ix_inventory_items_low_stock', inventory_items.c.quantity - inventory_items.c.minimum_stock,
+          sqlite_where=inventory_items.c.is_active == True,
+          postgresql_where=inventory_items.c.is_active == True),
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        create_index(connection, index)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, func, select, text
+
+from .ops import create_index
+
+VERSION = 2
+DESCRIPTION = 'Unique partial index: one scheduled appointment per doctor slot'
+
+# appointments as this migration knows it, only the columns it reads and indexes
+metadata = MetaData()
+appointments = Table('appointments', metadata, Column('doctor_id', Integer), Column('date', String(10)),
+                     Column('time', String(5)), Column('status', String(20)))
+
+SCHEDULED_SLOT = Index('uq_appointments_scheduled_slot', appointments.c.doctor_id, appointments.c.date,
+                       appointments.c.time, unique=True,
+                       sqlite_where=text("status = 'scheduled'"),
+                       postgresql_where=text("status = 'scheduled'"))
+
+
+def upgrade(connection):
+    table = appointments
+    duplicates = connection.execute(
+        select(table.c.doctor_id, table.c.date, table.c.time, func.count())
+        .where(table.c.status == 'scheduled')
+        .group_by(table.c.doctor_id, table.c.date, table.c.time)
+        .having(func.count() > 1)
+    ).fetchall()
+    if duplicates:
+        slots = ', '.join(f"doctor {row[0]} on {row[1]} at {row[2]}" for row in duplicates[:20])
+        raise RuntimeError(
+            f"Cannot add uq_appointments_scheduled_slot: {len(duplicates)} slot(s) are double-booked "
+            f"({slots}). Cancel or move the extra appointments and restart."
+        )
+
+    create_index(connection, SCHEDULED_SLOT)
@@ -0,0 +1,24 @@
+from sqlalchemy import text
+
+VERSION = 3
+DESCRIPTION = 'Exact NUMERIC(12, 2) billing amounts with derived totals and payment statuses'
+
+COLUMNS = {
+    'billing_records': ['total_amount', 'paid_amount'],
+    'billing_items': ['unit_price', 'total_price'],
+}
+
+# The billing engine applies deltas, so existing totals must match their items; the
+# dashboard and analytics totals follow the re-derived amounts
+REBUILDS = ('billing', 'dashboard', 'analytics')
+
+
+def upgrade(connection):
+    # SQLite has no column types to alter; the Numeric type quantizes on read
+    if connection.dialect.name == 'postgresql':
+        for table, columns in COLUMNS.items():
+            for column in columns:
+                connection.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE NUMERIC(12, 2) "
+                    f"USING round({column}::numeric, 2)"
+                ))
@@ -0,0 +1,90 @@
+import re
+
+from sqlalchemy import bindparam, column, or_, select, table, text, update
+
+from .ops import add_column
+
+VERSION = 4
+DESCRIPTION = 'Patient name_phonetic column and FTS5 trigram search index'
+
+BACKFILL_CHUNK = 5000
+
+# Frozen copies of utils.patient_search as of this migration: the index and the
+# backfilled keys must not change when the search code does
+FTS_TABLE = 'patients_fts'
+FTS_COLUMNS = ('first_name', 'last_name', 'phone', 'email', 'name_phonetic')
+
+patients = table('patients', column('id'), column('first_name'), column('last_name'), column('name_phonetic'))
+
+_SOUNDEX = {letter: str(digit) for digit, letters in enumerate(
+    ('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+_TOKEN = re.compile(r"[^\s,;]+")
+
+
+def _soundex(word):
+    letters = [c for c in word.lower() if c.isalpha() and c.isascii()]
+    if not letters:
+        return ''
+    code, previous = [letters[0].upper()], _SOUNDEX.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = _SOUNDEX.get(letter, '')
+        if digit and digit != '0' and digit != previous:
+            code.append(digit)
+        if letter not in 'hw':
+            previous = digit
+    return (''.join(code) + '000')[:4]
+
+
+def _phonetic_key(*names):
+    codes = [_soundex(word) for name in names if name for word in _TOKEN.findall(name)]
+    return ' '.join(code for code in codes if code)
+
+
+def _add_phonetic_column(connection):
+    add_column(connection, 'patients', 'name_phonetic', "VARCHAR(100) DEFAULT ''")
+    missing = or_(patients.c.name_phonetic.is_(None), patients.c.name_phonetic == '')
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(patients.c.id, patients.c.first_name, patients.c.last_name)
+            .where(patients.c.id > last_id, missing).order_by(patients.c.id).limit(BACKFILL_CHUNK)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            update(patients).where(patients.c.id == bindparam('row_id')).values(name_phonetic=bindparam('key')),
+            [{'row_id': row.id, 'key': _phonetic_key(row.first_name, row.last_name)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def _create_fts(connection):
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, content='patients', content_rowid='id', tokenize='trigram')"
+    ))
+    # External-content index: triggers keep it in step with every write, ORM or Core
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON patients BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON patients BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON patients BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    ))
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def upgrade(connection):
+    _add_phonetic_column(connection)
+    # FTS5 is SQLite only; other databases use the prefix search fallback
+    if connection.dialect.name == 'sqlite':
+        _create_fts(connection)
@@ -0,0 +1,15 @@
+from sqlalchemy import text
+
+VERSION = 5
+DESCRIPTION = 'Exact NUMERIC(12, 2) dashboard aggregates, recomputed from the source tables'
+
+# Drops the float drift in total_revenue and counts soft-deleted patients again
+REBUILDS = ('dashboard',)
+
+
+def upgrade(connection):
+    # SQLite has no column types to alter; the Numeric type quantizes on read
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            "ALTER TABLE dashboard_aggregates ALTER COLUMN value TYPE NUMERIC(12, 2) USING round(value::numeric, 2)"
+        ))
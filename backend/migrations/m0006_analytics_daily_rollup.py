@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Numeric, String, Table
+
+from .ops import create_index
+
+VERSION = 6
+DESCRIPTION = 'analytics_daily rollup for /api/dashboard/analytics, built from the source tables'
+
+# analytics_daily as first created; migration 8 gives it its unique key
+metadata = MetaData()
+analytics_daily = Table(
+    'analytics_daily', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('metric', String(20), nullable=False),
+    Column('dimension', String(20), nullable=False),
+    Column('day', String(10), nullable=False),
+    Column('group_key', String(100)),
+    Column('count', Integer, nullable=False, default=0),
+    Column('quantity', Integer),
+    Column('amount', Numeric(12, 2)),
+    Column('collected', Numeric(12, 2)),
+    Column('outstanding', Numeric(12, 2)),
+    Index('ix_analytics_daily_lookup', 'metric', 'dimension', 'day'),
+)
+lab_tests = Table('lab_tests', metadata, Column('test_date', DateTime))
+
+REBUILDS = ('analytics',)
+
+
+def upgrade(connection):
+    analytics_daily.create(connection, checkfirst=True)
+    create_index(connection, Index('ix_lab_tests_test_date', lab_tests.c.test_date))
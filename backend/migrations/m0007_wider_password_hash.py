@@ -0,0 +1,10 @@
+from sqlalchemy import text
+
+VERSION = 7
+DESCRIPTION = 'Widen users.password_hash to VARCHAR(255) for pbkdf2:sha512 and other long hashes'
+
+
+def upgrade(connection):
+    # SQLite does not enforce VARCHAR lengths
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("ALTER TABLE users ALTER COLUMN password_hash TYPE VARCHAR(255)"))
@@ -0,0 +1,24 @@
+from sqlalchemy import text
+
+VERSION = 8
+DESCRIPTION = 'Unique analytics_daily key for per-flush delta upserts; index billing_records.appointment_id'
+
+
+def upgrade(connection):
+    # '' replaces NULL group keys: NULLs never conflict, so they could not be upserted
+    connection.execute(text("UPDATE analytics_daily SET group_key = '' WHERE group_key IS NULL"))
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("ALTER TABLE analytics_daily ALTER COLUMN group_key SET NOT NULL"))
+    # Concurrent day rebuilds could insert a key twice; the copies are identical, keep one
+    connection.execute(text(
+        "DELETE FROM analytics_daily WHERE id NOT IN "
+        "(SELECT min(id) FROM analytics_daily GROUP BY metric, dimension, day, group_key)"
+    ))
+    connection.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_analytics_daily_key "
+        "ON analytics_daily (metric, dimension, day, group_key)"
+    ))
+    connection.execute(text("DROP INDEX IF EXISTS ix_analytics_daily_lookup"))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_billing_records_appointment_id ON billing_records (appointment_id)"
+    ))
@@ -0,0 +1,29 @@
+from sqlalchemy import inspect, text
+
+
+def index_exists(connection, name):
+    """Check for an index by name, including expression indexes that reflection skips."""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        query = text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name")
+    elif dialect == 'postgresql':
+        query = text("SELECT 1 FROM pg_indexes WHERE indexname = :name")
+    else:
+        inspector = inspect(connection)
+        return any(
+            index['name'] == name
+            for table in inspector.get_table_names()
+            for index in inspector.get_indexes(table)
+        )
+    return connection.execute(query, {'name': name}).first() is not None
+
+
+def create_index(connection, index):
+    if not index_exists(connection, index.name):
+        index.create(connection)
+
+
+def add_column(connection, table, name, ddl):
+    """ALTER TABLE ... ADD COLUMN unless `table` already has `name` (fresh create_all databases do)."""
+    if name not in {column['name'] for column in inspect(connection).get_columns(table)}:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
@@ -9,6 +9,8 @@ from .inventory import InventoryItem
 from .lab_test import LabTest
 from .prescription import Prescription
 from .user import User
+from .dashboard_aggregate import DashboardAggregate
+from .analytics_daily import AnalyticsDaily
 
 # Make all models available at the package level
 __all__ = [
@@ -21,7 +23,9 @@ __all__ = [
     'InventoryItem',
     'LabTest',
     'Prescription',
-    'User'
+    'User',
+    'DashboardAggregate',
+    'AnalyticsDaily'
 ]
 
 # This file makes the models directory a proper Python package 
\ No newline at end of file
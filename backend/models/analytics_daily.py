@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Numeric, Index
+from extensions import db
+
+class AnalyticsDaily(db.Model):
+    __tablename__ = 'analytics_daily'
+
+    id = Column(Integer, primary_key=True)
+    metric = Column(String(20), nullable=False)     # revenue, billing_items, appointments, lab_tests
+    dimension = Column(String(20), nullable=False)  # 'total' or the group_by it is split by
+    day = Column(String(10), nullable=False)        # Format: YYYY-MM-DD
+    group_key = Column(String(100), nullable=False, default='')  # The group's value as text; '' for 'total' or NULL
+    count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer)
+    # Billed (revenue) or item amount (billing_items)
+    amount = Column(Numeric(12, 2))
+    collected = Column(Numeric(12, 2))
+    outstanding = Column(Numeric(12, 2))
+
+    __table_args__ = (
+        # One row per key, so flushes can add their deltas with INSERT ... ON CONFLICT DO UPDATE;
+        # its (metric, dimension, day) prefix serves the analytics reads
+        Index('uq_analytics_daily_key', 'metric', 'dimension', 'day', 'group_key', unique=True),
+    )
+
+    def to_dict(self):
+        return {
+            'metric': self.metric,
+            'dimension': self.dimension,
+            'day': self.day,
+            'group_key': self.group_key,
+            'count': self.count,
+            'quantity': self.quantity,
+            'amount': self.amount,
+            'collected': self.collected,
+            'outstanding': self.outstanding
+        }
@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index
+from sqlalchemy import text
 from sqlalchemy.orm import relationship
 from extensions import db
 
@@ -17,6 +18,17 @@ class Appointment(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # check_doctor_availability: doctor_id + date + time + status
+        Index('ix_appointments_doctor_slot', 'doctor_id', 'date', 'time', 'status'),
+        Index('ix_appointments_patient_id', 'patient_id'),
+        Index('ix_appointments_date', 'date'),
+        # At most one scheduled appointment per doctor slot
+        Index('uq_appointments_scheduled_slot', 'doctor_id', 'date', 'time', unique=True,
+              sqlite_where=text("status = 'scheduled'"),
+              postgresql_where=text("status = 'scheduled'")),
+    )
+
     # Relationships
     patient = relationship('Patient', backref='appointments')
     doctor = relationship('Doctor', backref='appointments')
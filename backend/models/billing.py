@@ -1,16 +1,22 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from extensions import db
 
+# SQLite stores NUMERIC as REAL (SQLAlchemy warns about it); amounts are quantized
+# to cents on read and all arithmetic happens on Decimal, which is exact for any
+# realistic invoice total. Production databases store NUMERIC exactly.
+
 class BillingRecord(db.Model):
     __tablename__ = 'billing_records'
 
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
     appointment_id = Column(Integer, ForeignKey('appointments.id'), nullable=True)
-    total_amount = Column(Float, nullable=False)
-    paid_amount = Column(Float, default=0.0)
+    # Money is exact: total_amount is the sum of active items and payment_status is
+    # derived from paid_amount, both maintained by utils.billing_engine
+    total_amount = Column(Numeric(12, 2), nullable=False)
+    paid_amount = Column(Numeric(12, 2), default=0)
     payment_status = Column(String(20), default='pending')  # pending, partial, paid
     payment_method = Column(String(50))  # cash, card, insurance, etc.
     insurance_provider = Column(String(100))
@@ -20,6 +26,14 @@ class BillingRecord(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Dashboard revenue sums filter on is_active + created_at; paid_amount makes it covering
+        Index('ix_billing_records_active_created', 'is_active', 'created_at', 'paid_amount'),
+        Index('ix_billing_records_patient_id', 'patient_id'),
+        # Bills follow their appointment's doctor in the analytics rollup
+        Index('ix_billing_records_appointment_id', 'appointment_id'),
+    )
+
     # Relationships
     patient = relationship('Patient', backref='billing_records')
     appointment = relationship('Appointment', backref='billing_records')
@@ -49,12 +63,16 @@ class BillingItem(db.Model):
     item_type = Column(String(50), nullable=False)  # consultation, procedure, medication, test, etc.
     description = Column(String(200), nullable=False)
     quantity = Column(Integer, default=1)
-    unit_price = Column(Float, nullable=False)
-    total_price = Column(Float, nullable=False)
+    unit_price = Column(Numeric(12, 2), nullable=False)
+    total_price = Column(Numeric(12, 2), nullable=False)  # quantity * unit_price, set by the billing engine
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_billing_items_record_active', 'billing_record_id', 'is_active'),
+    )
+
     # Relationship
     billing_record = relationship('BillingRecord', backref='items')
 
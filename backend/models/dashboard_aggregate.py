@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Numeric, DateTime
+from extensions import db
+
+class DashboardAggregate(db.Model):
+    __tablename__ = 'dashboard_aggregates'
+
+    key = Column(String(50), primary_key=True)
+    # Exact like the billing amounts it sums; the count keys are whole numbers
+    value = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'value': self.value,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index
 from extensions import db
 
 class InventoryItem(db.Model):
@@ -32,4 +32,13 @@ class InventoryItem(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        } 
\ No newline at end of file
+        } 
+
+# Partial expression index for get_low_stock_items, which filters on
+# quantity - minimum_stock <= 0 among active items
+Index(
+    'ix_inventory_items_low_stock',
+    InventoryItem.quantity - InventoryItem.minimum_stock,
+    sqlite_where=InventoryItem.is_active == True,
+    postgresql_where=InventoryItem.is_active == True
+)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from extensions import db
 
@@ -19,6 +19,14 @@ class LabTest(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_lab_tests_active_created', 'is_active', 'created_at'),
+        Index('ix_lab_tests_patient_id', 'patient_id'),
+        Index('ix_lab_tests_doctor_id', 'doctor_id'),
+        # Rebuilding one day of the lab_tests analytics rollup
+        Index('ix_lab_tests_test_date', 'test_date'),
+    )
+
     # Relationships
     patient = relationship('Patient', back_populates='lab_tests')
     doctor = relationship('Doctor', back_populates='lab_tests')
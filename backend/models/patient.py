@@ -17,6 +17,8 @@ class Patient(db.Model):
     address = Column(String(200), nullable=False, default='')
     phone = Column(String(15), nullable=False)
     email = Column(String(100), nullable=False, default='')
+    # Soundex codes of the name words, for typo/phonetic search (utils.patient_search)
+    name_phonetic = Column(String(100), default='')
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
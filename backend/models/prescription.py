@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from extensions import db
 
@@ -17,6 +17,10 @@ class Medication(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_medications_prescription_id', 'prescription_id'),
+    )
+
     prescription = relationship('Prescription', back_populates='medications')
 
     def to_dict(self):
@@ -44,6 +48,12 @@ class Prescription(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # get_prescriptions_by_patient: patient_id + is_active, newest first
+        Index('ix_prescriptions_patient_active', 'patient_id', 'is_active', 'created_at'),
+        Index('ix_prescriptions_active_created', 'is_active', 'created_at'),
+    )
+
     patient = relationship('Patient', back_populates='prescriptions')
     doctor = relationship('Doctor', back_populates='prescriptions')
     medications = relationship('Medication', back_populates='prescription', cascade='all, delete-orphan')
@@ -1,7 +1,7 @@
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.passwords import hash_password, needs_rehash, verify_password
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -9,17 +9,24 @@ class User(db.Model):
     id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(100), unique=True, nullable=True)
-    password_hash = Column(String(128), nullable=False)
+    password_hash = Column(String(255), nullable=False)  # pbkdf2:sha512 hashes run past 160 chars
     role = Column(String(20), nullable=False)  # 'admin', 'doctor', 'staff'
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Hashing runs on the app's bounded pool and raises PasswordPoolBusy when it is saturated
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
+
+    def rehash_password(self, password):
+        self.password_hash = hash_password(password, rehash=True)
 
     def to_dict(self):
         return {
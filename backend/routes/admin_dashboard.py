@@ -1,10 +1,9 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
 # from flask_jwt_extended import jwt_required
-# from utils.rbac import role_required
-from models.patient import Patient
-from models.appointment import Appointment
-from models.billing import BillingRecord
-from models.inventory import InventoryItem
+from utils.rbac import role_required
+from models.dashboard_aggregate import DashboardAggregate
+from utils import dashboard_aggregates
+from utils.conditional import not_modified
 
 admin_dashboard_bp = Blueprint('admin_dashboard', __name__)
 
@@ -12,14 +11,100 @@ admin_dashboard_bp = Blueprint('admin_dashboard', __name__)
 # @jwt_required()
 # @role_required('admin', 'manager')
 def admin_stats():
-    total_patients = Patient.query.count()
-    total_appointments = Appointment.query.count()
-    total_revenue = BillingRecord.query.with_entities(BillingRecord.total_amount).all()
-    total_revenue = sum([r[0] for r in total_revenue]) if total_revenue else 0
-    inventory_count = InventoryItem.query.count()
+    # Polled by the admin dashboard; answer 304 until an aggregate row changes
+    response = not_modified(DashboardAggregate.query, DashboardAggregate)
+    if response is not None:
+        return response
+    # Served from the incrementally maintained dashboard_aggregates table
+    stats = dashboard_aggregates.snapshot()
     return jsonify({
-        'total_patients': total_patients,
-        'total_appointments': total_appointments,
-        'total_revenue': total_revenue,
-        'inventory_count': inventory_count
+        'total_patients': stats['total_patients'],
+        'total_appointments': stats['total_appointments'],
+        'total_revenue': stats['total_revenue'],
+        'inventory_count': stats['inventory_count']
     })
+
+@admin_dashboard_bp.route('/api/admin/perf', methods=['GET'])
+@role_required('admin')
+def perf_stats():
+    return jsonify(current_app.extensions['db_metrics'].snapshot())
+
+@admin_dashboard_bp.route('/api/admin/perf', methods=['DELETE'])
+@role_required('admin')
+def reset_perf_stats():
+    current_app.extensions['db_metrics'].reset()
+    return '', 204
+
+@admin_dashboard_bp.route('/api/admin/pool', methods=['GET'])
+@role_required('admin')
+def pool_stats():
+    return jsonify(current_app.extensions['pool_metrics'].snapshot())
+
+@admin_dashboard_bp.route('/api/admin/pool', methods=['DELETE'])
+@role_required('admin')
+def reset_pool_stats():
+    current_app.extensions['pool_metrics'].reset()
+    return '', 204
+
+@admin_dashboard_bp.route('/api/admin/replicas', methods=['GET'])
+@role_required('admin')
+def replica_stats():
+    router = current_app.extensions.get('db_replicas')
+    if router is None:
+        return jsonify({'replicas': []})
+    return jsonify(router.snapshot())
+
+@admin_dashboard_bp.route('/api/admin/replicas', methods=['DELETE'])
+@role_required('admin')
+def reset_replica_stats():
+    router = current_app.extensions.get('db_replicas')
+    if router is not None:
+        router.reset()
+    return '', 204
+
+@admin_dashboard_bp.route('/api/admin/cache', methods=['GET'])
+@role_required('admin')
+def cache_stats():
+    cache = current_app.extensions.get('entity_cache')
+    if cache is None:
+        return jsonify({'backend': 'none'})
+    return jsonify(cache.stats())
+
+@admin_dashboard_bp.route('/api/admin/cache', methods=['DELETE'])
+@role_required('admin')
+def clear_cache():
+    cache = current_app.extensions.get('entity_cache')
+    if cache is not None:
+        cache.clear()
+    return '', 204
+
+@admin_dashboard_bp.route('/api/admin/limits', methods=['GET'])
+@role_required('admin')
+def limit_stats():
+    limiter = current_app.extensions.get('rate_limiter')
+    admission = current_app.extensions.get('admission')
+    return jsonify({
+        'rate_limits': limiter.snapshot() if limiter is not None else None,
+        'admission': admission.snapshot() if admission is not None else None
+    })
+
+@admin_dashboard_bp.route('/api/admin/limits', methods=['DELETE'])
+@role_required('admin')
+def reset_limits():
+    # Clears the counters and every client's quota state
+    for name in ('rate_limiter', 'admission'):
+        extension = current_app.extensions.get(name)
+        if extension is not None:
+            extension.reset()
+    return '', 204
+
+@admin_dashboard_bp.route('/api/admin/password-hashing', methods=['GET'])
+@role_required('admin')
+def password_hashing_stats():
+    return jsonify(current_app.extensions['password_hasher'].snapshot())
+
+@admin_dashboard_bp.route('/api/admin/password-hashing', methods=['DELETE'])
+@role_required('admin')
+def reset_password_hashing_stats():
+    current_app.extensions['password_hasher'].reset()
+    return '', 204
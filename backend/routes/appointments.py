@@ -1,17 +1,46 @@
 from flask import Blueprint, request, jsonify, current_app
 from models.appointment import Appointment
 from extensions import db
+from sqlalchemy.exc import IntegrityError, OperationalError
+from utils.query_options import eager_query
+from utils.availability import availability_index, slot_key
+from utils.pagination import PaginationError, filter_query, page_window, paginate, page_body
+from utils.conditional import not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
 from datetime import datetime
+import random
+import time
 
 appointments_bp = Blueprint('appointments', __name__)
 
+SLOT_TAKEN = 'Time slot is already booked for this doctor'
+
+def is_slot_conflict(error):
+    """Whether an IntegrityError came from uq_appointments_scheduled_slot."""
+    message = str(error.orig)
+    return 'uq_appointments_scheduled_slot' in message or \
+        'UNIQUE constraint failed: appointments.doctor_id, appointments.date, appointments.time' in message
+
+def is_lock_error(error):
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'deadlock' in message or 'could not serialize' in message
+
 @appointments_bp.route('/appointments', methods=['GET'])
 def get_appointments():
     try:
         current_app.logger.info("Attempting to fetch all appointments")
-        appointments = Appointment.query.all()
-        current_app.logger.info(f"Successfully fetched {len(appointments)} appointments")
-        return jsonify([appointment.to_dict() for appointment in appointments])
+        sort = (Appointment.id,)
+        serializer = serializer_for(Appointment, required=sort, **requested_projection(Appointment))
+        query = filter_query(serializer.query(), Appointment,
+                             date_column=Appointment.date, status_column=Appointment.status)
+        response = not_modified(page_window(query, sort)[0], Appointment)
+        if response is not None:
+            return response
+        page = paginate(query, sort)
+        current_app.logger.info(f"Successfully fetched {len(page.items)} appointments")
+        return json_response(page_body(page, serializer.dicts(page.items)))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching appointments: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -20,9 +49,14 @@ def get_appointments():
 def get_appointment(id):
     try:
         current_app.logger.info(f"Attempting to fetch appointment with id {id}")
-        appointment = Appointment.query.get_or_404(id)
+        response = not_modified(Appointment.query.filter_by(id=id), Appointment)
+        if response is not None:
+            return response
+        appointment = eager_query(Appointment, 'detail').get_or_404(id)
         current_app.logger.info(f"Successfully fetched appointment {id}")
-        return jsonify(appointment.to_dict())
+        return jsonify(project(appointment.to_dict(), Appointment))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching appointment {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -31,7 +65,7 @@ def get_appointment(id):
 def create_appointment():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Attempting to create appointment with data: {data}")
+        current_app.logger.debug("Attempting to create appointment with data: %s", data)
         
         # Validate required fields
         required_fields = ['patient_id', 'doctor_id', 'date', 'time']
@@ -40,15 +74,41 @@ def create_appointment():
                 current_app.logger.error(f"Missing required field: {field}")
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        appointment = Appointment(
-            patient_id=data['patient_id'],
-            doctor_id=data['doctor_id'],
-            date=data['date'],
-            time=data['time'],
-            notes=data.get('notes', '')
-        )
-        db.session.add(appointment)
-        db.session.commit()
+        # The slot index is a per-process hint (it can lag other workers' cancellations, and an
+        # off-grid booking marks its whole slot); confirm a hit exactly before rejecting without a write
+        index = availability_index()
+        if index.is_taken(int(data['doctor_id']), data['date'], data['time']):
+            if Appointment.query.filter_by(doctor_id=data['doctor_id'], date=data['date'], time=data['time'],
+                                           status='scheduled').first() is not None:
+                return jsonify({'error': SLOT_TAKEN}), 409
+            index.release(int(data['doctor_id']), data['date'])
+        
+        # The unique index decides; transient lock errors are retried with jittered backoff
+        retries = current_app.config.get('BOOKING_RETRIES', 3)
+        for attempt in range(retries + 1):
+            appointment = Appointment(
+                patient_id=data['patient_id'],
+                doctor_id=data['doctor_id'],
+                date=data['date'],
+                time=data['time'],
+                notes=data.get('notes', '')
+            )
+            db.session.add(appointment)
+            try:
+                db.session.commit()
+                break
+            except IntegrityError as e:
+                db.session.rollback()
+                if is_slot_conflict(e):
+                    current_app.logger.info(f"Rejected double booking for doctor {data['doctor_id']} at {data['date']} {data['time']}")
+                    return jsonify({'error': SLOT_TAKEN}), 409
+                raise
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_lock_error(e) or attempt == retries:
+                    raise
+                time.sleep(0.01 * 2 ** attempt * (1 + random.random()))
+        availability_index().apply_change(None, slot_key(appointment))
         current_app.logger.info(f"Successfully created appointment with id {appointment.id}")
         return jsonify(appointment.to_dict()), 201
     except Exception as e:
@@ -60,8 +120,9 @@ def create_appointment():
 def update_appointment(id):
     try:
         current_app.logger.info(f"Attempting to update appointment with id {id}")
-        appointment = Appointment.query.get_or_404(id)
+        appointment = eager_query(Appointment, 'detail').get_or_404(id)
         data = request.get_json()
+        before = slot_key(appointment)
         
         if 'patient_id' in data:
             appointment.patient_id = data['patient_id']
@@ -76,7 +137,14 @@ def update_appointment(id):
         if 'notes' in data:
             appointment.notes = data['notes']
         
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_slot_conflict(e):
+                return jsonify({'error': SLOT_TAKEN}), 409
+            raise
+        availability_index().apply_change(before, slot_key(appointment))
         current_app.logger.info(f"Successfully updated appointment with id {id}")
         return jsonify(appointment.to_dict())
     except Exception as e:
@@ -89,8 +157,10 @@ def delete_appointment(id):
     try:
         current_app.logger.info(f"Attempting to delete appointment with id {id}")
         appointment = Appointment.query.get_or_404(id)
+        before = slot_key(appointment)
         db.session.delete(appointment)
         db.session.commit()
+        availability_index().apply_change(before, None)
         current_app.logger.info(f"Successfully deleted appointment with id {id}")
         return '', 204
     except Exception as e:
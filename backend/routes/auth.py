@@ -1,22 +1,34 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity, verify_jwt_in_request
 from models.user import User
+from utils.passwords import PasswordPoolBusy
 from extensions import db
 from datetime import timedelta
 
 auth_bp = Blueprint('auth', __name__)
 
+def _hashing_busy():
+    response = jsonify({'error': 'Too many logins in progress, please retry shortly'})
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
+    # Anyone may sign up, but only with SELF_REGISTER_ROLE; any other role takes an admin's token
+    verify_jwt_in_request(optional=True)
     try:
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['username', 'password', 'role']
+        required_fields = ['username', 'password']
         missing_fields = [field for field in required_fields if field not in data]
         if missing_fields:
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
         
+        role = data.get('role') or current_app.config['SELF_REGISTER_ROLE']
+        if role != current_app.config['SELF_REGISTER_ROLE'] and get_jwt().get('role') != 'admin':
+            return jsonify({'error': 'Access forbidden: only an admin can register this role'}), 403
+        
         # Check if username already exists
         if User.query.filter_by(username=data['username']).first():
             return jsonify({'error': 'Username already exists'}), 400
@@ -30,7 +42,7 @@ def register():
         user = User(
             username=data['username'],
             email=data.get('email'),  # Optional email
-            role=data['role']
+            role=role
         )
         user.set_password(data['password'])
         
@@ -38,6 +50,8 @@ def register():
         db.session.commit()
         
         return jsonify({'message': 'User registered successfully'}), 201
+    except PasswordPoolBusy:
+        return _hashing_busy()
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error registering user: {str(e)}")
@@ -60,9 +74,20 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'User account is inactive'}), 403
         
+        # Upgrade hashes made with older parameters (PASSWORD_HASH_METHOD) while we have the password
+        if user.password_needs_rehash():
+            try:
+                user.rehash_password(data['password'])
+                db.session.commit()
+            except PasswordPoolBusy:
+                pass
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Error rehashing password for user {user.id}: {str(e)}")
+        
         # Create access token
         access_token = create_access_token(
-            identity=user.id,
+            identity=str(user.id),
             additional_claims={'role': user.role},
             expires_delta=timedelta(hours=24)
         )
@@ -71,6 +96,8 @@ def login():
             'access_token': access_token,
             'user': user.to_dict()
         }), 200
+    except PasswordPoolBusy:
+        return _hashing_busy()
     except Exception as e:
         current_app.logger.error(f"Error logging in: {str(e)}")
         return jsonify({'error': 'Failed to login'}), 500
@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
 from models.billing import BillingRecord, BillingItem
 from extensions import db
+from utils.query_options import eager_query
+from utils.pagination import PaginationError, filter_query, page_window, paginate, page_body
+from utils.conditional import not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
+from utils.batch_writes import BatchError, apply_batch
+from utils.money import to_money
+from decimal import InvalidOperation
 from datetime import datetime
 
 billing_bp = Blueprint('billing', __name__)
@@ -10,9 +17,18 @@ billing_bp = Blueprint('billing', __name__)
 def get_billing_records():
     try:
         current_app.logger.info("Attempting to fetch all billing records")
-        records = BillingRecord.query.filter_by(is_active=True).all()
-        current_app.logger.info(f"Successfully fetched {len(records)} billing records")
-        return jsonify([record.to_dict() for record in records])
+        sort = (BillingRecord.id,)
+        serializer = serializer_for(BillingRecord, required=sort, **requested_projection(BillingRecord))
+        query = filter_query(serializer.query().filter(BillingRecord.is_active == True), BillingRecord,
+                             date_column=BillingRecord.created_at, status_column=BillingRecord.payment_status)
+        response = not_modified(page_window(query, sort)[0], BillingRecord)
+        if response is not None:
+            return response
+        page = paginate(query, sort)
+        current_app.logger.info(f"Successfully fetched {len(page.items)} billing records")
+        return json_response(page_body(page, serializer.dicts(page.items)))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching billing records: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -21,9 +37,14 @@ def get_billing_records():
 def get_billing_record(id):
     try:
         current_app.logger.info(f"Attempting to fetch billing record with id {id}")
-        record = BillingRecord.query.get_or_404(id)
+        response = not_modified(BillingRecord.query.filter_by(id=id), BillingRecord)
+        if response is not None:
+            return response
+        record = eager_query(BillingRecord, 'detail').get_or_404(id)
         current_app.logger.info(f"Successfully fetched billing record {id}")
-        return jsonify(record.to_dict())
+        return jsonify(project(record.to_dict(), BillingRecord))
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching billing record {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -32,7 +53,7 @@ def get_billing_record(id):
 def create_billing_record():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Attempting to create billing record with data: {data}")
+        current_app.logger.debug("Attempting to create billing record with data: %s", data)
         
         # Validate required fields
         required_fields = ['patient_id', 'total_amount']
@@ -85,6 +106,32 @@ def update_billing_record(id):
         current_app.logger.error(f"Error updating billing record {id}: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+@billing_bp.route('/billing/<int:id>/payments', methods=['POST'])
+def record_payment(id):
+    try:
+        record = BillingRecord.query.get(id)
+        if not record or not record.is_active:
+            return jsonify({'error': 'Billing record not found'}), 404
+        data = request.get_json() or {}
+        try:
+            amount = to_money(data.get('amount'))
+        except InvalidOperation:
+            return jsonify({'error': 'amount must be a number'}), 400
+        if amount <= 0:
+            return jsonify({'error': 'amount must be greater than zero'}), 400
+        
+        # Flushed as paid_amount = paid_amount + amount, with payment_status derived in the same UPDATE
+        record.paid_amount = to_money(record.paid_amount) + amount
+        if data.get('payment_method'):
+            record.payment_method = data['payment_method']
+        db.session.commit()
+        current_app.logger.info(f"Recorded payment of {amount} on billing record {id}")
+        return jsonify(record.to_dict())
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error recording payment on billing record {id}: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
 @billing_bp.route('/billing/<int:id>', methods=['DELETE'])
 def delete_billing_record(id):
     try:
@@ -104,7 +151,7 @@ def delete_billing_record(id):
 def get_billing_items(record_id):
     try:
         current_app.logger.info(f"Attempting to fetch billing items for record {record_id}")
-        items = BillingItem.query.filter_by(billing_record_id=record_id, is_active=True).all()
+        items = eager_query(BillingItem).filter_by(billing_record_id=record_id, is_active=True).all()
         current_app.logger.info(f"Successfully fetched {len(items)} billing items")
         return jsonify([item.to_dict() for item in items])
     except Exception as e:
@@ -124,18 +171,13 @@ def create_billing_item(record_id):
                 current_app.logger.error(f"Missing required field: {field}")
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Calculate total price
-        quantity = data.get('quantity', 1)
-        total_price = quantity * data['unit_price']
-        
-        # Create billing item
+        # total_price and the record total are derived by the billing engine on flush
         item = BillingItem(
             billing_record_id=record_id,
             item_type=data['item_type'],
             description=data['description'],
-            quantity=quantity,
-            unit_price=data['unit_price'],
-            total_price=total_price
+            quantity=data.get('quantity', 1),
+            unit_price=data['unit_price']
         )
         
         db.session.add(item)
@@ -148,6 +190,46 @@ def create_billing_item(record_id):
         current_app.logger.error(f"Error creating billing item: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+@billing_bp.route('/billing/<int:record_id>/items/batch', methods=['POST'])
+def batch_billing_items(record_id):
+    """
+    Create, update and soft-delete many items of one billing record in a single
+    transaction: {"items": [{...}, {"id": 3, ...}], "delete": [5, 6]}. The record
+    total is updated once, by the billing engine on flush, and the whole record
+    is returned with its items.
+    """
+    try:
+        record = eager_query(BillingRecord, 'aggregate').get(record_id)
+        if not record or not record.is_active:
+            return jsonify({'error': 'Billing record not found'}), 404
+        data = request.get_json() or {}
+        current_app.logger.info(f"Attempting batch update of billing items for record {record_id}")
+
+        def create(values):
+            record.items.append(BillingItem(is_active=True, **values))
+
+        try:
+            # Everything below is flushed once, by the commit
+            with db.session.no_autoflush:
+                counts = apply_batch(
+                    record.items, data.get('items', []), data.get('delete', []),
+                    fields=('item_type', 'description', 'quantity', 'unit_price'),
+                    required=('item_type', 'description', 'unit_price'),
+                    create=create
+                )
+        except BatchError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+        db.session.commit()
+        current_app.logger.info(f"Batch updated billing record {record_id}: {counts}")
+        items = [item.to_dict() for item in record.items if item.is_active]
+        return jsonify(dict(record.to_dict(), items=items, changes=counts))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in batch update of billing items for record {record_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
 @billing_bp.route('/billing/items/<int:id>', methods=['PUT'])
 def update_billing_item(id):
     try:
@@ -155,15 +237,11 @@ def update_billing_item(id):
         item = BillingItem.query.get_or_404(id)
         data = request.get_json()
         
-        # Update fields
+        # Update fields; total_price and the record total are re-derived on flush
         for key, value in data.items():
             if hasattr(item, key):
                 setattr(item, key, value)
         
-        # Recalculate total price if quantity or unit_price changed
-        if 'quantity' in data or 'unit_price' in data:
-            item.total_price = item.quantity * item.unit_price
-        
         db.session.commit()
         current_app.logger.info(f"Successfully updated billing item with id {id}")
         return jsonify(item.to_dict())
@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify, current_app
+from utils.bulk_import import ENTITIES, FORMATS, import_rows, read_rows
+import io
+
+bulk_bp = Blueprint('bulk', __name__)
+
+@bulk_bp.route('/bulk/<entity>', methods=['POST'])
+def bulk_import(entity):
+    if entity not in ENTITIES:
+        return jsonify({'error': f'Unknown bulk entity: {entity}. Use one of: {", ".join(ENTITIES)}'}), 404
+
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    try:
+        current_app.logger.info(f"Starting bulk import of {entity} as {fmt}")
+        # Read the body as a stream so large uploads are never held in memory at once
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        report = import_rows(
+            entity,
+            read_rows(stream, fmt),
+            current_app.config.get('BULK_CHUNK_SIZE', 5000),
+            current_app.config.get('BULK_MAX_ERRORS', 1000)
+        )
+        current_app.logger.info(
+            f"Bulk import of {entity}: {report['inserted']} inserted, {report['failed']} failed"
+        )
+        return jsonify(report), 200 if not report['failed'] else 207
+    except Exception as e:
+        current_app.logger.error(f"Error during bulk import of {entity}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
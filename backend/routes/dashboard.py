@@ -1,7 +1,8 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from datetime import datetime, timedelta
 from models import db, Patient, Doctor, Appointment, BillingRecord
 from sqlalchemy import func
+from utils.analytics import AnalyticsError, run_analytics
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -32,4 +33,28 @@ def get_stats():
         }), 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500 
+
+@dashboard_bp.route('/analytics', methods=['GET'])
+def get_analytics():
+    try:
+        metric = request.args.get('metric', 'revenue')
+        bucket = request.args.get('bucket', 'month')
+        group_by = request.args.get('group_by')
+        rows = run_analytics(
+            metric,
+            bucket=bucket,
+            group_by=group_by,
+            date_from=request.args.get('date_from'),
+            date_to=request.args.get('date_to')
+        )
+        return jsonify({
+            'metric': metric,
+            'bucket': bucket,
+            'group_by': group_by,
+            'rows': rows
+        }), 200
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
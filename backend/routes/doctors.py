@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import Doctor, Appointment
 from extensions import db
+from utils.query_options import eager_query
+from utils.conditional import not_modified, payload_not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
+from utils.entity_cache import cached_entity
+from utils.availability import availability_index
 from datetime import datetime
 
 doctors_bp = Blueprint('doctors', __name__)
@@ -9,9 +14,16 @@ doctors_bp = Blueprint('doctors', __name__)
 def get_doctors():
     try:
         current_app.logger.info("Attempting to fetch all doctors")
-        doctors = Doctor.query.filter_by(is_active=True).all()
+        serializer = serializer_for(Doctor, **requested_projection(Doctor))
+        query = serializer.query().filter(Doctor.is_active == True)
+        response = not_modified(query, Doctor)
+        if response is not None:
+            return response
+        doctors = serializer.dicts(query)
         current_app.logger.info(f"Successfully fetched {len(doctors)} doctors")
-        return jsonify([doctor.to_dict() for doctor in doctors])
+        return json_response(doctors)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching doctors: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -20,9 +32,15 @@ def get_doctors():
 def get_doctor(id):
     try:
         current_app.logger.info(f"Attempting to fetch doctor with id {id}")
-        doctor = Doctor.query.get_or_404(id)
+        doctor = cached_entity(Doctor, id, lambda: eager_query(Doctor, 'detail').get_or_404(id).to_dict())
+        doctor = project(doctor, Doctor)
+        response = payload_not_modified(doctor)
+        if response is not None:
+            return response
         current_app.logger.info(f"Successfully fetched doctor {id}")
-        return jsonify(doctor.to_dict())
+        return jsonify(doctor)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching doctor {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -41,15 +59,16 @@ def check_doctor_availability(id):
         if not doctor:
             return jsonify({'error': 'Doctor not found or inactive'}), 404
             
-        # Check for existing appointments at the same date and time
-        existing_appointment = Appointment.query.filter_by(
-            doctor_id=id,
-            date=date,
-            time=time,
-            status='scheduled'
-        ).first()
-        
-        is_available = not existing_appointment
+        # Answer from the slot index; times that are not a slot start (off the grid or outside hours) use an exact lookup
+        is_available = availability_index().is_free(id, date, time)
+        if is_available is None:
+            existing_appointment = Appointment.query.filter_by(
+                doctor_id=id,
+                date=date,
+                time=time,
+                status='scheduled'
+            ).first()
+            is_available = not existing_appointment
         
         return jsonify([{
             'doctor_id': id,
@@ -62,11 +81,37 @@ def check_doctor_availability(id):
         current_app.logger.error(f"Error checking doctor availability: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@doctors_bp.route('/doctors/<int:id>/free-slots', methods=['GET'])
+def get_doctor_free_slots(id):
+    try:
+        try:
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') \
+                else datetime.utcnow().date()
+            days = int(request.args.get('days', 7))
+        except ValueError:
+            return jsonify({'error': 'start must use YYYY-MM-DD and days must be an integer'}), 400
+        if days < 1 or days > current_app.config.get('AVAILABILITY_MAX_DAYS', 60):
+            return jsonify({'error': 'days is out of range'}), 400
+
+        doctor = Doctor.query.filter_by(id=id, is_active=True).first()
+        if not doctor:
+            return jsonify({'error': 'Doctor not found or inactive'}), 404
+
+        index = availability_index()
+        return jsonify({
+            'doctor_id': id,
+            'slot_minutes': index.slot_minutes,
+            'days': index.free_slots(id, start, days)
+        })
+    except Exception as e:
+        current_app.logger.error(f"Error fetching free slots for doctor {id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @doctors_bp.route('/doctors', methods=['POST'])
 def create_doctor():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Attempting to create doctor with data: {data}")
+        current_app.logger.debug("Attempting to create doctor with data: %s", data)
         
         # Validate required fields
         required_fields = ['first_name', 'last_name', 'specialization', 'phone', 'email']
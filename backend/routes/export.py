@@ -0,0 +1,150 @@
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from models.appointment import Appointment
+from models.billing import BillingRecord, BillingItem
+from models.inventory import InventoryItem
+from models.lab_test import LabTest
+from models.prescription import Prescription, Medication
+from extensions import db
+from utils.pagination import PaginationError, filter_query
+from utils.money import json_default
+from sqlalchemy import Date, DateTime
+import csv
+import io
+import json
+import zlib
+
+export_bp = Blueprint('export', __name__)
+
+# entity -> (model, child model, child foreign key, child key in NDJSON, date column, status column)
+EXPORTS = {
+    'billing': (BillingRecord, BillingItem, 'billing_record_id', 'items',
+                BillingRecord.created_at, BillingRecord.payment_status),
+    'appointments': (Appointment, None, None, None, Appointment.date, Appointment.status),
+    'prescriptions': (Prescription, Medication, 'prescription_id', 'medications', Prescription.created_at, None),
+    'lab_tests': (LabTest, None, None, None, LabTest.test_date, LabTest.status),
+    'inventory': (InventoryItem, None, None, None, InventoryItem.created_at, None),
+}
+
+def _converter(table):
+    """Build a row -> dict function that only touches the date/datetime columns."""
+    names = [column.name for column in table.c]
+    temporal = [i for i, column in enumerate(table.c) if isinstance(column.type, (Date, DateTime))]
+
+    def convert(row):
+        values = list(row)
+        for i in temporal:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return dict(zip(names, values))
+    return convert
+
+def _chunks(model, child, child_fk, date_column, status_column, chunk_size, include_inactive):
+    """
+    Yield lists of (row, children) pairs as plain dicts, walking the table in id
+    order one keyset chunk at a time. Column queries skip ORM instance
+    hydration, so memory stays bounded by chunk_size however large the table is.
+    """
+    record = _converter(model.__table__)
+    query = filter_query(db.session.query(*model.__table__.c), model,
+                         date_column=date_column, status_column=status_column)
+    if not include_inactive and hasattr(model, 'is_active'):
+        # IS NOT rather than = keeps the planner walking the primary key instead of
+        # sorting every active row via the (is_active, ...) indexes on each chunk
+        query = query.filter(model.is_active.isnot(False))
+    if child is not None:
+        child_record = _converter(child.__table__)
+        child_key = child.__table__.c.keys().index(child_fk)
+
+    last_id = 0
+    while True:
+        rows = query.filter(model.id > last_id).order_by(model.id).limit(chunk_size).all()
+        if not rows:
+            return
+        children = {}
+        if child is not None:
+            child_query = db.session.query(*child.__table__.c).filter(
+                getattr(child, child_fk).in_([row.id for row in rows])
+            )
+            if not include_inactive:
+                child_query = child_query.filter(child.is_active.isnot(False))
+            for child_row in child_query.order_by(child.id):
+                children.setdefault(child_row[child_key], []).append(child_record(child_row))
+        yield [(record(row), children.get(row.id, [])) for row in rows]
+        last_id = rows[-1].id
+
+def _ndjson(chunks, child_key):
+    for chunk in chunks:
+        lines = []
+        for row, children in chunk:
+            if child_key:
+                row[child_key] = children
+            lines.append(json.dumps(row, separators=(',', ':'), default=json_default))
+        yield '\n'.join(lines) + '\n'
+
+def _csv(chunks, model, child):
+    # One line per child row (parent columns repeated); parents without children get one line
+    header = [column.name for column in model.__table__.c]
+    child_header = [f"{child.__tablename__}.{column.name}" for column in child.__table__.c] if child is not None else []
+    padding = [''] * len(child_header)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header + child_header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for chunk in chunks:
+        for row, children in chunk:
+            values = list(row.values())
+            if not children:
+                writer.writerow(values + padding)
+            for child_row in children:
+                writer.writerow(values + list(child_row.values()))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@export_bp.route('/export/<entity>', methods=['GET'])
+def export_entity(entity):
+    if entity not in EXPORTS:
+        return jsonify({'error': f'Unknown export entity: {entity}. Use one of: {", ".join(EXPORTS)}'}), 404
+
+    model, child, child_fk, child_key, date_column, status_column = EXPORTS[entity]
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    include_inactive = request.args.get('include_inactive') == '1'
+
+    try:
+        chunks = _chunks(model, child, child_fk, date_column, status_column, chunk_size, include_inactive)
+        # Surface bad filter parameters as a 400 before the streaming response starts
+        first = next(chunks, None)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def all_chunks():
+        if first is not None:
+            yield first
+            yield from chunks
+
+    current_app.logger.info(f"Streaming {entity} export as {fmt}")
+    body = _ndjson(all_chunks(), child_key) if fmt == 'ndjson' else _csv(all_chunks(), model, child)
+    headers = {
+        'Content-Disposition': f'attachment; filename={entity}.{fmt}',
+        'Cache-Control': 'no-store',
+        'Vary': 'Accept-Encoding'
+    }
+    # Honour q-values: "gzip;q=0" refuses gzip, "*" accepts it
+    if request.accept_encodings['gzip'] > 0:
+        body = _gzip(body)
+        headers['Content-Encoding'] = 'gzip'
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify, current_app
 from models.inventory import InventoryItem
 from extensions import db
+from utils.query_options import eager_query
+from utils.conditional import not_modified, payload_not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
+from utils.entity_cache import cached_entity
 from datetime import datetime
 
 inventory_bp = Blueprint('inventory', __name__)
@@ -9,9 +13,16 @@ inventory_bp = Blueprint('inventory', __name__)
 def get_inventory():
     try:
         current_app.logger.info("Attempting to fetch all inventory items")
-        items = InventoryItem.query.filter_by(is_active=True).all()
+        serializer = serializer_for(InventoryItem, **requested_projection(InventoryItem))
+        query = serializer.query().filter(InventoryItem.is_active == True)
+        response = not_modified(query, InventoryItem)
+        if response is not None:
+            return response
+        items = serializer.dicts(query)
         current_app.logger.info(f"Successfully fetched {len(items)} inventory items")
-        return jsonify([item.to_dict() for item in items])
+        return json_response(items)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching inventory items: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -20,9 +31,16 @@ def get_inventory():
 def get_inventory_item(id):
     try:
         current_app.logger.info(f"Attempting to fetch inventory item with id {id}")
-        item = InventoryItem.query.get_or_404(id)
+        item = cached_entity(InventoryItem, id,
+                             lambda: eager_query(InventoryItem, 'detail').get_or_404(id).to_dict())
+        item = project(item, InventoryItem)
+        response = payload_not_modified(item)
+        if response is not None:
+            return response
         current_app.logger.info(f"Successfully fetched inventory item {id}")
-        return jsonify(item.to_dict())
+        return jsonify(item)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching inventory item {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -31,7 +49,7 @@ def get_inventory_item(id):
 def create_inventory_item():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Attempting to create inventory item with data: {data}")
+        current_app.logger.debug("Attempting to create inventory item with data: %s", data)
         
         # Validate required fields
         required_fields = ['name', 'category', 'quantity', 'unit', 'price_per_unit']
@@ -95,8 +113,9 @@ def delete_inventory_item(id):
 def get_low_stock_items():
     try:
         current_app.logger.info("Attempting to fetch low stock items")
-        items = InventoryItem.query.filter(
-            InventoryItem.quantity <= InventoryItem.minimum_stock,
+        items = eager_query(InventoryItem).filter(
+            # Written as a difference so ix_inventory_items_low_stock can serve it
+            InventoryItem.quantity - InventoryItem.minimum_stock <= 0,
             InventoryItem.is_active == True
         ).all()
         current_app.logger.info(f"Successfully fetched {len(items)} low stock items")
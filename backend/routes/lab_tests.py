@@ -3,6 +3,11 @@ from models.lab_test import LabTest
 from models.patient import Patient
 from models.doctor import Doctor
 from extensions import db
+from utils.query_options import eager_query
+from utils.entity_cache import active_dict, cached_entity
+from utils.pagination import PaginationError, filter_query, page_window, paginate, page_body
+from utils.conditional import not_modified, payload_not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
 from datetime import datetime
 
 lab_tests_bp = Blueprint('lab_tests', __name__)
@@ -11,9 +16,18 @@ lab_tests_bp = Blueprint('lab_tests', __name__)
 def get_lab_tests():
     try:
         current_app.logger.info("Attempting to fetch all lab tests")
-        lab_tests = LabTest.query.filter_by(is_active=True).order_by(LabTest.created_at.desc()).all()
-        current_app.logger.info(f"Successfully fetched {len(lab_tests)} lab tests")
-        return jsonify([test.to_dict() for test in lab_tests])
+        sort = (LabTest.created_at, LabTest.id)
+        serializer = serializer_for(LabTest, required=sort, **requested_projection(LabTest))
+        query = filter_query(serializer.query().filter(LabTest.is_active == True), LabTest,
+                             date_column=LabTest.test_date, status_column=LabTest.status)
+        response = not_modified(page_window(query, sort, descending=True)[0], LabTest)
+        if response is not None:
+            return response
+        page = paginate(query, sort, descending=True)
+        current_app.logger.info(f"Successfully fetched {len(page.items)} lab tests")
+        return json_response(page_body(page, serializer.dicts(page.items)))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching lab tests: {str(e)}")
         return jsonify({'error': 'Failed to fetch lab tests'}), 500
@@ -22,10 +36,16 @@ def get_lab_tests():
 def get_lab_test(id):
     try:
         current_app.logger.info(f"Attempting to fetch lab test with id {id}")
-        test = LabTest.query.get_or_404(id)
-        if not test.is_active:
+        test = cached_entity(LabTest, id, lambda: active_dict(eager_query(LabTest, 'detail').get_or_404(id)))
+        if test is None:
             return jsonify({'error': 'Lab test not found'}), 404
-        return jsonify(test.to_dict())
+        test = project(test, LabTest)
+        response = payload_not_modified(test)
+        if response is not None:
+            return response
+        return jsonify(test)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching lab test {id}: {str(e)}")
         return jsonify({'error': 'Failed to fetch lab test'}), 500
@@ -34,7 +54,7 @@ def get_lab_test(id):
 def create_lab_test():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Received lab test data: {data}")
+        current_app.logger.debug("Received lab test data: %s", data)
         
         # Validate required fields
         required_fields = ['patient_id', 'doctor_id', 'test_name', 'test_type', 'test_date']
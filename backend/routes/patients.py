@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import Patient
 from extensions import db
+from utils.query_options import eager_query
+from utils.entity_cache import cached_entity
+from utils.pagination import PaginationError, filter_query, page_window, paginate, page_body
+from utils.conditional import not_modified, payload_not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
+from utils.patient_search import search_patients
 from datetime import datetime
 import re
 
@@ -21,20 +27,51 @@ def validate_email(email):
 def get_patients():
     try:
         current_app.logger.info("Attempting to fetch all patients")
-        patients = Patient.query.all()
-        current_app.logger.info(f"Successfully fetched {len(patients)} patients")
-        return jsonify([patient.to_dict() for patient in patients])
+        sort = (Patient.id,)
+        serializer = serializer_for(Patient, required=sort, **requested_projection(Patient))
+        query = filter_query(serializer.query(), Patient, date_column=Patient.created_at)
+        response = not_modified(page_window(query, sort)[0], Patient)
+        if response is not None:
+            return response
+        page = paginate(query, sort)
+        current_app.logger.info(f"Successfully fetched {len(page.items)} patients")
+        return json_response(page_body(page, serializer.dicts(page.items)))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching patients: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@patients_bp.route('/patients/search', methods=['GET'])
+def search():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        results = search_patients(q, limit)
+        current_app.logger.info(f"Patient search returned {len(results)} results")
+        return jsonify([dict(patient.to_dict(), score=score) for patient, score in results])
+    except Exception as e:
+        current_app.logger.error(f"Error searching patients: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @patients_bp.route('/patients/<int:id>', methods=['GET'])
 def get_patient(id):
     try:
         current_app.logger.info(f"Attempting to fetch patient with id {id}")
-        patient = Patient.query.get_or_404(id)
+        patient = cached_entity(Patient, id, lambda: eager_query(Patient, 'detail').get_or_404(id).to_dict())
+        patient = project(patient, Patient)
+        response = payload_not_modified(patient)
+        if response is not None:
+            return response
         current_app.logger.info(f"Successfully fetched patient {id}")
-        return jsonify(patient.to_dict())
+        return jsonify(patient)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching patient {id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -43,7 +80,7 @@ def get_patient(id):
 def create_patient():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Attempting to create patient with data: {data}")
+        current_app.logger.debug("Attempting to create patient with data: %s", data)
         
         # Validate required fields
         required_fields = ['first_name', 'last_name', 'date_of_birth', 'gender', 'phone']
@@ -3,21 +3,31 @@ from models.prescription import Prescription, Medication
 from models.patient import Patient
 from models.doctor import Doctor
 from extensions import db
+from utils.query_options import eager_query
+from utils.entity_cache import active_dict, cached_entity
+from utils.pagination import PaginationError, filter_query, page_window, paginate, page_body
+from utils.conditional import not_modified, payload_not_modified
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
+from utils.batch_writes import BatchError, apply_batch
 
 prescriptions_bp = Blueprint('prescriptions', __name__)
 
 @prescriptions_bp.route('/prescriptions', methods=['GET'])
 def get_prescriptions():
     try:
-        prescriptions = Prescription.query.filter_by(is_active=True).order_by(Prescription.created_at.desc()).all()
-        current_app.logger.info(f"Fetched {len(prescriptions)} prescriptions")
-        prescription_data = []
-        for prescription in prescriptions:
-            data = prescription.to_dict()
-            # Only include active medications
-            data['medications'] = [med.to_dict() for med in prescription.medications if med.is_active]
-            prescription_data.append(data)
-        return jsonify(prescription_data)
+        sort = (Prescription.created_at, Prescription.id)
+        serializer = serializer_for(Prescription, required=sort, **requested_projection(Prescription))
+        query = filter_query(serializer.query().filter(Prescription.is_active == True), Prescription,
+                             date_column=Prescription.created_at)
+        response = not_modified(page_window(query, sort, descending=True)[0], Prescription)
+        if response is not None:
+            return response
+        page = paginate(query, sort, descending=True)
+        current_app.logger.info(f"Fetched {len(page.items)} prescriptions")
+        # Active medications are nested with one IN query per page
+        return json_response(page_body(page, serializer.dicts(page.items)))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching prescriptions: {str(e)}")
         return jsonify({'error': 'Failed to fetch prescriptions'}), 500
@@ -25,10 +35,17 @@ def get_prescriptions():
 @prescriptions_bp.route('/prescriptions/<int:id>', methods=['GET'])
 def get_prescription(id):
     try:
-        prescription = Prescription.query.get_or_404(id)
-        if not prescription.is_active:
+        prescription = cached_entity(Prescription, id,
+                                     lambda: active_dict(eager_query(Prescription, 'detail').get_or_404(id)))
+        if prescription is None:
             return jsonify({'error': 'Prescription not found'}), 404
-        return jsonify(prescription.to_dict())
+        prescription = project(prescription, Prescription)
+        response = payload_not_modified(prescription)
+        if response is not None:
+            return response
+        return jsonify(prescription)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching prescription {id}: {str(e)}")
         return jsonify({'error': 'Failed to fetch prescription'}), 500
@@ -37,7 +54,7 @@ def get_prescription(id):
 def create_prescription():
     try:
         data = request.get_json()
-        current_app.logger.info(f"Received prescription data: {data}")
+        current_app.logger.debug("Received prescription data: %s", data)
         
         # Validate required fields
         required_fields = ['patient_id', 'doctor_id', 'diagnosis']
@@ -77,7 +94,7 @@ def create_prescription():
             
             # Add medications if provided
             if 'medications' in data and data['medications']:
-                current_app.logger.info(f"Adding medications: {data['medications']}")
+                current_app.logger.debug("Adding medications: %s", data['medications'])
                 for med_data in data['medications']:
                     medication = Medication(
                         name=med_data['name'],
@@ -110,7 +127,7 @@ def create_prescription():
 @prescriptions_bp.route('/prescriptions/<int:id>', methods=['PUT'])
 def update_prescription(id):
     try:
-        prescription = Prescription.query.get_or_404(id)
+        prescription = eager_query(Prescription, 'detail').get_or_404(id)
         if not prescription.is_active:
             return jsonify({'error': 'Prescription not found'}), 404
         
@@ -148,6 +165,42 @@ def update_prescription(id):
         current_app.logger.error(f"Error updating prescription {id}: {str(e)}")
         return jsonify({'error': 'Failed to update prescription'}), 500
 
+@prescriptions_bp.route('/prescriptions/<int:id>/medications/batch', methods=['POST'])
+def batch_medications(id):
+    """
+    Create, update and soft-delete many medications of one prescription in a
+    single transaction: {"medications": [{...}, {"id": 3, ...}], "delete": [5]}.
+    Returns the whole prescription.
+    """
+    try:
+        prescription = eager_query(Prescription, 'detail').get(id)
+        if not prescription or not prescription.is_active:
+            return jsonify({'error': 'Prescription not found'}), 404
+        data = request.get_json() or {}
+
+        def create(values):
+            prescription.medications.append(Medication(is_active=True, **values))
+
+        try:
+            with db.session.no_autoflush:
+                counts = apply_batch(
+                    prescription.medications, data.get('medications', []), data.get('delete', []),
+                    fields=('name', 'dosage', 'frequency', 'duration', 'instructions'),
+                    required=('name', 'dosage', 'frequency'),
+                    create=create
+                )
+        except BatchError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+        db.session.commit()
+        current_app.logger.info(f"Batch updated medications of prescription {id}: {counts}")
+        return jsonify(dict(prescription.to_dict(), changes=counts))
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in batch update of medications for prescription {id}: {str(e)}")
+        return jsonify({'error': 'Failed to update medications'}), 500
+
 @prescriptions_bp.route('/prescriptions/<int:id>', methods=['DELETE'])
 def delete_prescription(id):
     try:
@@ -175,19 +228,13 @@ def get_prescriptions_by_patient(patient_id):
         if not patient.is_active:
             return jsonify({'error': f'Patient with ID {patient_id} is inactive'}), 400
 
-        prescriptions = Prescription.query.filter_by(
+        prescriptions = eager_query(Prescription).filter_by(
             patient_id=patient_id,
             is_active=True
         ).order_by(Prescription.created_at.desc()).all()
         
         current_app.logger.info(f"Fetched {len(prescriptions)} prescriptions for patient {patient_id}")
-        prescription_data = []
-        for prescription in prescriptions:
-            data = prescription.to_dict()
-            # Only include active medications
-            data['medications'] = [med.to_dict() for med in prescription.medications if med.is_active]
-            prescription_data.append(data)
-        return jsonify(prescription_data)
+        return jsonify([prescription.to_dict() for prescription in prescriptions])
     except Exception as e:
         current_app.logger.error(f"Error fetching prescriptions for patient {patient_id}: {str(e)}")
         return jsonify({'error': 'Failed to fetch prescriptions'}), 500 
\ No newline at end of file
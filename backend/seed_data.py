@@ -2,7 +2,6 @@ from datetime import datetime, timedelta
 import random
 import json
 import os
-from faker import Faker
 from app import create_app, db
 from models.patient import Patient
 from models.doctor import Doctor
@@ -12,8 +11,6 @@ from models.prescription import Prescription, Medication
 from models.lab_test import LabTest
 from models.inventory import InventoryItem
 
-fake = Faker()
-
 def generate_sample_data():
     # Clear existing data
     BillingRecord.query.delete()
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Read by config.Config at import: keep logs out of the tree and background reconcilers off
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'hms-tests', 'app.log'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-long-enough-for-hs256-signatures')
+os.environ.setdefault('DASHBOARD_RECONCILE_SECONDS', '0')
+os.environ.setdefault('ANALYTICS_RECONCILE_SECONDS', '0')
+
+import app as app_module  # noqa: E402
+from config import Config  # noqa: E402
+from extensions import db  # noqa: E402
+
+# Statements a list or detail request may issue; a lazy load per row blows through it
+STATEMENT_BUDGET = 5
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A migrated and seeded app on its own SQLite file, with the statement budget enforced."""
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'hms.db'}")
+    setup = app_module.create_app()
+    with setup.app_context():
+        app_module.migrate_database(setup)
+        app_module.seed_sample_data(setup.logger)
+        db.engine.dispose()
+
+    app = app_module.create_app()
+    app.testing = True
+    app.config['SQL_STATEMENT_BUDGET'] = STATEMENT_BUDGET
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def unbudgeted(app):
+    """Lift the statement budget for tests that drive write endpoints."""
+    app.config['SQL_STATEMENT_BUDGET'] = None
+
+
+@pytest.fixture
+def token(app):
+    """Authorization headers carrying a JWT for `role`, as /api/auth/login issues them."""
+    from flask_jwt_extended import create_access_token
+
+    def make(role):
+        with app.app_context():
+            access_token = create_access_token(identity='1', additional_claims={'role': role})
+        return {'Authorization': f'Bearer {access_token}'}
+    return make
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def bill(client):
+    """A bill of 10 + 3 x 0.1 for patient 1's appointment with doctor 1; returns its id."""
+    appointment = client.post('/api/appointments', json=dict(
+        patient_id=1, doctor_id=1, date='2030-01-07', time='10:00')).get_json()
+    record = client.post('/api/billing', json=dict(
+        patient_id=1, appointment_id=appointment['id'], total_amount=10, payment_method='cash')).get_json()
+    for _ in range(3):
+        assert client.post(f"/api/billing/{record['id']}/items", json=dict(
+            item_type='test', description='CBC', quantity=1, unit_price=0.1)).status_code == 201
+    return record['id']
+
+
+@pytest.fixture
+def make_app(app):
+    """Another worker process on the same database: its own app, caches and limits, same budget."""
+    def make():
+        other = app_module.create_app()
+        other.testing = True
+        other.config['SQL_STATEMENT_BUDGET'] = app.config['SQL_STATEMENT_BUDGET']
+        return other
+    return make
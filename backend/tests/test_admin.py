@@ -0,0 +1,25 @@
+import pytest
+
+# Operational endpoints under /api/admin: (method, path)
+ADMIN_ENDPOINTS = [
+    ('get', '/api/admin/perf'),
+    ('delete', '/api/admin/perf'),
+    ('get', '/api/admin/pool'),
+    ('delete', '/api/admin/pool'),
+    ('get', '/api/admin/replicas'),
+    ('delete', '/api/admin/replicas'),
+    ('get', '/api/admin/cache'),
+    ('delete', '/api/admin/cache'),
+    ('get', '/api/admin/limits'),
+    ('delete', '/api/admin/limits'),
+    ('get', '/api/admin/password-hashing'),
+    ('delete', '/api/admin/password-hashing'),
+]
+
+
+@pytest.mark.parametrize('method, path', ADMIN_ENDPOINTS)
+def test_admin_endpoints_need_an_admin_token(client, token, method, path):
+    call = getattr(client, method)
+    assert call(path).status_code == 401
+    assert call(path, headers=token('doctor')).status_code == 403
+    assert call(path, headers=token('admin')).status_code in (200, 204)
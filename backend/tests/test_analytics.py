@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.usefixtures('unbudgeted')
+
+
+def rollup(app):
+    from models.analytics_daily import AnalyticsDaily
+    with app.app_context():
+        # Rows a delta emptied are equivalent to absent ones
+        return sorted((row.metric, row.dimension, row.day, row.group_key, row.count, row.quantity,
+                       row.amount, row.collected, row.outstanding)
+                      for row in AnalyticsDaily.query.all() if row.count)
+
+
+def assert_matches_rebuild(app):
+    from utils import analytics_rollup
+    incremental = rollup(app)
+    with app.app_context():
+        analytics_rollup.reconcile()
+    assert rollup(app) == incremental
+
+
+def test_rows_are_exact_and_grouped(client, bill):
+    client.post(f'/api/billing/{bill}/payments', json=dict(amount=5, payment_method='card'))
+    revenue = client.get('/api/dashboard/analytics?metric=revenue&group_by=specialization').get_json()['rows']
+    assert [(row['group'], row['count'], row['billed'], row['collected'], row['outstanding']) for row in revenue] == [
+        ('Cardiology', 1, 10.3, 5, 5.3)]
+    appointments = client.get('/api/dashboard/analytics?metric=appointments&group_by=doctor').get_json()['rows']
+    assert [(row['bucket'], row['group'], row['count']) for row in appointments] == [('2030-01-01', 1, 1)]
+
+
+def test_money_sums_are_decimal(app, bill):
+    from utils.analytics import run_analytics
+    with app.app_context():
+        row, = run_analytics('revenue')
+    assert row['billed'] == Decimal('10.30')
+
+
+def test_flush_deltas_match_a_rebuild(app, client, bill):
+    record = client.get(f'/api/billing/{bill}').get_json()
+    steps = [
+        ('post', f'/api/billing/{bill}/payments', dict(amount=20.1, payment_method='card')),
+        # Reassigning the appointment moves its bill and items to the other doctor
+        ('put', f"/api/appointments/{record['appointment_id']}", dict(doctor_id=2)),
+        ('put', f'/api/billing/{bill}', dict(created_at='2023-05-06T10:00:00')),
+        ('post', '/api/lab-tests', dict(patient_id=1, doctor_id=1, test_name='CBC', test_type='blood',
+                                        test_date='2024-03-04')),
+        ('put', '/api/lab-tests/1', dict(test_date='2024-04-01')),
+        ('put', f"/api/appointments/{record['appointment_id']}", dict(status='cancelled')),
+        ('delete', f'/api/billing/{bill}', None),
+    ]
+    assert_matches_rebuild(app)
+    for method, path, body in steps:
+        assert getattr(client, method)(path, json=body).status_code < 300, path
+        assert_matches_rebuild(app)
+    revenue = client.get('/api/dashboard/analytics?metric=revenue&group_by=specialization').get_json()['rows']
+    assert revenue == []
+
+
+def test_workers_add_to_the_same_day(make_app):
+    # Two workers booking into the same doctor and day each add their own count
+    first, second = make_app().test_client(), make_app().test_client()
+    for client, time in ((first, '09:00'), (second, '09:15'), (first, '09:30')):
+        assert client.post('/api/appointments', json=dict(
+            patient_id=1, doctor_id=1, date='2030-01-07', time=time)).status_code == 201
+    rows = second.get('/api/dashboard/analytics?metric=appointments&bucket=day&group_by=doctor').get_json()['rows']
+    assert [(row['bucket'], row['group'], row['count']) for row in rows] == [('2030-01-07', 1, 3)]
+
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+from flask import Response
+
+from utils.async_api import create_asgi_app
+
+pytestmark = pytest.mark.usefixtures('unbudgeted')
+
+
+def scope(path, query=''):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+            'headers': [], 'http_version': '1.1', 'scheme': 'http', 'root_path': ''}
+
+
+async def call(application, path, query=''):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope(path, query), receive, send)
+    return messages
+
+
+def body(messages):
+    return b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+
+
+@pytest.fixture
+def asgi(app):
+    application = create_asgi_app(app)
+    yield application
+    asyncio.run(application.engine.dispose())
+
+
+def test_detail_matches_the_sync_view(app, client, asgi):
+    expected = client.get('/api/patients/1').get_data()
+    for _ in range(2):  # a miss, then a cache hit probed on the async connection
+        messages = asyncio.run(call(asgi, '/api/patients/1'))
+        assert messages[0]['status'] == 200
+        assert body(messages) == expected
+
+    client.put('/api/patients/1', json={'address': '1 New Road'})
+    assert b'1 New Road' in body(asyncio.run(call(asgi, '/api/patients/1')))
+
+
+def test_blocking_request_hooks_leave_the_loop_free(app, asgi):
+    @app.before_request
+    def slow_store():
+        # Stands in for a rate-limit or schema check round trip
+        time.sleep(0.3)
+
+    async def scenario():
+        request = asyncio.ensure_future(call(asgi, '/api/patients'))
+        started = time.perf_counter()
+        await asyncio.sleep(0.05)
+        waited = time.perf_counter() - started
+        return waited, await request
+
+    waited, messages = asyncio.run(scenario())
+    assert messages[0]['status'] == 200
+    assert waited < 0.25
+
+
+def test_streamed_bodies_are_sent_chunk_by_chunk(asgi):
+    def view(connection):
+        return Response((f'{i}\n' for i in range(3)), mimetype='text/plain')
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi._serve(view, scope('/api/patients'), send))
+    chunks = [message for message in messages if message['type'] == 'http.response.body']
+    assert [chunk['body'] for chunk in chunks] == [b'0\n', b'1\n', b'2\n', b'']
+    assert [chunk.get('more_body', False) for chunk in chunks] == [True, True, True, False]
@@ -0,0 +1,51 @@
+import pytest
+
+pytestmark = pytest.mark.usefixtures('unbudgeted')
+
+
+def register(client, username, token=None, **fields):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return client.post('/api/auth/register', json=dict(username=username, password='secret', **fields),
+                       headers=headers)
+
+
+def login(client, username):
+    return client.post('/api/auth/login', json=dict(username=username, password='secret')).get_json()
+
+
+def test_self_registration_gets_the_default_role(client):
+    assert register(client, 'anne').status_code == 201
+    assert login(client, 'anne')['user']['role'] == 'patient'
+    assert register(client, 'bob', role='patient').status_code == 201
+
+
+def test_privileged_roles_need_an_admin(app, client):
+    assert register(client, 'mallory', role='admin').status_code == 403
+    assert register(client, 'anne').status_code == 201
+    assert register(client, 'eve', token=login(client, 'anne')['access_token'], role='doctor').status_code == 403
+
+    from extensions import db
+    from models.user import User
+    with app.app_context():
+        admin = User(username='root', role='admin')
+        admin.set_password('secret')
+        db.session.add(admin)
+        db.session.commit()
+    assert register(client, 'dr_who', token=login(client, 'root')['access_token'], role='doctor').status_code == 201
+    assert login(client, 'dr_who')['user']['role'] == 'doctor'
+
+
+def test_long_hashes_must_fit_the_column(app):
+    from utils.passwords import hash_length, init_password_hashing
+    assert hash_length('pbkdf2:sha512') == 166
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha512'
+    init_password_hashing(app)
+
+    from models.user import User
+    column = User.__table__.c.password_hash
+    original, column.type.length = column.type.length, 128
+    try:
+        with pytest.raises(ValueError):
+            init_password_hashing(app)
+    finally:
+        column.type.length = original
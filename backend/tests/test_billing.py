@@ -0,0 +1,58 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from extensions import db
+from models.billing import BillingItem, BillingRecord
+from utils.money import to_money
+
+pytestmark = pytest.mark.usefixtures('unbudgeted')
+
+
+def test_items_recompute_the_total_exactly(client, bill):
+    record = client.get(f'/api/billing/{bill}').get_json()
+    # 10 + 0.1 + 0.1 + 0.1 in binary floating point is 10.299999999999999
+    assert record['total_amount'] == 10.3
+    assert record['payment_status'] == 'pending'
+
+    paid = client.post(f'/api/billing/{bill}/payments', json=dict(amount=0.3, payment_method='card')).get_json()
+    assert (paid['paid_amount'], paid['payment_status']) == (0.3, 'partial')
+    paid = client.post(f'/api/billing/{bill}/payments', json=dict(amount=10, payment_method='card')).get_json()
+    assert (paid['paid_amount'], paid['payment_status']) == (10.3, 'paid')
+
+
+def _in_another_worker(request):
+    # Another thread gets its own scoped session, like a second worker process
+    thread = threading.Thread(target=request)
+    thread.start()
+    thread.join()
+
+
+def test_concurrent_payments_both_count(app, client, bill):
+    with app.app_context():
+        record = BillingRecord.query.get(bill)
+        assert record.paid_amount == 0
+        _in_another_worker(lambda: client.post(f'/api/billing/{bill}/payments', json=dict(amount=10)))
+        # Stale read: this session still sees nothing paid
+        record.paid_amount = to_money(record.paid_amount) + Decimal('0.3')
+        db.session.commit()
+
+    paid = client.get(f'/api/billing/{bill}').get_json()
+    assert (paid['paid_amount'], paid['payment_status']) == (10.3, 'paid')
+    assert client.get('/api/dashboard/admin-stats').get_json()['total_revenue'] == 10.3
+
+
+def test_concurrent_line_changes_both_count(app, client, bill):
+    with app.app_context():
+        record = BillingRecord.query.get(bill)
+        assert record.total_amount == Decimal('10.30')
+        _in_another_worker(lambda: client.post(f'/api/billing/{bill}/items', json=dict(
+            item_type='test', description='ECG', quantity=2, unit_price=5)))
+        db.session.add(BillingItem(billing_record=record, item_type='test', description='X-ray',
+                                   quantity=1, unit_price=20))
+        db.session.commit()
+
+    record = client.get(f'/api/billing/{bill}').get_json()
+    assert record['total_amount'] == 40.3
+    assert client.get('/api/dashboard/admin-stats').get_json()['total_revenue'] == 40.3
@@ -0,0 +1,43 @@
+import pytest
+
+pytestmark = pytest.mark.usefixtures('unbudgeted')
+
+SLOT = dict(doctor_id=1, date='2030-01-07', time='10:00')
+
+
+def book(client, patient_id=1, **slot):
+    return client.post('/api/appointments', json=dict(SLOT, patient_id=patient_id, **slot))
+
+
+def test_second_booking_of_a_slot_conflicts(client):
+    assert book(client).status_code == 201
+    response = book(client, patient_id=2)
+    assert response.status_code == 409
+    # Another doctor, or another time, is still free
+    assert book(client, patient_id=2, doctor_id=2).status_code == 201
+    assert book(client, patient_id=2, time='10:15').status_code == 201
+
+
+def test_workers_cannot_double_book(make_app):
+    first, second = make_app().test_client(), make_app().test_client()
+    # Load the second worker's slot index before the first books, so it cannot know
+    assert second.get('/api/doctors/1/availability?date=2030-01-07&time=10:00').get_json()[0]['is_available']
+    assert book(first).status_code == 201
+    assert book(second, patient_id=2).status_code == 409
+    appointments = first.get('/api/appointments').get_json()
+    assert [a['patient_id'] for a in appointments if a['date'] == SLOT['date']] == [1]
+
+
+def test_stale_slot_index_does_not_reject_a_free_slot(make_app):
+    first, second = make_app().test_client(), make_app().test_client()
+    appointment = book(first).get_json()
+    # Cancelled through the other worker, so the first one's index still marks the slot taken
+    assert second.put(f"/api/appointments/{appointment['id']}", json={'status': 'cancelled'}).status_code == 200
+    assert book(first, patient_id=2).status_code == 201
+
+
+def test_moving_onto_a_taken_slot_conflicts(client):
+    assert book(client).status_code == 201
+    other = book(client, patient_id=2, time='11:00').get_json()
+    assert client.put(f"/api/appointments/{other['id']}", json={'time': '10:00'}).status_code == 409
+    assert client.put(f"/api/appointments/{other['id']}", json={'time': '11:30'}).status_code == 200
@@ -0,0 +1,40 @@
+def test_etag_revalidation(client):
+    first = client.get('/api/patients/1')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    not_modified = client.get('/api/patients/1', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers['ETag'] == etag
+    # Only the entity cache's version probe
+    assert not_modified.headers['X-DB-Query-Count'] == '1'
+    since = client.get('/api/patients/1', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+
+    client.put('/api/patients/1', json={'address': '1 New Road'})
+    changed = client.get('/api/patients/1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_covers_query_string(client):
+    full = client.get('/api/patients/1').headers['ETag']
+    projected = client.get('/api/patients/1?fields=id,first_name')
+    assert projected.get_json() == {'id': 1, 'first_name': 'John'}
+    assert projected.headers['ETag'] != full
+
+
+def test_list_etag_changes_with_related_rows(app, client):
+    from extensions import db
+    from models.appointment import Appointment
+    with app.app_context():
+        db.session.add(Appointment(patient_id=1, doctor_id=1, date='2030-01-07', time='09:00'))
+        db.session.commit()
+
+    etag = client.get('/api/appointments?limit=10').headers['ETag']
+    assert client.get('/api/appointments?limit=10', headers={'If-None-Match': etag}).status_code == 304
+    # The list embeds the patient's name, so renaming the patient is a change to the list
+    client.put('/api/patients/1', json={'first_name': 'Johnny'})
+    response = client.get('/api/appointments?limit=10', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['items'][0]['patient_name'] == 'Johnny Doe'
@@ -0,0 +1,30 @@
+import pytest
+
+pytestmark = pytest.mark.usefixtures('unbudgeted')
+
+
+def test_admin_stats_follow_writes(app, client, bill):
+    stats = client.get('/api/dashboard/admin-stats').get_json()
+    assert stats['total_revenue'] == 10.3
+    assert stats['total_appointments'] == 1
+
+    from extensions import db
+    from models.patient import Patient
+    with app.app_context():
+        Patient.query.get(2).is_active = False
+        db.session.commit()
+    # Soft-deleted patients are still counted
+    assert client.get('/api/dashboard/admin-stats').get_json()['total_patients'] == 2
+
+    assert client.delete(f'/api/billing/{bill}').status_code in (200, 204)
+    assert client.get('/api/dashboard/admin-stats').get_json()['total_revenue'] == 0
+
+
+def test_reconcile_agrees_with_incremental_totals(app, client, bill):
+    from utils import dashboard_aggregates
+    assert client.post('/api/inventory', json=dict(name='Gauze', category='supplies', quantity=5, unit='box',
+                                                   price_per_unit=2.5, minimum_stock=1)).status_code == 201
+    incremental = client.get('/api/dashboard/admin-stats').get_json()
+    with app.app_context():
+        dashboard_aggregates.reconcile()
+    assert client.get('/api/dashboard/admin-stats').get_json() == incremental
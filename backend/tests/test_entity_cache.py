@@ -0,0 +1,53 @@
+def test_detail_is_cached_until_updated(client):
+    first = client.get('/api/patients/1')
+    # Version probe plus the load
+    assert first.headers['X-DB-Query-Count'] == '2'
+    # A hit costs only the primary-key version probe
+    cached = client.get('/api/patients/1')
+    assert cached.headers['X-DB-Query-Count'] == '1'
+    assert cached.get_json() == first.get_json()
+
+    assert client.put('/api/patients/1', json={'address': '1 New Road'}).status_code == 200
+    updated = client.get('/api/patients/1')
+    assert updated.get_json()['address'] == '1 New Road'
+    assert updated.headers['X-DB-Query-Count'] == '2'
+
+
+def test_prescription_cache_follows_medication_changes(client):
+    prescription = client.get('/api/prescriptions/1').get_json()
+    medication = prescription['medications'][0]
+    batch = {'medications': [{'id': medication['id'], 'dosage': '1g'}]}
+    assert client.post('/api/prescriptions/1/medications/batch', json=batch).status_code == 200
+    served = client.get('/api/prescriptions/1').get_json()
+    assert next(m for m in served['medications'] if m['id'] == medication['id'])['dosage'] == '1g'
+
+
+def test_soft_deleted_entity_is_not_served_from_cache(client):
+    assert client.get('/api/prescriptions/1').status_code == 200
+    assert client.delete('/api/prescriptions/1').status_code == 204
+    assert client.get('/api/prescriptions/1').status_code == 404
+
+
+def test_other_workers_see_a_write_on_their_next_read(make_app):
+    # Two workers, each with its own in-process cache holding patient 1 and prescription 1
+    stale, fresh = make_app().test_client(), make_app().test_client()
+    old = stale.get('/api/patients/1').headers['ETag']
+    prescription = stale.get('/api/prescriptions/1').get_json()
+    assert fresh.get('/api/patients/1').headers['ETag'] == old
+
+    assert fresh.put('/api/patients/1', json={'address': '1 New Road'}).status_code == 200
+    medication = prescription['medications'][0]
+    batch = {'medications': [{'id': medication['id'], 'dosage': '1g'}]}
+    assert fresh.post('/api/prescriptions/1/medications/batch', json=batch).status_code == 200
+    new = fresh.get('/api/patients/1').headers['ETag']
+    assert new != old
+
+    response = stale.get('/api/patients/1', headers={'If-None-Match': old})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == new
+    assert response.get_json()['address'] == '1 New Road'
+    served = stale.get('/api/prescriptions/1').get_json()
+    assert next(m for m in served['medications'] if m['id'] == medication['id'])['dosage'] == '1g'
+
+    stats = stale.application.extensions['entity_cache'].stats()
+    assert (stats['verified'], stats['stale']) == (True, 2)
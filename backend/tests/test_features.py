@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BACKEND
+
+CHILD = f"""
+import sys
+sys.path.insert(0, {BACKEND!r})
+import app
+app.create_app()
+print(' '.join(sorted(name for name in sys.modules if name.startswith(('utils.', 'routes.')))))
+"""
+
+# Write-path hooks and pools that a read-only patients worker does not need
+NOT_FOR_PATIENTS = {'utils.billing_engine', 'utils.analytics_rollup', 'utils.bulk_import', 'utils.availability',
+                    'routes.billing', 'routes.auth'}
+
+
+def loaded(features, tmp_path):
+    env = dict(os.environ, APP_FEATURES=features, DATABASE_URL=f"sqlite:///{tmp_path / 'features.db'}")
+    result = subprocess.run([sys.executable, '-c', CHILD], env=env, cwd=tmp_path,
+                            capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize('features, expected, absent', [
+    ('patients', {'utils.patient_search', 'utils.dashboard_aggregates', 'utils.entity_cache'}, NOT_FOR_PATIENTS),
+    # Billing writes keep the dashboard and analytics rollups in step, even without the dashboard feature
+    ('billing', {'utils.billing_engine', 'utils.dashboard_aggregates', 'utils.analytics_rollup'},
+     {'utils.bulk_import', 'utils.availability', 'routes.patients'}),
+])
+def test_only_enabled_features_are_imported(tmp_path, features, expected, absent):
+    modules = loaded(features, tmp_path)
+    assert expected <= modules
+    assert not absent & modules
@@ -0,0 +1,16 @@
+import os
+
+import logger
+from config import Config
+
+
+def test_app_factories_share_one_listener(make_app):
+    apps = [make_app() for _ in range(3)]
+    # Each factory call replaced the previous listener instead of adding one
+    assert list(logger._listeners) == [apps[-1].logger.name]
+    listener, _ = logger._listeners[apps[-1].logger.name]
+    assert listener._thread is not None and listener._thread.is_alive()
+
+
+def test_log_file_is_absolute():
+    assert os.path.isabs(Config.LOG_FILE)
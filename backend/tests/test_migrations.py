@@ -0,0 +1,48 @@
+import ast
+import os
+
+from sqlalchemy import create_engine, text
+
+import migrations
+from extensions import db
+from utils import dashboard_aggregates
+
+
+def test_version_check_creates_no_sqlite_file(tmp_path, make_app, monkeypatch):
+    path = tmp_path / 'missing.db'
+    assert migrations.applied_version(create_engine(f'sqlite:///{path}')) is None
+
+    from config import Config
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{path}')
+    unmigrated = make_app()
+    assert unmigrated.extensions['schema']['current'] is False
+    assert unmigrated.test_client().get('/api/patients').status_code == 503
+    assert not os.path.exists(path)
+
+
+def test_migrations_import_no_live_code():
+    for migration in migrations.MIGRATIONS:
+        tree = ast.parse(open(migration.__file__).read())
+        modules = {node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)}
+        modules |= {alias.name for node in ast.walk(tree) if isinstance(node, ast.Import) for alias in node.names}
+        assert not {module for module in modules if module and module.split('.')[0] in ('models', 'utils')}, \
+            migration.__name__
+
+
+def test_upgrade_from_scratch_restores_indexes_and_derived_data(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('DELETE FROM schema_version'))
+            connection.execute(text('DROP INDEX ix_appointments_doctor_slot'))
+            connection.execute(text('DROP INDEX uq_appointments_scheduled_slot'))
+            connection.execute(text("UPDATE patients SET name_phonetic = ''"))
+            connection.execute(text('UPDATE dashboard_aggregates SET value = 0'))
+
+        assert migrations.upgrade(db.engine) == [migration.VERSION for migration in migrations.MIGRATIONS]
+        with db.engine.connect() as connection:
+            indexes = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+            keys = dict(connection.execute(text('SELECT id, name_phonetic FROM patients')).all())
+        assert {'ix_appointments_doctor_slot', 'uq_appointments_scheduled_slot'} <= indexes
+        assert keys == {1: 'J500 D000', 2: 'J500 S530'}
+        assert dashboard_aggregates.snapshot()['total_patients'] == 2
+        assert migrations.applied_version(db.engine) == migrations.head()
@@ -0,0 +1,31 @@
+import base64
+import json
+
+import pytest
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def test_cursor_walks_every_page(client):
+    first = client.get('/api/patients?limit=1').get_json()
+    assert [patient['id'] for patient in first['items']] == [1]
+    second = client.get(f"/api/patients?limit=1&cursor={first['next_cursor']}").get_json()
+    assert [patient['id'] for patient in second['items']] == [2]
+    assert second['next_cursor'] is None
+
+
+@pytest.mark.parametrize('values', [['x'], [True], [[1]], [{'id': 1}], [1, 2], 'not-a-list'])
+def test_tampered_cursor_is_a_bad_request(client, values):
+    response = client.get(f'/api/patients?limit=1&cursor={cursor(values)}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_export_gzip_follows_q_values(client):
+    path = '/api/export/appointments?format=ndjson'
+    assert client.get(path, headers={'Accept-Encoding': 'gzip, br'}).headers['Content-Encoding'] == 'gzip'
+    refused = client.get(path, headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in refused.headers
+    assert refused.headers['Vary'] == 'Accept-Encoding'
@@ -0,0 +1,21 @@
+def test_unpaginated_lists_and_stats_are_not_limited(client):
+    for path in ('/api/patients', '/api/appointments', '/api/dashboard/stats'):
+        assert {client.get(path).status_code for _ in range(40)} == {200}, path
+
+
+def test_exports_share_the_report_quota(client):
+    statuses = [client.get('/api/export/appointments?format=ndjson').status_code for _ in range(31)]
+    assert statuses == [200] * 30 + [429]
+    response = client.get('/api/dashboard/analytics?metric=revenue')
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    # Other classes keep their own budget
+    assert client.get('/api/patients/1').status_code == 200
+
+
+def test_quotas_are_per_client(client):
+    for _ in range(30):
+        client.get('/api/export/appointments?format=ndjson')
+    assert client.get('/api/export/appointments?format=ndjson').status_code == 429
+    other = client.get('/api/export/appointments?format=ndjson', environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert other.status_code == 200
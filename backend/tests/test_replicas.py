@@ -0,0 +1,28 @@
+import time
+
+from config import Config
+from utils.db_routing import STICKY_COOKIE, STICKY_HEADER
+
+
+def test_writes_keep_the_clients_reads_on_the_primary(app, make_app, monkeypatch):
+    # The database file doubles as its own replica
+    monkeypatch.setattr(Config, 'SQLALCHEMY_REPLICA_URIS', [app.config['SQLALCHEMY_DATABASE_URI']])
+    replicated = make_app()
+    client = replicated.test_client()
+    router = replicated.extensions['db_replicas']
+
+    write = client.put('/api/patients/1', json={'address': '1 New Road'})
+    assert write.status_code == 200
+    until = write.headers[STICKY_HEADER]
+    assert float(until) > time.time()
+    # The frontend is on another site: a Lax cookie would never come back
+    cookie = write.headers['Set-Cookie']
+    assert cookie.startswith(f'{STICKY_COOKIE}={until};')
+    assert 'Secure' in cookie and 'SameSite=None' in cookie
+
+    client.cookie_jar.clear()
+    assert client.get('/api/patients/2', headers={STICKY_HEADER: until}).status_code == 200
+    assert client.get('/api/patients/2').status_code == 200
+    assert client.get('/api/patients/2', headers={STICKY_HEADER: f'{time.time() - 1:.3f}'}).status_code == 200
+    stats = router.snapshot()
+    assert (stats['sticky_reads'], stats['replica_reads'], stats['writes']) == (1, 2, 1)
@@ -0,0 +1,70 @@
+import pytest
+
+# Enough rows that a lazy load per row would exceed conftest.STATEMENT_BUDGET
+ROWS = 12
+
+
+@pytest.fixture
+def populated(app, client):
+    from datetime import date, datetime
+    from extensions import db
+    from models.appointment import Appointment
+    from models.doctor import Doctor
+    from models.lab_test import LabTest
+    from models.patient import Patient
+    from models.prescription import Medication, Prescription
+
+    with app.app_context():
+        for i in range(ROWS):
+            patient = Patient(first_name=f'Patient{i}', last_name='Budget', date_of_birth=date(1990, 1, 1),
+                              gender='Other', address='1 Test Road', phone=f'98{i:08d}', email=f'budget{i}@example.com')
+            doctor = Doctor(first_name=f'Doctor{i}', last_name='Budget', specialization='General',
+                            phone=f'97{i:08d}', email=f'doctor{i}@example.com')
+            db.session.add_all([
+                Appointment(patient=patient, doctor=doctor, date='2030-01-07', time='09:00'),
+                Prescription(patient=patient, doctor=doctor, diagnosis='Flu', medications=[
+                    Medication(name='Paracetamol', dosage='500mg', frequency='TID'),
+                    Medication(name='Cetirizine', dosage='10mg', frequency='OD'),
+                ]),
+                LabTest(patient=patient, doctor=doctor, test_name='CBC', test_type='blood',
+                        test_date=datetime(2030, 1, 7)),
+            ])
+        db.session.commit()
+    return client
+
+
+@pytest.mark.parametrize('path', [
+    '/api/patients',
+    '/api/doctors',
+    '/api/appointments',
+    '/api/appointments?limit=20',
+    '/api/appointments?include=patient,doctor',
+    '/api/prescriptions',
+    '/api/prescriptions?limit=20',
+    '/api/lab-tests',
+    '/api/billing',
+    '/api/inventory',
+])
+def test_list_within_budget(populated, path):
+    # The app raises AssertionError past the budget (app.testing with SQL_STATEMENT_BUDGET)
+    response = populated.get(path)
+    assert response.status_code == 200
+
+
+def test_lists_embed_related_rows(populated):
+    appointments = populated.get('/api/appointments?limit=20').get_json()['items']
+    assert all(item['patient_name'] and item['doctor_name'] for item in appointments)
+    prescriptions = populated.get('/api/prescriptions?limit=20').get_json()['items']
+    assert all(len(item['medications']) == 2 for item in prescriptions if item['diagnosis'] == 'Flu')
+
+
+@pytest.mark.parametrize('path', [
+    '/api/patients/3',
+    '/api/doctors/3',
+    '/api/appointments/3',
+    '/api/appointments/3?include=patient',
+    '/api/prescriptions/3',
+    '/api/lab-tests/3',
+])
+def test_detail_within_budget(populated, path):
+    assert populated.get(path).status_code == 200
@@ -0,0 +1,180 @@
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from utils.rate_limit import endpoint_class
+
+# Retry-After sent with a 503 when a request is shed
+SHED_RETRY_AFTER = 2
+
+
+def parse_concurrency(value):
+    """Parse ADMISSION_LIMITS: ';'-separated 'class=N' entries, into {class: N}."""
+    limits = {}
+    for entry in value.split(';'):
+        if not entry.strip():
+            continue
+        name, _, count = entry.partition('=')
+        try:
+            limits[name.strip()] = int(count)
+        except ValueError:
+            raise ValueError(f"Invalid ADMISSION_LIMITS entry {entry.strip()!r}; expected 'class=N'")
+        if limits[name.strip()] < 1:
+            raise ValueError(f"Invalid ADMISSION_LIMITS entry {entry.strip()!r}; N must be positive")
+    return limits
+
+
+class LatencyTracker:
+    """
+    Exponentially weighted average of the DB time per statement, which decays
+    toward zero with `half_life` seconds when no samples arrive.
+    """
+
+    def __init__(self, weight=0.2, half_life=5.0):
+        self.weight = weight
+        self.half_life = half_life
+        self._value = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now):
+        return self._value * 0.5 ** ((now - self._updated) / self.half_life)
+
+    def record(self, ms):
+        now = time.monotonic()
+        with self._lock:
+            self._value = self._decayed(now) * (1 - self.weight) + ms * self.weight
+            self._updated = now
+
+    def value(self):
+        with self._lock:
+            return self._decayed(time.monotonic())
+
+
+class AdmissionController:
+    """
+    Concurrency slots per endpoint class for this worker. A request that finds
+    its class full waits up to `queue_seconds` for a slot and is shed after
+    that. While the DB time per statement of the requests in the other
+    classes averages over `latency_ms`, requests of the `shed_classes` are
+    shed straight away, so their queries stop competing with the rest.
+    """
+
+    def __init__(self, limits, queue_seconds=0.5, latency_ms=0.0, shed_classes=()):
+        self.limits = limits
+        self.queue_seconds = queue_seconds
+        self.latency_ms = latency_ms
+        self.shed_classes = set(shed_classes)
+        self.latency = LatencyTracker()
+        self._slots = {name: threading.BoundedSemaphore(count) for name, count in limits.items()}
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._in_flight = dict.fromkeys(limits, 0)
+
+    def _count(self, endpoint_class, name):
+        with self._lock:
+            counters = self._counters.setdefault(endpoint_class, dict.fromkeys(
+                ('admitted', 'queued', 'shed_queue_timeout', 'shed_db_latency'), 0))
+            counters[name] += 1
+
+    def overloaded(self):
+        return bool(self.latency_ms) and self.latency.value() > self.latency_ms
+
+    def admit(self, endpoint_class, wait=True):
+        """
+        Take a slot for a request of `endpoint_class`; returns the reason when
+        it is shed instead. Pass wait=False where blocking is not allowed (the
+        ASGI event loop); such requests are shed rather than queued.
+        """
+        if endpoint_class in self.shed_classes and self.overloaded():
+            self._count(endpoint_class, 'shed_db_latency')
+            return 'database latency'
+        slots = self._slots.get(endpoint_class)
+        if slots is not None and not slots.acquire(blocking=False):
+            self._count(endpoint_class, 'queued')
+            if not wait or not slots.acquire(timeout=self.queue_seconds):
+                self._count(endpoint_class, 'shed_queue_timeout')
+                return 'concurrency limit'
+        self._count(endpoint_class, 'admitted')
+        if slots is not None:
+            with self._lock:
+                self._in_flight[endpoint_class] += 1
+        return None
+
+    def release(self, endpoint_class, statements, db_ms):
+        slots = self._slots.get(endpoint_class)
+        if slots is not None:
+            with self._lock:
+                self._in_flight[endpoint_class] -= 1
+            slots.release()
+        if statements and endpoint_class not in self.shed_classes:
+            self.latency.record(db_ms / statements)
+
+    def snapshot(self):
+        with self._lock:
+            classes = {name: dict(counters) for name, counters in self._counters.items()}
+            in_flight = dict(self._in_flight)
+        return {
+            'limits': dict(self.limits),
+            'in_flight': in_flight,
+            'queue_seconds': self.queue_seconds,
+            'shed_classes': sorted(self.shed_classes),
+            'db_latency_threshold_ms': self.latency_ms,
+            'db_latency_ms': round(self.latency.value(), 3),
+            'overloaded': self.overloaded(),
+            'classes': classes,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+
+
+def service_unavailable(endpoint_class, reason):
+    response = jsonify({'error': f'Server busy ({reason}); retry {endpoint_class} requests later',
+                        'retry_after': SHED_RETRY_AFTER})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(SHED_RETRY_AFTER)
+    return response
+
+
+def init_admission(app):
+    """
+    Cap concurrent requests per endpoint class with ADMISSION_LIMITS
+    ('class=N;...', per worker). Requests over the cap queue for up to
+    ADMISSION_QUEUE_SECONDS and then get 503 with Retry-After. While the
+    average DB time per statement of the requests outside
+    ADMISSION_SHED_CLASSES exceeds ADMISSION_DB_LATENCY_MS (0 disables), the
+    shed classes (reports by default) get 503 at once, which keeps booking
+    and clinical reads responsive under a reporting burst. The controller is
+    stored in app.extensions['admission'].
+    """
+    limits = parse_concurrency(app.config.get('ADMISSION_LIMITS', ''))
+    latency_ms = app.config.get('ADMISSION_DB_LATENCY_MS', 0)
+    app.extensions['admission'] = None
+    if not limits and not latency_ms:
+        return
+    shed_classes = [name.strip() for name in app.config.get('ADMISSION_SHED_CLASSES', 'report').split(',')
+                    if name.strip()]
+    controller = AdmissionController(limits, app.config.get('ADMISSION_QUEUE_SECONDS', 0.5),
+                                     latency_ms, shed_classes)
+    app.extensions['admission'] = controller
+
+    @app.before_request
+    def admit_request():
+        if request.method == 'OPTIONS' or request.endpoint is None:
+            return
+        if 'endpoint_class' not in g:
+            g.endpoint_class = endpoint_class()
+        # Views served on the ASGI event loop must not block waiting for a slot
+        reason = controller.admit(g.endpoint_class, wait=not request.environ.get('hms.async'))
+        if reason is not None:
+            return service_unavailable(g.endpoint_class, reason)
+        g.admitted = True
+
+    @app.teardown_request
+    def release_slot(exc):
+        # Streamed responses (exports) tear down once the stream is finished
+        if g.pop('admitted', False):
+            controller.release(g.endpoint_class, g.get('sql_statement_count', 0), g.get('sql_time_ms', 0.0))
@@ -0,0 +1,224 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, String, cast, func, literal, select, type_coerce
+
+from extensions import db
+from models.analytics_daily import AnalyticsDaily
+from models.appointment import Appointment
+from models.billing import BillingRecord, BillingItem
+from models.doctor import Doctor
+from models.lab_test import LabTest
+
+BUCKETS = ('day', 'week', 'month')
+
+# Rollup dimension holding each metric's ungrouped daily totals
+TOTAL = 'total'
+
+# analytics_daily.group_key of the TOTAL rows and of rows whose group is NULL (e.g. a bill
+# without an appointment, grouped by doctor): the unique key needs a value, NULLs never conflict
+NO_GROUP = ''
+
+# analytics_daily column of each metric value; the rest are stored under their own name
+ROLLUP_COLUMNS = {'billed': 'amount'}
+
+
+class AnalyticsError(ValueError):
+    """Raised for unknown metrics, buckets or groupings."""
+
+
+def bucket_expr(column, bucket):
+    """
+    SQL expression labelling `column` with the YYYY-MM-DD start of its bucket
+    (weeks start on Monday). SQLite stores dates and datetimes as ISO
+    strings, so it works on the day prefix.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        source = cast(column, Date) if not isinstance(column.type, DateTime) else column
+        return func.to_char(func.date_trunc(bucket, source), 'YYYY-MM-DD')
+    day = func.substr(column, 1, 10)
+    if bucket == 'month':
+        return func.substr(column, 1, 7) + '-01'
+    if bucket == 'week':
+        return func.date(day, '-6 days', 'weekday 1')
+    return day
+
+
+def _doctor_groups(doctor_id):
+    return {
+        'doctor': (doctor_id, []),
+        'specialization': (Doctor.specialization, [(Doctor, Doctor.id == doctor_id, False)]),
+    }
+
+
+def _revenue():
+    via_appointment = (Appointment, Appointment.id == BillingRecord.appointment_id, True)
+    groups = {
+        'doctor': (Appointment.doctor_id, [via_appointment]),
+        'specialization': (Doctor.specialization, [via_appointment, (Doctor, Doctor.id == Appointment.doctor_id, True)]),
+        'payment_method': (BillingRecord.payment_method, []),
+        'payment_status': (BillingRecord.payment_status, []),
+    }
+    values = [
+        func.count(BillingRecord.id).label('count'),
+        func.coalesce(func.sum(BillingRecord.total_amount), 0).label('billed'),
+        func.coalesce(func.sum(BillingRecord.paid_amount), 0).label('collected'),
+        func.coalesce(func.sum(BillingRecord.total_amount - func.coalesce(BillingRecord.paid_amount, 0)), 0)
+            .label('outstanding'),
+    ]
+    return BillingRecord, BillingRecord.created_at, values, [BillingRecord.is_active == True], [], groups
+
+
+def _billing_items():
+    via_record = (BillingRecord, BillingRecord.id == BillingItem.billing_record_id, False)
+    via_appointment = (Appointment, Appointment.id == BillingRecord.appointment_id, True)
+    groups = {
+        'item_type': (BillingItem.item_type, []),
+        'payment_method': (BillingRecord.payment_method, []),
+        'doctor': (Appointment.doctor_id, [via_appointment]),
+        'specialization': (Doctor.specialization, [via_appointment, (Doctor, Doctor.id == Appointment.doctor_id, True)]),
+    }
+    values = [
+        func.count(BillingItem.id).label('count'),
+        func.coalesce(func.sum(BillingItem.quantity), 0).label('quantity'),
+        func.coalesce(func.sum(BillingItem.total_price), 0).label('amount'),
+    ]
+    filters = [BillingItem.is_active == True, BillingRecord.is_active == True]
+    return BillingItem, BillingRecord.created_at, values, filters, [via_record], groups
+
+
+def _appointments():
+    groups = dict(_doctor_groups(Appointment.doctor_id), status=(Appointment.status, []))
+    return Appointment, Appointment.date, [func.count(Appointment.id).label('count')], [], [], groups
+
+
+def _lab_tests():
+    groups = dict(
+        _doctor_groups(LabTest.doctor_id),
+        status=(LabTest.status, []),
+        test_type=(LabTest.test_type, [])
+    )
+    return LabTest, LabTest.test_date, [func.count(LabTest.id).label('count')], \
+        [LabTest.is_active == True], [], groups
+
+
+METRICS = {
+    'revenue': _revenue,
+    'billing_items': _billing_items,
+    'appointments': _appointments,
+    'lab_tests': _lab_tests,
+}
+
+
+def dimensions(metric):
+    """
+    The rollup dimensions kept for `metric`: TOTAL and every group_by except
+    specialization, which is read through the doctor rows.
+    """
+    groups = METRICS[metric]()[5]
+    return [TOTAL] + [name for name in groups if name != 'specialization']
+
+
+def _joined(query, joins):
+    joined = set()
+    for target, onclause, outer in joins:
+        if target in joined:
+            continue
+        joined.add(target)
+        query = query.join(target, onclause, isouter=outer)
+    return query
+
+
+def _in_days(date_column, first=None, last=None):
+    """Filters keeping `date_column` within the inclusive YYYY-MM-DD days `first`..`last`."""
+    # DateTime columns compare against midnight; YYYY-MM-DD string columns sort lexically
+    is_datetime = isinstance(date_column.type, DateTime)
+    filters = []
+    if first:
+        filters.append(date_column >= (datetime.strptime(first, '%Y-%m-%d') if is_datetime else first))
+    if last:
+        end = datetime.strptime(last, '%Y-%m-%d') + timedelta(days=1)
+        filters.append(date_column < end if is_datetime else date_column <= last)
+    return filters
+
+
+def source_select(metric, dimension, first=None, last=None, where=None):
+    """
+    SELECT computing the analytics_daily rows of `metric` split by
+    `dimension` from the source tables, for the inclusive days first..last
+    (all days when omitted), in rollup column order. `where` narrows it to
+    some source rows, e.g. the ones a flush touches.
+    """
+    model, date_column, values, filters, joins, groups = METRICS[metric]()
+    day = bucket_expr(date_column, 'day')
+    if dimension == TOTAL:
+        group = literal(NO_GROUP, String)
+    else:
+        group, group_joins = groups[dimension]
+        joins = joins + group_joins
+        group = func.coalesce(group if isinstance(group.type, String) else cast(group, String), NO_GROUP)
+    columns = [literal(metric).label('metric'), literal(dimension).label('dimension'), day.label('day'),
+               group.label('group_key')]
+    columns += [value.label(ROLLUP_COLUMNS.get(value.name, value.name)) for value in values]
+    query = _joined(select(*columns).select_from(model), joins)
+    if where is not None:
+        query = query.where(where)
+    return query.where(*filters, *_in_days(date_column, first, last)).group_by(day, group)
+
+
+def _parse_day(name, value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise AnalyticsError(f"{name} must use the YYYY-MM-DD format")
+
+
+def run_analytics(metric, bucket='month', group_by=None, date_from=None, date_to=None):
+    """
+    Aggregate `metric` per time bucket (and optional grouping) with a single
+    GROUP BY over the analytics_daily rollup. Dates are inclusive YYYY-MM-DD
+    strings.
+    """
+    if metric not in METRICS:
+        raise AnalyticsError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}")
+    if bucket not in BUCKETS:
+        raise AnalyticsError(f"Unknown bucket '{bucket}'. Use one of: {', '.join(BUCKETS)}")
+
+    _, _, values, _, _, groups = METRICS[metric]()
+    if group_by and group_by not in groups:
+        raise AnalyticsError(f"Cannot group {metric} by '{group_by}'. Use one of: {', '.join(groups)}")
+    if date_from:
+        _parse_day('date_from', date_from)
+    if date_to:
+        _parse_day('date_to', date_to)
+
+    rollup = AnalyticsDaily
+    label = bucket_expr(rollup.day, bucket).label('bucket')
+    columns = [label]
+    dimension = group_by or TOTAL
+    group_key = func.nullif(rollup.group_key, NO_GROUP)
+    query_joins = []
+    if group_by == 'specialization':
+        # Doctor rows joined at read time, so a doctor's new specialization applies to their history
+        dimension = 'doctor'
+        columns.append(Doctor.specialization.label('group'))
+        query_joins.append((Doctor, Doctor.id == cast(group_key, Integer), True))
+    elif group_by == 'doctor':
+        columns.append(cast(group_key, Integer).label('group'))
+    elif group_by:
+        columns.append(group_key.label('group'))
+
+    # Money stays exact, like the billing amounts it is summed from
+    sums = [
+        type_coerce(func.coalesce(func.sum(getattr(rollup, ROLLUP_COLUMNS.get(value.name, value.name))), 0),
+                    Integer if isinstance(value.type, Integer) else Numeric(12, 2)).label(value.name)
+        for value in values
+    ]
+    query = _joined(db.session.query(*columns, *sums).select_from(rollup), query_joins)
+    query = query.filter(rollup.metric == metric, rollup.dimension == dimension,
+                         *_in_days(rollup.day, date_from, date_to))
+
+    group_columns = columns[:2]
+    # Deltas leave zero-count rows behind when a group empties; they are not results
+    result = query.group_by(*group_columns).having(func.sum(rollup.count) > 0).order_by(*group_columns)
+    names = [column['name'] for column in result.column_descriptions]
+    return [dict(zip(names, row)) for row in result]
@@ -0,0 +1,247 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, delete, event, func, inspect, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+from models.analytics_daily import AnalyticsDaily
+from models.appointment import Appointment
+from models.billing import BillingItem, BillingRecord
+from models.lab_test import LabTest
+from utils.analytics import METRICS, ROLLUP_COLUMNS, dimensions, source_select
+
+# analytics_daily columns that flushes add their deltas to, and the key they are added under
+VALUE_COLUMNS = ('count', 'quantity', 'amount', 'collected', 'outstanding')
+KEY_COLUMNS = ('metric', 'dimension', 'day', 'group_key')
+
+
+def _changed(obj, names):
+    return any(inspect(obj).attrs[name].history.has_changes() for name in names)
+
+
+def _scope(ids):
+    """
+    {metric: where clause} selecting the source rows whose rollup
+    contribution a flush can change, from the ids of the flushed rows.
+    """
+    records, items = ids['records'], ids['items']
+    appointments, reassigned, lab_tests = ids['appointments'], ids['reassigned'], ids['lab_tests']
+    scope = {}
+    if records or reassigned:
+        # A reassigned appointment moves its bills between doctors
+        scope['revenue'] = or_(BillingRecord.id.in_(records), BillingRecord.appointment_id.in_(reassigned))
+    if records or items or reassigned:
+        # Items are dated, grouped and filtered through their record
+        scope['billing_items'] = or_(BillingItem.id.in_(items), BillingItem.billing_record_id.in_(records),
+                                     BillingRecord.appointment_id.in_(reassigned))
+    if appointments:
+        scope['appointments'] = Appointment.id.in_(appointments)
+    if lab_tests:
+        scope['lab_tests'] = LabTest.id.in_(lab_tests)
+    return scope
+
+
+def _day(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+def _flushed_ids(objects, ids):
+    for obj in objects:
+        if isinstance(obj, BillingItem):
+            # The billing hook rewrites the record's total for any item change
+            record = obj.billing_record_id or (obj.billing_record.id if obj.billing_record is not None else None)
+            if record is not None:
+                ids['records'].add(record)
+        if obj.id is None:
+            continue
+        if isinstance(obj, BillingRecord):
+            ids['records'].add(obj.id)
+        elif isinstance(obj, BillingItem):
+            ids['items'].add(obj.id)
+        elif isinstance(obj, Appointment):
+            ids['appointments'].add(obj.id)
+        elif isinstance(obj, LabTest):
+            ids['lab_tests'].add(obj.id)
+    return ids
+
+
+def _contributions(connection, scope):
+    """{(metric, dimension, day, group_key): {column: value}} of the source rows in `scope`."""
+    rows = {}
+    for metric, where in scope.items():
+        for dimension in dimensions(metric):
+            for row in connection.execute(source_select(metric, dimension, where=where)).mappings():
+                rows[tuple(row[name] for name in KEY_COLUMNS)] = {
+                    name: row[name] for name in VALUE_COLUMNS if name in row}
+    return rows
+
+
+def _before_flush(session, flush_context, instances):
+    # Contributions of the rows about to change, read before the flush writes them
+    ids = _flushed_ids([obj for obj in session.dirty if session.is_modified(obj)] + list(session.deleted),
+                       defaultdict(set))
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and obj.id is not None and _changed(obj, ('doctor_id',)):
+            ids['reassigned'].add(obj.id)
+    scope = _scope(ids)
+    session.info['analytics_before'] = (ids, _contributions(session.connection(), scope) if scope else {})
+
+
+def _after_flush(session, flush_context):
+    ids, before = session.info.pop('analytics_before', (defaultdict(set), {}))
+    scope = _scope(_flushed_ids(session.new, ids))
+    if not scope:
+        return
+    after = _contributions(session.connection(), scope)
+    deltas = defaultdict(list)
+    for key in set(before) | set(after):
+        old, new = before.get(key, {}), after.get(key, {})
+        delta = {name: (new.get(name) or 0) - (old.get(name) or 0) for name in set(old) | set(new)}
+        if any(delta.values()):
+            deltas[key[0]].append(dict(zip(KEY_COLUMNS, key), **delta))
+    for rows in deltas.values():
+        apply_deltas(session.connection(), rows)
+
+
+def apply_deltas(connection, rows):
+    """
+    Add each row's values to the analytics_daily row with the same key (see
+    KEY_COLUMNS), creating it when missing, in the caller's transaction.
+    Concurrent writers adding to the same day and group each land their
+    delta. All rows must carry the same value columns (one metric).
+    """
+    table = AnalyticsDaily.__table__
+    values = [name for name in VALUE_COLUMNS if name in rows[0]]
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql_insert if dialect == 'postgresql' else sqlite_insert
+        statement = insert(table)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={name: func.coalesce(table.c[name], 0) + statement.excluded[name] for name in values}
+        ), rows)
+        return
+    for row in rows:
+        key = and_(*(table.c[name] == row[name] for name in KEY_COLUMNS))
+        updated = connection.execute(update(table).where(key).values(
+            {name: func.coalesce(table.c[name], 0) + row[name] for name in values}))
+        if not updated.rowcount:
+            connection.execute(table.insert().values(row))
+
+
+def rebuild(connection, metric, first=None, last=None):
+    """
+    Replace the analytics_daily rows of `metric` for the inclusive days
+    first..last (all when omitted) with ones recomputed from the source
+    tables, in the caller's transaction.
+    """
+    table = AnalyticsDaily.__table__
+    if connection.dialect.name == 'postgresql':
+        # Writers' deltas wait until the rebuilt rows are committed, instead of landing on
+        # rows that are being replaced (SQLite already runs one writer at a time)
+        connection.execute(text('LOCK TABLE analytics_daily IN EXCLUSIVE MODE'))
+    # Naming every dimension lets the delete range over uq_analytics_daily_key's day column
+    stale = delete(table).where(table.c.metric == metric, table.c.dimension.in_(dimensions(metric)))
+    if first:
+        stale = stale.where(table.c.day >= first)
+    if last:
+        stale = stale.where(table.c.day <= last)
+    connection.execute(stale)
+    values = [ROLLUP_COLUMNS.get(value.name, value.name) for value in METRICS[metric]()[2]]
+    for dimension in dimensions(metric):
+        connection.execute(table.insert().from_select(
+            list(KEY_COLUMNS) + values,
+            source_select(metric, dimension, first, last)
+        ))
+
+
+def _months(connection, metric):
+    """(first, last) day pairs of every calendar month holding `metric` rows or rollup rows."""
+    date_column = METRICS[metric]()[1]
+    table = AnalyticsDaily.__table__
+    bounds = [
+        connection.execute(select(func.min(date_column), func.max(date_column))).first(),
+        connection.execute(select(func.min(table.c.day), func.max(table.c.day)).where(table.c.metric == metric)).first(),
+    ]
+    days = [_day(value) for pair in bounds for value in pair if value is not None]
+    if not days:
+        return
+    month = datetime.strptime(min(days)[:7], '%Y-%m').date()
+    while month.strftime('%Y-%m') <= max(days)[:7]:
+        following = (month + timedelta(days=32)).replace(day=1)
+        yield month.strftime('%Y-%m-%d'), (following - timedelta(days=1)).strftime('%Y-%m-%d')
+        month = following
+
+
+def reconcile(connection=None):
+    """
+    Recompute the whole rollup from the source tables, one calendar month
+    per metric at a time: in `connection`'s transaction, or one transaction
+    per month so writers are never held up for long.
+    """
+    for metric in METRICS:
+        if connection is not None:
+            for first, last in list(_months(connection, metric)):
+                rebuild(connection, metric, first, last)
+            continue
+        with db.engine.connect() as reader:
+            months = list(_months(reader, metric))
+        for first, last in months:
+            with db.engine.begin() as writer:
+                rebuild(writer, metric, first, last)
+
+
+def _reconcile_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                reconcile()
+            except Exception as e:
+                app.logger.error(f"Analytics rollup reconciliation failed: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def init_analytics_rollup(app):
+    """
+    Keep analytics_daily, the per-day rollup /api/dashboard/analytics reads,
+    current from ORM flushes: the contribution of every flushed billing
+    record, billing item, appointment or lab test is read before and after
+    the flush, and the difference is added to the rollup rows in the same
+    transaction. Register it after the billing hook, whose derived totals it
+    reads. A background thread rebuilds the whole rollup every
+    ANALYTICS_RECONCILE_SECONDS (started by the first request so it lives in
+    the serving process) to pick up Core writes, and `flask
+    reconcile-analytics` does it on demand.
+    """
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+
+    interval = app.config.get('ANALYTICS_RECONCILE_SECONDS', 3600)
+    started = []
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_reconciler():
+        if started or not interval:
+            return
+        with lock:
+            if not started:
+                threading.Thread(target=_reconcile_loop, args=(app, interval), daemon=True,
+                                 name='analytics-reconciler').start()
+                started.append(True)
+
+    @app.cli.command('reconcile-analytics')
+    def reconcile_analytics_command():
+        """Rebuild the analytics_daily rollup from the source tables."""
+        reconcile()
@@ -0,0 +1,260 @@
+import asyncio
+import io
+import sys
+from collections import namedtuple
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import current_app, jsonify
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Query
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from werkzeug.exceptions import HTTPException
+
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.lab_test import LabTest
+from models.patient import Patient
+from models.prescription import Prescription
+from utils.blocking import call_blocking
+from utils.conditional import not_modified, payload_not_modified
+from utils.db_engine import configure_engine, engine_options
+from utils.db_metrics import track_engine
+from utils.entity_cache import CACHED_MODELS, cached_entity
+from utils.pagination import PaginationError, fetch_all, filter_query, page_body, page_window, paginate
+from utils.serializer import FieldsError, json_response, project, requested_projection, serializer_for
+
+# Async drivers for the configured database
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+AsyncList = namedtuple('AsyncList', ['model', 'sort', 'descending', 'active_only', 'date_column', 'status_column'])
+
+# Read endpoints served natively on the async engine, keyed by Flask endpoint and
+# mirroring the sync views; every other route is passed through to the Flask app
+ASYNC_LISTS = {
+    'patients.get_patients': lambda: AsyncList(
+        Patient, (Patient.id,), False, False, Patient.created_at, None),
+    'appointments.get_appointments': lambda: AsyncList(
+        Appointment, (Appointment.id,), False, False, Appointment.date, Appointment.status),
+    'prescriptions.get_prescriptions': lambda: AsyncList(
+        Prescription, (Prescription.created_at, Prescription.id), True, True, Prescription.created_at, None),
+    'lab_tests.get_lab_tests': lambda: AsyncList(
+        LabTest, (LabTest.created_at, LabTest.id), True, True, LabTest.test_date, LabTest.status),
+}
+
+# Detail endpoints: (model, whether soft-deleted rows answer 404)
+ASYNC_DETAILS = {
+    'patients.get_patient': (Patient, False),
+    'doctors.get_doctor': (Doctor, False),
+    'appointments.get_appointment': (Appointment, False),
+    'prescriptions.get_prescription': (Prescription, True),
+    'lab_tests.get_lab_test': (LabTest, True),
+}
+
+
+def async_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend}; use one of {', '.join(ASYNC_DRIVERS)}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_async_db_engine(app):
+    """An AsyncEngine for SQLALCHEMY_DATABASE_URI with the same pool sizing, pragmas and metrics as db.engine."""
+    url = async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = engine_options(app.config, url)
+    if options.get('poolclass') is QueuePool:
+        options['poolclass'] = AsyncAdaptedQueuePool
+    engine = create_async_engine(url, **options)
+    app.extensions['async_pool_metrics'] = configure_engine(engine.sync_engine, app.config)
+    track_engine(engine.sync_engine)
+    return engine
+
+
+def list_view(connection, resource):
+    model, sort = resource.model, resource.sort
+    try:
+        serializer = serializer_for(model, required=sort, **requested_projection(model))
+        query = serializer.query()
+        if resource.active_only:
+            query = query.filter(model.is_active == True)
+        query = filter_query(query, model, date_column=resource.date_column, status_column=resource.status_column)
+        response = not_modified(page_window(query, sort, resource.descending)[0], model, connection)
+        if response is not None:
+            return response
+        page = paginate(query, sort, resource.descending, connection)
+        return json_response(page_body(page, serializer.dicts(page.items, connection)))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error fetching {model.__tablename__}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def detail_view(connection, model, active_only, id):
+    def load():
+        # ISO strings like to_dict(): the payload is cached for the sync views and sent with jsonify
+        serializer = serializer_for(model, native_temporal=False)
+        query = serializer.query().filter(model.id == id)
+        if active_only:
+            query = query.filter(model.is_active == True)
+        items = serializer.dicts(fetch_all(query, connection), connection)
+        return items[0] if items else None
+
+    try:
+        cached = model in CACHED_MODELS
+        if not cached:
+            # A session-less query: the validator runs on `connection`, db.session is never opened
+            response = not_modified(Query(model).filter(model.id == id), model, connection)
+            if response is not None:
+                return response
+        data = cached_entity(model, id, load, connection) if cached else load()
+        if data is None:
+            return jsonify({'error': f'{model.__name__} not found'}), 404
+        data = project(data, model, connection)
+        # Cached entities are validated against the payload served, as in the sync views
+        response = payload_not_modified(data) if cached else None
+        if response is not None:
+            return response
+        return jsonify(data)
+    except FieldsError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error fetching {model.__tablename__} {id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _environ(scope):
+    """A WSGI environ for a bodiless ASGI HTTP request, enough for a Flask request context."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        # Tells admission control not to block the event loop waiting for a slot
+        'hms.async': True,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsyncAPI:
+    """
+    ASGI application for the backend. GET/HEAD requests for the endpoints in
+    ASYNC_LISTS and ASYNC_DETAILS run on the async engine, so a request
+    waiting on the database holds no thread; everything else (writes,
+    exports, admin, dashboards) is handed to the Flask app through asgiref's
+    WSGI adapter and its thread pool. Routes are matched against the Flask
+    URL map, so both modes answer the same URLs and APP_FEATURES applies.
+
+    Async views run inside a Flask request context through
+    AsyncConnection.run_sync, which lets them share the sync views'
+    pagination, projection, ETag and serializer code: each statement is
+    awaited on the event loop rather than blocking it. The request hooks
+    (rate limits, schema checks, ...) and the Redis entity cache do blocking
+    I/O, so they run on the thread pool through utils.blocking, and response
+    bodies are sent chunk by chunk as the Flask response yields them.
+    """
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+        self.wsgi = WsgiToAsgi(app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            view = self._match(scope)
+            if view is not None:
+                return await self._serve(view, scope, send)
+        return await self.wsgi(scope, receive, send)
+
+    def _match(self, scope):
+        try:
+            endpoint, view_args = self.app.url_map.bind('localhost').match(scope['path'], method='GET')
+        except HTTPException:
+            return None
+        if endpoint in ASYNC_LISTS:
+            resource = ASYNC_LISTS[endpoint]()
+            return lambda connection: list_view(connection, resource)
+        if endpoint in ASYNC_DETAILS:
+            model, active_only = ASYNC_DETAILS[endpoint]
+            return lambda connection: detail_view(connection, model, active_only, **view_args)
+        return None
+
+    async def _serve(self, view, scope, send):
+        environ = _environ(scope)
+
+        def run(connection):
+            with self.app.request_context(environ):
+                try:
+                    rv = call_blocking(self.app.preprocess_request)
+                    if rv is None:
+                        rv = view(connection)
+                except Exception as e:
+                    self.app.logger.error(f"Async view failed: {str(e)}")
+                    rv = jsonify({'error': str(e)}), 500
+                return call_blocking(self.app.finalize_request, rv)
+
+        async with self.engine.connect() as connection:
+            response = await connection.run_sync(run)
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()],
+        })
+        loop = asyncio.get_running_loop()
+        try:
+            if scope['method'] != 'HEAD':
+                chunks = response.iter_encoded()
+                while True:
+                    if response.is_sequence:
+                        chunk = next(chunks, None)
+                    else:
+                        # A streamed body may block between chunks; pull each one on the thread pool
+                        chunk = await loop.run_in_executor(None, next, chunks, None)
+                    if chunk is None:
+                        break
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await loop.run_in_executor(None, response.close)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(app):
+    """Wrap a create_app() instance for an ASGI server (see asgi.py)."""
+    return AsyncAPI(app, create_async_db_engine(app))
@@ -0,0 +1,178 @@
+import threading
+import time
+from datetime import timedelta
+
+from flask import current_app
+
+from extensions import db
+from models.appointment import Appointment
+from utils.db_routing import primary_reads
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class AvailabilityIndex:
+    """
+    Per-process index of booked slots. Each (doctor_id, date) day is a bitmap
+    whose bit i is set when slot i (day_start + i * slot_minutes) holds a
+    scheduled appointment.
+
+    Days are loaded from the database on first use with one query per doctor
+    and date range, kept up to date by the appointment routes after each
+    commit, and reloaded after `ttl` seconds to pick up bookings made by
+    other worker processes.
+    """
+
+    def __init__(self, slot_minutes=15, day_start='08:00', day_end='18:00', ttl=30):
+        self.slot_minutes = slot_minutes
+        self.day_start = _minutes(day_start)
+        self.day_end = _minutes(day_end)
+        self.slot_count = (self.day_end - self.day_start) // slot_minutes
+        self.ttl = ttl
+        self._days = {}  # (doctor_id, date) -> (bitmap, loaded_at)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def slot_of(self, hhmm):
+        """Return the slot number covering an HH:MM time, or None outside opening hours."""
+        try:
+            offset = _minutes(hhmm) - self.day_start
+        except (ValueError, AttributeError):
+            return None
+        if offset < 0 or offset >= self.slot_count * self.slot_minutes:
+            return None
+        return offset // self.slot_minutes
+
+    def slot_time(self, slot):
+        minutes = self.day_start + slot * self.slot_minutes
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def _load(self, doctor_id, dates):
+        """
+        Return {date: bitmap} for `dates`, loading the days that are missing or
+        stale. The result is read here rather than from self._days afterwards,
+        where a concurrent release() may already have dropped the day.
+        """
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for date in dates:
+                entry = self._days.get((doctor_id, date))
+                if entry is not None and now - entry[1] <= self.ttl:
+                    found[date] = entry[0]
+            generation = self._generation
+        missing = [date for date in dates if date not in found]
+        if not missing:
+            return found
+
+        bitmaps = dict.fromkeys(missing, 0)
+        # Bookings are checked against this index, so it never reads from a lagging replica
+        with primary_reads():
+            rows = db.session.query(Appointment.date, Appointment.time).filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.date >= min(missing),
+                Appointment.date <= max(missing),
+                Appointment.status == 'scheduled'
+            ).all()
+        for date, hhmm in rows:
+            slot = self.slot_of(hhmm)
+            if date in bitmaps and slot is not None:
+                bitmaps[date] |= 1 << slot
+
+        with self._lock:
+            # A booking landed while we were reading; serve this result but reload next time
+            loaded_at = now if generation == self._generation else 0
+            for date, bitmap in bitmaps.items():
+                self._days[(doctor_id, date)] = (bitmap, loaded_at)
+        found.update(bitmaps)
+        return found
+
+    def booked_bitmap(self, doctor_id, date):
+        return self._load(doctor_id, [date])[date]
+
+    def is_free(self, doctor_id, date, hhmm):
+        """
+        Whether the slot starting at `hhmm` is free; None when `hhmm` is not a
+        slot start (outside opening hours or off the slot grid), which callers
+        answer with an exact lookup.
+        """
+        slot = self.slot_of(hhmm)
+        if slot is None or self.slot_time(slot) != hhmm:
+            return None
+        return not self.booked_bitmap(doctor_id, date) >> slot & 1
+
+    def is_taken(self, doctor_id, date, hhmm):
+        """
+        True only when `hhmm` is exactly a slot start and that slot is marked
+        booked. A hint: the bit may be set by an off-grid booking inside the
+        slot or be stale after another worker's cancellation, so callers
+        confirm with an exact query; the unique index on appointments
+        remains the authority.
+        """
+        slot = self.slot_of(hhmm)
+        if slot is None or self.slot_time(slot) != hhmm:
+            return False
+        return bool(self.booked_bitmap(doctor_id, date) >> slot & 1)
+
+    def free_slots(self, doctor_id, start_date, days):
+        """Free slot times for each of `days` consecutive dates starting at `start_date`."""
+        dates = [(start_date + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days)]
+        loaded = self._load(doctor_id, dates)
+        bitmaps = [loaded[date] for date in dates]
+        return [
+            {
+                'date': date,
+                'free': [self.slot_time(slot) for slot in range(self.slot_count) if not bitmap >> slot & 1]
+            }
+            for date, bitmap in zip(dates, bitmaps)
+        ]
+
+    def book(self, doctor_id, date, hhmm):
+        """Mark the slot covering `hhmm` as booked in an already loaded day."""
+        slot = self.slot_of(hhmm)
+        with self._lock:
+            self._generation += 1
+            key = (doctor_id, date)
+            if slot is not None and key in self._days:
+                bitmap, loaded_at = self._days[key]
+                self._days[key] = (bitmap | 1 << slot, loaded_at)
+
+    def release(self, doctor_id, date):
+        """
+        Forget a day after an appointment left it. Several appointments can share
+        a slot, so the day is reloaded rather than clearing a single bit.
+        """
+        with self._lock:
+            self._generation += 1
+            self._days.pop((doctor_id, date), None)
+
+    def apply_change(self, before, after):
+        """
+        Update the index for an appointment transition. `before` and `after`
+        are (doctor_id, date, time, status) tuples or None for create/delete.
+        """
+        if before and before[3] == 'scheduled' and before != after:
+            self.release(before[0], before[1])
+        if after and after[3] == 'scheduled':
+            self.book(after[0], after[1], after[2])
+
+
+def slot_key(appointment):
+    return (int(appointment.doctor_id), appointment.date, appointment.time, appointment.status)
+
+
+def init_availability(app):
+    app.extensions['availability'] = AvailabilityIndex(
+        slot_minutes=app.config.get('AVAILABILITY_SLOT_MINUTES', 15),
+        day_start=app.config.get('AVAILABILITY_DAY_START', '08:00'),
+        day_end=app.config.get('AVAILABILITY_DAY_END', '18:00'),
+        ttl=app.config.get('AVAILABILITY_TTL_SECONDS', 30)
+    )
+
+
+def availability_index():
+    return current_app.extensions['availability']
+
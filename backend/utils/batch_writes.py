@@ -0,0 +1,54 @@
+class BatchError(ValueError):
+    """Raised when a batch payload is invalid; nothing in the batch is written."""
+
+
+def apply_batch(children, upserts, delete_ids, fields, required, create):
+    """
+    Apply a batch of child-row changes to an already loaded collection, in
+    memory, so the caller can persist all of it with a single commit/flush.
+
+    children   -- the parent's loaded child rows (e.g. record.items)
+    upserts    -- list of dicts; rows with an `id` update that child, rows
+                  without one create a new child via `create(values)`
+    delete_ids -- ids of children to soft-delete (is_active = False)
+    fields     -- attribute names a payload row may set
+    required   -- fields a new row must provide
+
+    Returns {'created': n, 'updated': n, 'deleted': n}. Raises BatchError,
+    naming the offending row, before anything is modified.
+    """
+    if not isinstance(upserts, list) or not isinstance(delete_ids, list):
+        raise BatchError('Batch upserts and delete ids must be lists')
+    by_id = {child.id: child for child in children if child.is_active}
+
+    changes = []
+    for index, row in enumerate(upserts):
+        if not isinstance(row, dict):
+            raise BatchError(f'Row {index}: must be an object')
+        values = {key: row[key] for key in fields if key in row}
+        if row.get('id') is not None:
+            if row['id'] not in by_id:
+                raise BatchError(f"Row {index}: id {row['id']} does not belong to this record or was deleted")
+            changes.append((by_id[row['id']], values))
+            continue
+        missing = [key for key in required if values.get(key) in (None, '')]
+        if missing:
+            raise BatchError(f"Row {index}: missing required fields: {', '.join(missing)}")
+        changes.append((None, values))
+    for child_id in delete_ids:
+        if child_id not in by_id:
+            raise BatchError(f'Cannot delete id {child_id}: it does not belong to this record or was deleted')
+
+    counts = {'created': 0, 'updated': 0, 'deleted': 0}
+    for child, values in changes:
+        if child is None:
+            create(values)
+            counts['created'] += 1
+        else:
+            for key, value in values.items():
+                setattr(child, key, value)
+            counts['updated'] += 1
+    for child_id in set(delete_ids):
+        by_id[child_id].is_active = False
+        counts['deleted'] += 1
+    return counts
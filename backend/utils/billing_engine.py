@@ -0,0 +1,220 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+import click
+from sqlalchemy import and_, case, event, exists, func, inspect, literal, select, update
+
+from extensions import db
+from models.billing import BillingRecord, BillingItem
+from utils import analytics_rollup
+from utils.dashboard_aggregates import reconcile
+from utils.money import CENT, ZERO, to_money
+
+ADJUSTMENT = 'adjustment'
+
+
+def payment_status(total, paid):
+    """pending until something is paid, partial until the total is covered, then paid."""
+    if paid <= 0:
+        return 'pending'
+    if paid >= total:
+        return 'paid'
+    return 'partial'
+
+
+def _committed(obj, name):
+    history = inspect(obj).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, name)
+
+
+def _amount(is_active, total_price):
+    return ZERO if is_active is False else to_money(total_price)
+
+
+def _price(item):
+    """Derive the item's total from quantity and unit price; clients never set it."""
+    if item.quantity is None:
+        item.quantity = 1
+    item.unit_price = to_money(item.unit_price)
+    item.total_price = (item.unit_price * item.quantity).quantize(CENT)
+
+
+def _record(session, item, committed=False):
+    if not committed and item.billing_record is not None:
+        return item.billing_record
+    record_id = _committed(item, 'billing_record_id') if committed else item.billing_record_id
+    return session.get(BillingRecord, record_id) if record_id is not None else None
+
+
+def _adjust(session, record, amount):
+    """Book a manually entered amount as an adjustment line so the total stays the sum of its items."""
+    line = next((item for item in record.items if item.is_active and item.item_type == ADJUSTMENT), None)
+    if line is None:
+        line = BillingItem(item_type=ADJUSTMENT, description='Manual amount', quantity=1,
+                           unit_price=ZERO, is_active=True)
+        record.items.append(line)
+        session.add(line)
+    line.unit_price = to_money(line.unit_price) + amount
+    _price(line)
+
+
+def _before_flush(session, flush_context, instances):
+    """
+    Keep billing_records.total_amount equal to the sum of its active items and
+    payment_status derived from paid_amount, by applying per-flush deltas rather
+    than re-summing the invoice.
+    """
+    new, dirty, deleted = list(session.new), list(session.dirty), list(session.deleted)
+    deltas = defaultdict(Decimal)
+    touched = set()
+
+    for item in new:
+        if isinstance(item, BillingItem):
+            _price(item)
+            deltas[_record(session, item)] += _amount(item.is_active, item.total_price)
+    for item in dirty:
+        if isinstance(item, BillingItem) and item not in deleted and session.is_modified(item):
+            before = _amount(_committed(item, 'is_active'), _committed(item, 'total_price'))
+            _price(item)
+            deltas[_record(session, item, committed=True)] -= before
+            deltas[_record(session, item)] += _amount(item.is_active, item.total_price)
+    for item in deleted:
+        if isinstance(item, BillingItem):
+            deltas[_record(session, item, committed=True)] -= \
+                _amount(_committed(item, 'is_active'), _committed(item, 'total_price'))
+    deltas.pop(None, None)
+
+    for record in new:
+        if isinstance(record, BillingRecord):
+            manual = to_money(record.total_amount)
+            record.total_amount = ZERO
+            # A record posted with a bare amount and no lines gets that amount as one adjustment line
+            if record not in deltas and manual:
+                _adjust(session, record, manual)
+                deltas[record] += manual
+            touched.add(record)
+    for record in dirty:
+        if isinstance(record, BillingRecord) and session.is_modified(record):
+            history = inspect(record).attrs.total_amount.history
+            if history.deleted:
+                # A total typed in by hand becomes a change to the adjustment line
+                old, wanted = to_money(history.deleted[0]), to_money(record.total_amount)
+                record.total_amount = old
+                if wanted != old:
+                    _adjust(session, record, wanted - old)
+                    deltas[record] += wanted - old
+            touched.add(record)
+
+    for record, delta in deltas.items():
+        if delta:
+            record.total_amount = to_money(record.total_amount) + delta
+        touched.add(record)
+    for record in touched:
+        record.total_amount = to_money(record.total_amount)
+        record.paid_amount = to_money(record.paid_amount)
+        record.payment_status = payment_status(record.total_amount, record.paid_amount)
+
+
+def _status(total, paid):
+    """payment_status as a SQL expression over the values a record's UPDATE writes."""
+    return case((paid <= 0, 'pending'), (paid >= total, 'paid'), else_='partial')
+
+
+def _as_increment(record, name):
+    """
+    The SQL value for a changed money column: `column + (new - old)` when the old
+    value was loaded, so the flush adds its change to whatever is stored now.
+    """
+    history = inspect(record).attrs[name].history
+    column = getattr(BillingRecord, name)
+    if not history.added:
+        return func.coalesce(column, 0), False
+    if not history.deleted:
+        return to_money(history.added[0]), True
+    return func.coalesce(column, 0) + (to_money(history.added[0]) - to_money(history.deleted[0])), True
+
+
+def _before_update(mapper, connection, record):
+    """
+    Write total_amount and paid_amount changes as in-place increments, with the
+    status derived in the same UPDATE, so two workers paying or changing lines on
+    one bill both count instead of the later write overwriting the earlier one.
+    """
+    total, total_changed = _as_increment(record, 'total_amount')
+    paid, paid_changed = _as_increment(record, 'paid_amount')
+    if not (total_changed or paid_changed):
+        return
+    if total_changed:
+        record.total_amount = total
+    if paid_changed:
+        record.paid_amount = paid
+    record.payment_status = _status(total, paid)
+
+
+def rederive_records(connection, condition=None):
+    """
+    Set-based recomputation of item totals, record totals and payment statuses
+    for the billing records matching `condition` (all when None). Records that
+    only ever had a bare amount get it booked as an adjustment line first.
+    """
+    records, items = BillingRecord.__table__, BillingItem.__table__
+    condition = condition if condition is not None else records.c.id.isnot(None)
+    active_items = and_(items.c.billing_record_id == records.c.id, items.c.is_active.isnot(False))
+    now = literal(datetime.utcnow())
+    paid = func.coalesce(records.c.paid_amount, 0)
+
+    connection.execute(items.insert().from_select(
+        ['billing_record_id', 'item_type', 'description', 'quantity', 'unit_price', 'total_price',
+         'is_active', 'created_at', 'updated_at'],
+        select(records.c.id, literal(ADJUSTMENT), literal('Manual amount'), literal(1),
+               records.c.total_amount, records.c.total_amount, literal(True), now, now)
+        .where(condition, records.c.total_amount != 0, ~exists().where(active_items))
+    ))
+    connection.execute(
+        update(items).where(items.c.billing_record_id.in_(select(records.c.id).where(condition)))
+        .values(total_price=func.round(func.coalesce(items.c.quantity, 1) * items.c.unit_price, 2))
+    )
+    item_sum = select(func.coalesce(func.sum(items.c.total_price), 0)).where(active_items).scalar_subquery()
+    connection.execute(update(records).where(condition).values(total_amount=item_sum))
+    connection.execute(update(records).where(condition).values(
+        paid_amount=paid,
+        payment_status=_status(records.c.total_amount, paid)
+    ))
+
+
+def rederive(batch_size=10000, logger=None):
+    """
+    Re-derive all billing data, one id range per transaction. For historical
+    data and audits; day to day the flush hook keeps everything consistent
+    incrementally.
+    """
+    records = BillingRecord.__table__
+    with db.engine.connect() as connection:
+        last = connection.execute(select(func.max(records.c.id))).scalar() or 0
+    for start in range(0, last, batch_size):
+        with db.engine.begin() as connection:
+            rederive_records(connection, and_(records.c.id > start, records.c.id <= start + batch_size))
+        if logger:
+            logger.info(f"Re-derived billing records {start + 1}-{min(start + batch_size, last)}")
+
+
+def init_billing_engine(app):
+    """Register the billing flush hooks and the `flask rederive-billing` command."""
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+    if not event.contains(BillingRecord, 'before_update', _before_update):
+        event.listen(BillingRecord, 'before_update', _before_update)
+
+    @app.cli.command('rederive-billing')
+    @click.option('--batch-size', type=int, default=10000, help='Billing records per transaction.')
+    def rederive_billing_command(batch_size):
+        """Recompute billing item totals, record totals and payment statuses."""
+        rederive(batch_size, app.logger)
+        # Totals moved outside the ORM, so refresh the dashboard revenue and analytics too
+        reconcile()
+        analytics_rollup.reconcile()
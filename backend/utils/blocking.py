@@ -0,0 +1,31 @@
+import asyncio
+import contextvars
+import functools
+
+from flask import has_request_context, request
+from sqlalchemy.util import await_only
+
+from extensions import db
+
+
+def _in_thread(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # db.session is scoped per greenlet/thread: drop whatever the pool thread opened
+        db.session.remove()
+
+
+def call_blocking(fn, *args, **kwargs):
+    """
+    Call `fn`, which may block on I/O (a Redis or SQLite round trip, a
+    db.session query). In an async view, which runs on the event loop inside
+    AsyncConnection.run_sync, it runs on the loop's default thread pool with
+    the current Flask context, and the view waits for it without holding up
+    other requests. Anywhere else it is simply called.
+    """
+    if not has_request_context() or not request.environ.get('hms.async'):
+        return fn(*args, **kwargs)
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _in_thread, fn, *args, **kwargs)
+    return await_only(asyncio.get_running_loop().run_in_executor(None, call))
@@ -0,0 +1,204 @@
+import csv
+import json
+from datetime import date, datetime
+from itertools import islice
+
+import click
+from sqlalchemy.exc import DBAPIError
+
+from extensions import db
+from models.doctor import Doctor
+from models.inventory import InventoryItem
+from models.patient import Patient
+from utils.dashboard_aggregates import apply_deltas
+from utils.patient_search import phonetic_key
+from validators import validate_email, validate_patient_data, validate_phone
+
+FORMATS = ('ndjson', 'csv')
+GENDERS = ('Male', 'Female', 'Other')
+
+
+class BulkImportError(ValueError):
+    """Raised for unknown entities or formats; row problems are reported, not raised."""
+
+
+def _text(row, name, default=''):
+    value = row.get(name)
+    return default if value is None else str(value).strip()
+
+
+def _patient(row):
+    data = {name: _text(row, name) for name in
+            ('first_name', 'last_name', 'date_of_birth', 'gender', 'address', 'phone', 'email')}
+    is_valid, message = validate_patient_data(data)
+    if not is_valid:
+        return None, message
+    if not data['phone']:
+        return None, 'Missing required field: phone'
+    if data['gender'] not in GENDERS:
+        return None, 'Gender must be Male, Female, or Other'
+    data['date_of_birth'] = date.fromisoformat(data['date_of_birth'])
+    # Core inserts skip the ORM hook that maintains this
+    data['name_phonetic'] = phonetic_key(data['first_name'], data['last_name'])
+    return data, None
+
+
+def _doctor(row):
+    data = {name: _text(row, name) for name in ('first_name', 'last_name', 'specialization', 'phone', 'email')}
+    for name, value in data.items():
+        if not value:
+            return None, f'Missing required field: {name}'
+    is_valid, message = validate_email(data['email'])
+    if is_valid:
+        is_valid, message = validate_phone(data['phone'])
+    return (data, None) if is_valid else (None, message)
+
+
+def _inventory(row):
+    data = {name: _text(row, name) for name in ('name', 'category', 'unit', 'supplier')}
+    for name in ('name', 'category', 'unit'):
+        if not data[name]:
+            return None, f'Missing required field: {name}'
+    try:
+        data['quantity'] = int(row.get('quantity'))
+        data['price_per_unit'] = float(row.get('price_per_unit'))
+        data['minimum_stock'] = int(row.get('minimum_stock') or 0)
+    except (TypeError, ValueError):
+        return None, 'quantity, price_per_unit and minimum_stock must be numbers'
+    if data['quantity'] < 0 or data['price_per_unit'] < 0:
+        return None, 'quantity and price_per_unit must not be negative'
+    expiry = _text(row, 'expiry_date')
+    try:
+        data['expiry_date'] = datetime.fromisoformat(expiry) if expiry else None
+    except ValueError:
+        return None, 'Invalid expiry_date. Use ISO format (YYYY-MM-DD)'
+    data['supplier'] = data['supplier'] or None
+    return data, None
+
+
+# entity -> (model, row validator/converter, dashboard aggregate key counting inserted rows)
+ENTITIES = {
+    'patients': (Patient, _patient, 'total_patients'),
+    'doctors': (Doctor, _doctor, None),
+    'inventory': (InventoryItem, _inventory, 'inventory_count'),
+}
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line number, row dict or None, parse error) from a text stream of
+    NDJSON objects or CSV with a header line, without reading it all at once.
+    """
+    if fmt not in FORMATS:
+        raise BulkImportError(f"format must be one of: {', '.join(FORMATS)}")
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, row, None
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, row, None
+
+
+def validate_batch(entity, batch):
+    """Validate and convert a batch of read_rows() tuples into ([(line, values)], [errors])."""
+    _, convert, _ = ENTITIES[entity]
+    now = datetime.utcnow()
+    valid, errors = [], []
+    for number, row, error in batch:
+        values = None
+        if error is None:
+            values, error = convert(row)
+        if error is not None:
+            errors.append({'row': number, 'error': error})
+            continue
+        values.update(is_active=True, created_at=now, updated_at=now)
+        valid.append((number, values))
+    return valid, errors
+
+
+def _insert(table, aggregate_key, valid, errors):
+    """
+    executemany one chunk in its own transaction. If the database rejects it,
+    retry row by row so only the offending rows are reported. Returns rows inserted.
+    """
+    def write(connection, rows):
+        connection.execute(table.insert(), rows)
+        if aggregate_key:
+            apply_deltas(connection, {aggregate_key: len(rows)})
+
+    try:
+        with db.engine.begin() as connection:
+            write(connection, [values for _, values in valid])
+        return len(valid)
+    except DBAPIError:
+        inserted = 0
+        for number, values in valid:
+            try:
+                with db.engine.begin() as connection:
+                    write(connection, [values])
+                inserted += 1
+            except DBAPIError as e:
+                errors.append({'row': number, 'error': str(e.orig)})
+        return inserted
+
+
+def import_rows(entity, rows, chunk_size=5000, max_errors=1000):
+    """
+    Validate and insert an iterable of read_rows() tuples in chunks of
+    `chunk_size`, one transaction per chunk so a failure part way through a
+    large load keeps the chunks already written. Returns a report with the
+    first `max_errors` per-row errors.
+    """
+    if entity not in ENTITIES:
+        raise BulkImportError(f"Unknown bulk entity: {entity}. Use one of: {', '.join(ENTITIES)}")
+    model, _, aggregate_key = ENTITIES[entity]
+    table = model.__table__
+    report = {'entity': entity, 'received': 0, 'inserted': 0, 'failed': 0, 'errors': []}
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        valid, errors = validate_batch(entity, batch)
+        if valid:
+            report['inserted'] += _insert(table, aggregate_key, valid, errors)
+        report['received'] += len(batch)
+        report['failed'] += len(errors)
+        room = max_errors - len(report['errors'])
+        report['errors'].extend(sorted(errors, key=lambda error: error['row'])[:room])
+    return report
+
+
+def init_bulk_import(app):
+    """Register the `flask bulk-import` command."""
+
+    @app.cli.command('bulk-import')
+    @click.argument('entity', type=click.Choice(list(ENTITIES)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS), default=None,
+                  help='Input format; defaults to the file extension.')
+    @click.option('--chunk-size', type=int, default=None, help='Rows per INSERT batch.')
+    def bulk_import_command(entity, path, fmt, chunk_size):
+        """Load patients, doctors or inventory from an NDJSON or CSV file."""
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        chunk_size = chunk_size or app.config.get('BULK_CHUNK_SIZE', 5000)
+        started = datetime.utcnow()
+        with open(path, newline='', encoding='utf-8') as stream:
+            report = import_rows(entity, read_rows(stream, fmt), chunk_size,
+                                 app.config.get('BULK_MAX_ERRORS', 1000))
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        print(f"{report['inserted']} of {report['received']} {entity} rows inserted in {elapsed:.1f}s, "
+              f"{report['failed']} failed")
+        for error in report['errors']:
+            print(f"  line {error['row']}: {error['error']}")
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+from sqlalchemy import func, select
+
+from extensions import db
+from models.appointment import Appointment
+from models.prescription import Prescription
+from utils.serializer import requested_projection
+
+# Relationships whose rows appear in a model's to_dict() without touching the
+# model's own updated_at; their (max(updated_at), count) is folded into the ETag.
+ETAG_RELATED = {
+    Appointment: lambda: (Appointment.patient, Appointment.doctor),
+    Prescription: lambda: (Prescription.medications,),
+}
+
+
+def _validator(query, model, connection=None):
+    """
+    (last_modified, parts) for the rows `query` would return, computed with a
+    single aggregate SELECT over (id, updated_at) instead of loading the rows.
+    """
+    relationships = list(ETAG_RELATED.get(model, lambda: ())())
+    # Objects embedded with ?include= count too
+    for name in requested_projection(model)['include']:
+        if name not in {rel.key for rel in relationships}:
+            relationships.append(getattr(model, name))
+    local_columns = {local.key: local for rel in relationships for local, _ in rel.property.local_remote_pairs}
+    window = query.with_entities(model.updated_at.label('updated_at'), *local_columns.values()).subquery()
+
+    columns = [
+        select(func.max(window.c.updated_at)).scalar_subquery(),
+        select(func.count()).select_from(window).scalar_subquery(),
+    ]
+    for rel in relationships:
+        related = rel.property.mapper.class_
+        (local, remote), = rel.property.local_remote_pairs
+        matching = remote.in_(select(window.c[local.key]))
+        columns.append(select(func.max(related.updated_at)).where(matching).scalar_subquery())
+        columns.append(select(func.count()).select_from(related).where(matching).scalar_subquery())
+    row = (connection if connection is not None else db.session).execute(select(*columns)).one()
+
+    stamps = [value for value in row[::2] if value is not None]
+    return (max(stamps) if stamps else None), tuple(row)
+
+
+def not_modified(query, model, connection=None):
+    """
+    Compute a weak ETag and Last-Modified for the rows of `query` and return a
+    304 response when the client's copy is current, else None. The validators
+    are remembered and added to the route's eventual 200 response.
+
+    The ETag covers the request path and query string, so every filter, page
+    and response shape gets its own validator. The aggregate runs on
+    `connection` when given, else on the session.
+    """
+    last_modified, parts = _validator(query, model, connection)
+    digest = hashlib.sha1(repr((request.full_path, parts)).encode('utf-8')).hexdigest()[:32]
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return _respond(digest, last_modified)
+
+
+def _respond(digest, last_modified):
+    g.conditional = (digest, last_modified)
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(digest)
+    else:
+        since = request.if_modified_since
+        fresh = since is not None and last_modified is not None and last_modified.replace(microsecond=0) <= since
+    if not fresh:
+        return None
+    response = current_app.response_class(status=304)
+    _add_validators(response)
+    return response
+
+
+def _latest_stamp(value):
+    """The newest `updated_at` anywhere in a payload, nested rows included."""
+    stamps = []
+    if isinstance(value, dict):
+        stamp = value.get('updated_at')
+        if isinstance(stamp, str):
+            stamp = datetime.fromisoformat(stamp)
+        if isinstance(stamp, datetime):
+            stamps.append(stamp)
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            stamp = _latest_stamp(item)
+            if stamp is not None:
+                stamps.append(stamp)
+    return max(stamps) if stamps else None
+
+
+def payload_not_modified(payload):
+    """
+    not_modified() for a payload already in hand, such as one served from the
+    entity cache: the ETag is a digest of the payload itself and
+    Last-Modified its newest updated_at, so the validators always describe
+    the body that is sent and a cache hit costs only its version probe.
+    """
+    body = json.dumps(payload, sort_keys=True, default=str)
+    digest = hashlib.sha1(f"{request.full_path}\n{body}".encode('utf-8')).hexdigest()[:32]
+    last_modified = _latest_stamp(payload)
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return _respond(digest, last_modified)
+
+
+def _add_validators(response):
+    digest, last_modified = g.conditional
+    response.set_etag(digest, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let clients keep the body but revalidate on every use; the data is per patient
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+
+def init_conditional(app):
+    """Attach the validators computed by not_modified() to successful GET responses."""
+
+    @app.after_request
+    def add_conditional_headers(response):
+        if request.method == 'GET' and response.status_code == 200 and g.get('conditional'):
+            _add_validators(response)
+        return response
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, or_, select, update
+
+from extensions import db
+from models.appointment import Appointment
+from models.billing import BillingRecord
+from models.dashboard_aggregate import DashboardAggregate
+from models.inventory import InventoryItem
+from models.patient import Patient
+from utils.money import ZERO, to_money
+
+COUNT_KEYS = ('total_patients', 'total_appointments', 'inventory_count')
+
+
+def _active(column):
+    # is_active defaults to True, so NULL counts as active
+    return or_(column == True, column.is_(None))
+
+
+# key -> scalar subquery recomputing the aggregate from the source table
+def _sources():
+    return {
+        # Every patient, soft-deleted or not, as admin-stats has always counted them
+        'total_patients': select(func.count(Patient.id)),
+        'total_appointments': select(func.count(Appointment.id)),
+        'total_revenue': select(func.coalesce(func.sum(BillingRecord.total_amount), 0))
+            .where(_active(BillingRecord.is_active)),
+        'inventory_count': select(func.count(InventoryItem.id)).where(_active(InventoryItem.is_active)),
+    }
+
+
+def _contribution(obj, value_of):
+    """What a single row adds to each aggregate, given an accessor for its attribute values."""
+    if isinstance(obj, Patient):
+        return {'total_patients': 1}
+    if isinstance(obj, Appointment):
+        return {'total_appointments': 1}
+    if isinstance(obj, BillingRecord):
+        if value_of('is_active') is False:
+            return {'total_revenue': ZERO}
+        return {'total_revenue': to_money(value_of('total_amount'))}
+    if isinstance(obj, InventoryItem):
+        return {'inventory_count': 0 if value_of('is_active') is False else 1}
+    return {}
+
+
+def _committed_value(obj, name):
+    history = inspect(obj).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    # Old value was never loaded; assume unchanged and let reconciliation catch drift
+    return getattr(obj, name)
+
+
+def _before_flush(session, flush_context, instances):
+    # Computed before the flush: the billing engine writes money as SQL increments,
+    # which leaves those columns expired, with no history, once the flush has run
+    deltas = session.info['dashboard_deltas'] = defaultdict(lambda: ZERO)
+    for obj in session.new:
+        for key, amount in _contribution(obj, lambda name: getattr(obj, name)).items():
+            deltas[key] += amount
+    for obj in session.deleted:
+        for key, amount in _contribution(obj, lambda name: _committed_value(obj, name)).items():
+            deltas[key] -= amount
+    for obj in session.dirty:
+        if obj in session.deleted or not session.is_modified(obj):
+            continue
+        before = _contribution(obj, lambda name: _committed_value(obj, name))
+        after = _contribution(obj, lambda name: getattr(obj, name))
+        for key in after:
+            deltas[key] += after[key] - before[key]
+
+
+def _after_flush(session, flush_context):
+    deltas = session.info.pop('dashboard_deltas', {})
+    deltas = {key: amount for key, amount in deltas.items() if amount}
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def apply_deltas(connection, deltas):
+    """
+    Add `deltas` ({key: amount}) to the stored aggregates inside the caller's
+    transaction. Code that writes with Core/bulk statements, bypassing the
+    ORM flush hook, should call this itself.
+    """
+    table = DashboardAggregate.__table__
+    now = datetime.utcnow()
+    for key, amount in deltas.items():
+        connection.execute(
+            update(table).where(table.c.key == key).values(value=table.c.value + amount, updated_at=now)
+        )
+
+
+def reconcile(connection=None):
+    """
+    Recompute every aggregate from the source tables, one UPDATE ... = (SELECT ...)
+    per key, in `connection`'s transaction or a new one.
+    """
+    if connection is None:
+        with db.engine.begin() as connection:
+            return reconcile(connection)
+    table = DashboardAggregate.__table__
+    now = datetime.utcnow()
+    existing = set(connection.execute(select(table.c.key)).scalars())
+    for key, source in _sources().items():
+        if key not in existing:
+            connection.execute(table.insert().values(key=key, value=0, updated_at=now))
+        connection.execute(
+            update(table).where(table.c.key == key).values(value=source.scalar_subquery(), updated_at=now)
+        )
+
+
+def snapshot():
+    """Return the stored aggregates as {key: value}, seeding them on first use."""
+    rows = dict(db.session.query(DashboardAggregate.key, DashboardAggregate.value).all())
+    if len(rows) < len(_sources()):
+        reconcile()
+        rows = dict(db.session.query(DashboardAggregate.key, DashboardAggregate.value).all())
+    return {key: int(value) if key in COUNT_KEYS else value for key, value in rows.items()}
+
+
+def _reconcile_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                reconcile()
+            except Exception as e:
+                app.logger.error(f"Dashboard aggregate reconciliation failed: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def init_dashboard_aggregates(app):
+    """
+    Maintain dashboard_aggregates incrementally from ORM flushes, reconcile it
+    every DASHBOARD_RECONCILE_SECONDS in a background thread (started by the
+    first request so it lives in the serving process) and register the
+    `flask reconcile-dashboard` command.
+    """
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+
+    interval = app.config.get('DASHBOARD_RECONCILE_SECONDS', 300)
+    started = []
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_reconciler():
+        if started or not interval:
+            return
+        with lock:
+            if not started:
+                threading.Thread(target=_reconcile_loop, args=(app, interval), daemon=True,
+                                 name='dashboard-reconciler').start()
+                started.append(True)
+
+    @app.cli.command('reconcile-dashboard')
+    def reconcile_dashboard_command():
+        """Recompute the dashboard aggregates from the source tables."""
+        reconcile()
+        print(snapshot())
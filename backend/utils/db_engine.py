@@ -0,0 +1,154 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def engine_options(config, url=None):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database (or `url`): a sized QueuePool,
+    plus pre-ping and recycling for server databases. SQLite files get a
+    QueuePool too (SQLAlchemy 1.4 defaults them to NullPool, which reconnects
+    and re-runs the pragmas on every checkout) and are tuned per connection
+    by the pragmas in init_db_engine.
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(url or config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        connect_args = options.setdefault('connect_args', {})
+        # Python's sqlite3 busy handler, in seconds; PRAGMA busy_timeout below sets the same
+        connect_args.setdefault('timeout', config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+        if url.database in (None, '', ':memory:'):
+            return options
+        # Pooled connections move between request threads, one thread at a time
+        connect_args.setdefault('check_same_thread', False)
+        options.setdefault('poolclass', QueuePool)
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+        return options
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    return options
+
+
+def _sqlite_pragmas(config, read_only=False):
+    pragmas = [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if read_only:
+        # A write that was routed to a replica fails instead of silently diverging
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+class PoolMetrics:
+    """Connection pool counters, fed by pool events and reported next to the pool's own status."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('connects', 'checkouts', 'checkins', 'invalidations'), 0)
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._held_ms = 0.0
+        self._max_held_ms = 0.0
+
+    def connected(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._counters['connects'] += 1
+
+    def checked_out(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        with self._lock:
+            self._counters['checkouts'] += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+    def checked_in(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        with self._lock:
+            self._counters['checkins'] += 1
+            if started is not None:
+                self._in_use -= 1
+                held_ms = (time.perf_counter() - started) * 1000
+                self._held_ms += held_ms
+                self._max_held_ms = max(self._max_held_ms, held_ms)
+
+    def invalidated(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._counters['invalidations'] += 1
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self._lock:
+            stats = dict(
+                self._counters,
+                pool_class=type(pool).__name__,
+                in_use=self._in_use,
+                peak_in_use=self._peak_in_use,
+                avg_held_ms=round(self._held_ms / self._counters['checkins'], 3) if self._counters['checkins'] else None,
+                max_held_ms=round(self._max_held_ms, 3)
+            )
+        # QueuePool sizing; NullPool/SingletonThreadPool (SQLite) have none of these
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, name):
+                stats[name] = getattr(pool, name)()
+        if stats.get('size'):
+            capacity = stats['size'] + max(getattr(pool, '_max_overflow', 0), 0)
+            stats['utilization'] = round(stats['checkedout'] / capacity, 4)
+        stats['status'] = pool.status()
+        return stats
+
+    def reset(self):
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+            self._peak_in_use = self._in_use
+            self._held_ms = 0.0
+            self._max_held_ms = 0.0
+
+
+def configure_engine(engine, config, read_only=False):
+    """Install the SQLite pragmas and pool event listeners on `engine`; returns its PoolMetrics."""
+    metrics = PoolMetrics(engine)
+    if engine.dialect.name == 'sqlite':
+        pragmas = _sqlite_pragmas(config, read_only)
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    event.listen(engine, 'connect', metrics.connected)
+    event.listen(engine, 'checkout', metrics.checked_out)
+    event.listen(engine, 'checkin', metrics.checked_in)
+    event.listen(engine, 'invalidate', metrics.invalidated)
+    return metrics
+
+
+def init_db_engine(app, db):
+    """
+    Apply per-connection SQLite pragmas (WAL, synchronous, busy_timeout,
+    mmap_size) and record pool metrics in app.extensions['pool_metrics'].
+    Call after db.init_app(app); engine_options() must already be in
+    SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    with app.app_context():
+        engine = db.engine
+    app.extensions['pool_metrics'] = configure_engine(engine, app.config)
+    app.logger.info(f"Database engine: {engine.url.render_as_string(hide_password=True)} ({type(engine.pool).__name__})")
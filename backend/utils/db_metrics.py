@@ -0,0 +1,140 @@
+import heapq
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Statements kept per request for the slow-statement breakdown
+REQUEST_SLOWEST = 5
+
+# Per-endpoint stats key for requests that matched no route (404 scans would otherwise add one key per URL)
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+class DBMetrics:
+    """Process-wide rolling view of slow SQL statements and per-endpoint DB cost."""
+
+    def __init__(self, top_n=20):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._slow = []  # min-heap of (duration_ms, seq, entry)
+        self._seq = 0
+        self._endpoints = {}
+
+    def record_request(self, endpoint, count, total_ms, slowest):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'statements': 0, 'db_time_ms': 0.0, 'max_db_time_ms': 0.0
+            })
+            stats['requests'] += 1
+            stats['statements'] += count
+            stats['db_time_ms'] += total_ms
+            stats['max_db_time_ms'] = max(stats['max_db_time_ms'], total_ms)
+
+            for duration_ms, statement in slowest:
+                if len(self._slow) >= self.top_n and duration_ms <= self._slow[0][0]:
+                    continue
+                self._seq += 1
+                entry = {
+                    'duration_ms': round(duration_ms, 3),
+                    'statement': statement,
+                    'endpoint': endpoint,
+                    'recorded_at': time.time()
+                }
+                if len(self._slow) >= self.top_n:
+                    heapq.heapreplace(self._slow, (duration_ms, self._seq, entry))
+                else:
+                    heapq.heappush(self._slow, (duration_ms, self._seq, entry))
+
+    def snapshot(self):
+        with self._lock:
+            slow = [entry for _, _, entry in sorted(self._slow, key=lambda item: item[0], reverse=True)]
+            endpoints = []
+            for endpoint, stats in self._endpoints.items():
+                endpoints.append(dict(
+                    stats,
+                    endpoint=endpoint,
+                    db_time_ms=round(stats['db_time_ms'], 3),
+                    max_db_time_ms=round(stats['max_db_time_ms'], 3),
+                    avg_statements=round(stats['statements'] / stats['requests'], 2),
+                    avg_db_time_ms=round(stats['db_time_ms'] / stats['requests'], 3)
+                ))
+        endpoints.sort(key=lambda stats: stats['db_time_ms'], reverse=True)
+        return {'slow_queries': slow, 'endpoints': endpoints}
+
+    def reset(self):
+        with self._lock:
+            self._slow = []
+            self._endpoints = {}
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start_time'].pop()
+    if not has_request_context():
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    g.sql_statement_count = g.get('sql_statement_count', 0) + 1
+    g.sql_time_ms = g.get('sql_time_ms', 0.0) + duration_ms
+    slowest = g.setdefault('sql_slowest', [])
+    if len(slowest) < REQUEST_SLOWEST:
+        heapq.heappush(slowest, (duration_ms, statement))
+    elif duration_ms > slowest[0][0]:
+        heapq.heapreplace(slowest, (duration_ms, statement))
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    connection = context.connection
+    if connection is not None and connection.info.get('query_start_time'):
+        connection.info['query_start_time'].pop()
+
+
+def track_engine(engine):
+    """Count and time the statements `engine` runs toward the current request's totals."""
+    if not event.contains(engine, 'before_cursor_execute', _before_execute):
+        event.listen(engine, 'before_cursor_execute', _before_execute)
+        event.listen(engine, 'after_cursor_execute', _after_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+
+
+def init_db_metrics(app, db):
+    """
+    Record statement count, total DB time and the slowest statements of each request.
+
+    The totals are returned in Server-Timing / X-DB-* response headers (unless
+    DB_METRICS_HEADERS is off) and folded into a DBMetrics table stored in
+    app.extensions['db_metrics'].
+
+    When the app is in testing mode and SQL_STATEMENT_BUDGET is set, a request
+    that issues more statements than the budget fails with an AssertionError,
+    which makes N+1 regressions show up as test failures.
+    """
+    metrics = DBMetrics(top_n=app.config.get('SLOW_QUERY_TOP_N', 20))
+    app.extensions['db_metrics'] = metrics
+
+    with app.app_context():
+        track_engine(db.engine)
+
+    @app.after_request
+    def report_db_metrics(response):
+        count = g.get('sql_statement_count', 0)
+        total_ms = g.get('sql_time_ms', 0.0)
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        metrics.record_request(endpoint, count, total_ms, g.get('sql_slowest', []))
+
+        if app.config.get('DB_METRICS_HEADERS', True):
+            response.headers['X-DB-Query-Count'] = str(count)
+            response.headers['X-DB-Time-Ms'] = f"{total_ms:.2f}"
+            response.headers.add('Server-Timing', f'db;dur={total_ms:.2f};desc="{count} queries"')
+
+        budget = app.config.get('SQL_STATEMENT_BUDGET')
+        if app.testing and budget is not None and count > budget:
+            raise AssertionError(
+                f"{request.method} {request.path} issued {count} SQL statements (budget {budget})"
+            )
+        return response
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import create_engine
+from sqlalchemy.sql.dml import UpdateBase
+
+from utils.db_engine import configure_engine, engine_options
+from utils.db_metrics import track_engine
+
+# Methods served from a replica; everything else reads and writes the primary
+READ_METHODS = ('GET', 'HEAD')
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Hold the time until which this client's reads stay on the primary. The frontend
+# runs on another site, where browsers may drop even a SameSite=None cookie, so it
+# echoes the response header back as a request header.
+STICKY_COOKIE = 'hms_primary_until'
+STICKY_HEADER = 'X-Primary-Until'
+
+
+class RoutingSession(SignallingSession):
+    """
+    db.session that runs the SELECTs of read requests on the replica picked
+    for the request (g.db_replica). Flushes, INSERT/UPDATE/DELETE statements
+    and anything outside a request go to the primary, and once the session
+    has written, its later reads follow it to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['db_wrote'] = True
+        elif has_request_context() and not self.info.get('db_wrote'):
+            replica = g.get('db_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause)
+
+
+class ReplicaRouter:
+    """Replica engines plus counters of where read requests were sent."""
+
+    def __init__(self, replicas, sticky_seconds):
+        self.replicas = replicas  # [(engine, PoolMetrics)]
+        self.engines = [engine for engine, _ in replicas]
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('replica_reads', 'sticky_reads', 'writes'), 0)
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def choose(self):
+        return random.choice(self.engines)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['sticky_seconds'] = self.sticky_seconds
+        stats['replicas'] = [
+            dict(metrics.snapshot(), url=engine.url.render_as_string(hide_password=True))
+            for engine, metrics in self.replicas
+        ]
+        return stats
+
+    def reset(self):
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+        for _, metrics in self.replicas:
+            metrics.reset()
+
+
+def _sticky():
+    for value in (request.headers.get(STICKY_HEADER), request.cookies.get(STICKY_COOKIE)):
+        try:
+            if value and float(value) > time.time():
+                return True
+        except ValueError:
+            pass
+    return False
+
+
+@contextmanager
+def primary_reads():
+    """
+    Run the enclosed reads on the primary, e.g. to fill a cache that must not
+    pick up rows from a lagging replica.
+    """
+    if not has_request_context():
+        yield
+        return
+    replica = g.pop('db_replica', None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g.db_replica = replica
+
+
+def init_db_replicas(app):
+    """
+    Route GET/HEAD requests to the replicas in SQLALCHEMY_REPLICA_URIS
+    (DATABASE_REPLICA_URLS, comma-separated) through RoutingSession. After a
+    successful POST/PUT/PATCH/DELETE the client gets a deadline, as the
+    STICKY_HEADER response header and a cross-site (SameSite=None; Secure)
+    cookie; while it sends either back, its reads stay on the primary for
+    REPLICA_STICKY_SECONDS, so it sees its own writes despite replication lag.
+    Does nothing without replicas.
+    """
+    urls = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    app.extensions['db_replicas'] = None
+    if not urls:
+        return
+
+    replicas = []
+    for url in urls:
+        engine = create_engine(url, **engine_options(app.config, url))
+        replicas.append((engine, configure_engine(engine, app.config, read_only=True)))
+        track_engine(engine)
+        app.logger.info(f"Read replica: {engine.url.render_as_string(hide_password=True)} ({type(engine.pool).__name__})")
+    router = ReplicaRouter(replicas, app.config.get('REPLICA_STICKY_SECONDS', 5))
+    app.extensions['db_replicas'] = router
+
+    @app.before_request
+    def choose_replica():
+        if request.method not in READ_METHODS:
+            return
+        if _sticky():
+            router.count('sticky_reads')
+            return
+        router.count('replica_reads')
+        g.db_replica = router.choose()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            router.count('writes')
+            seconds = router.sticky_seconds
+            until = f"{time.time() + seconds:.3f}"
+            response.headers[STICKY_HEADER] = until
+            response.set_cookie(STICKY_COOKIE, until, max_age=seconds, httponly=True, secure=True,
+                                samesite='None')
+        return response
@@ -0,0 +1,332 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models.doctor import Doctor
+from models.inventory import InventoryItem
+from models.lab_test import LabTest
+from models.patient import Patient
+from models.prescription import Prescription, Medication
+from utils.blocking import call_blocking
+from utils.db_routing import primary_reads
+from utils.money import json_default
+
+# Models whose single-entity GET is served through the cache, and the key prefix of each
+CACHED_MODELS = (Patient, Doctor, InventoryItem, LabTest, Prescription)
+
+
+# Rows embedded in a cached payload whose changes leave the entity's own updated_at alone
+EMBEDDED = {Prescription: (Medication, Medication.prescription_id)}
+
+
+def cache_key(model, id):
+    return f"{model.__tablename__}:{id}"
+
+
+def row_version(model, id, connection=None):
+    """
+    The entity's updated_at, plus (max(updated_at), count) of its embedded rows,
+    as strings: one primary-key SELECT that changes whenever the payload would.
+    Runs on `connection` when given, else on the session.
+    """
+    columns = [select(model.updated_at).where(model.id == id).scalar_subquery()]
+    if model in EMBEDDED:
+        related, foreign_key = EMBEDDED[model]
+        columns.append(select(func.max(related.updated_at)).where(foreign_key == id).scalar_subquery())
+        columns.append(select(func.count()).select_from(related).where(foreign_key == id).scalar_subquery())
+    row = (connection if connection is not None else db.session).execute(select(*columns)).one()
+    return [None if value is None else str(value) for value in row]
+
+
+class MemoryCache:
+    """
+    Per-process LRU of serialized entities. Entries expire `ttl` seconds after
+    they were stored, and the least recently used entry is evicted once the
+    cache holds `max_entries`.
+    """
+
+    # In-process and lock-protected: cheap enough to call from the event loop
+    blocking = False
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('hits', 'misses', 'sets', 'evictions', 'expirations', 'invalidations'), 0)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                self._counters['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._counters['sets'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, backend='memory', size=len(self._entries),
+                        max_entries=self.max_entries, ttl_seconds=self.ttl)
+
+
+class RedisCache:
+    """
+    Entities stored as JSON in a Redis-compatible server shared by all worker
+    processes, so an invalidation in one worker is seen by the others. Redis
+    enforces the TTL and its own memory-bound eviction; a server error is
+    treated as a miss rather than failing the request.
+    """
+
+    # Network round trips: async views run them on a thread (see utils.blocking)
+    blocking = True
+
+    def __init__(self, url, ttl=300, prefix='hms:entity:'):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.25)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('hits', 'misses', 'sets', 'invalidations', 'errors'), 0)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception:
+            self._count('errors')
+            raw = None
+        self._count('misses' if raw is None else 'hits')
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, default=json_default), ex=self.ttl)
+            self._count('sets')
+        except Exception:
+            self._count('errors')
+
+    def delete(self, keys):
+        keys = [self.prefix + key for key in keys]
+        if not keys:
+            return
+        try:
+            self._count('invalidations', self.client.delete(*keys))
+        except Exception:
+            self._count('errors')
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + '*', count=1000))
+            if keys:
+                self.client.delete(*keys)
+        except Exception:
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, backend='redis', ttl_seconds=self.ttl)
+        try:
+            # Evictions are Redis' own decision; report the server-wide counter
+            stats['evictions'] = self.client.info('stats').get('evicted_keys')
+        except Exception:
+            stats['evictions'] = None
+        return stats
+
+
+class EntityCache:
+    """
+    Read-through cache of `to_dict()` payloads keyed by entity and id.
+
+    With `verify`, each entry is stored with its row_version() and a hit is
+    only served while the database still reports that version. A per-process
+    backend needs this, since other workers' writes never invalidate it; a
+    shared backend is invalidated by every worker and skips the probe.
+    """
+
+    def __init__(self, backend, verify=False):
+        self.backend = backend
+        self.verify = verify
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stale = 0
+
+    def _call(self, name, *args):
+        method = getattr(self.backend, name)
+        return call_blocking(method, *args) if self.backend.blocking else method(*args)
+
+    def get_or_load(self, model, id, load, connection=None):
+        """
+        Return the cached payload for `model` `id`, calling `load()` on a miss.
+        A None result (e.g. a soft-deleted row) is returned but not cached.
+        The version probe runs on `connection` when given.
+        """
+        key = cache_key(model, id)
+        entry = self._call('get', key)
+        # Read before loading, so a write landing in between leaves the entry looking stale
+        version = row_version(model, id, connection) if self.verify else None
+        if entry is not None:
+            if entry[0] == version:
+                return entry[1]
+            with self._lock:
+                self._stale += 1
+        with self._lock:
+            generation = self._generation
+        value = load()
+        with self._lock:
+            # Something was invalidated while we were loading; the row we read may already be stale
+            fresh = generation == self._generation
+        if value is not None and fresh:
+            self._call('set', key, [version, value])
+        return value
+
+    def invalidate(self, keys):
+        with self._lock:
+            self._generation += 1
+        self.backend.delete(keys)
+
+    def clear(self):
+        self.invalidate([])
+        self.backend.clear()
+
+    def stats(self):
+        stats = self.backend.stats()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        # Hits refused because another worker had changed the row since it was cached
+        stats['stale'] = self._stale
+        stats['verified'] = self.verify
+        return stats
+
+
+def _cache():
+    if has_app_context():
+        return current_app.extensions.get('entity_cache')
+    return None
+
+
+def _keys_of(target):
+    if isinstance(target, Medication):
+        # Medications are served inside their prescription
+        ids = {target.prescription_id}
+        history = inspect(target).attrs.prescription_id.history
+        ids.update(history.deleted or ())
+        return [cache_key(Prescription, id) for id in ids if id is not None]
+    return [cache_key(type(target), target.id)]
+
+
+def _changed(mapper, connection, target):
+    cache = _cache()
+    if cache is None:
+        return
+    keys = _keys_of(target)
+    cache.invalidate(keys)
+    session = object_session(target)
+    if session is not None:
+        # Dropped again on commit, so a reader that refilled the entry mid-transaction does not keep it
+        session.info.setdefault('entity_cache_keys', set()).update(keys)
+
+
+def _after_commit(session):
+    keys = session.info.pop('entity_cache_keys', None)
+    cache = _cache()
+    if keys and cache is not None:
+        cache.invalidate(keys)
+
+
+def _after_rollback(session):
+    session.info.pop('entity_cache_keys', None)
+
+
+def init_entity_cache(app):
+    """
+    Serve single-entity GETs of CACHED_MODELS from a read-through cache stored
+    in app.extensions['entity_cache'].
+
+    ENTITY_CACHE_BACKEND selects 'memory' (per process, the default), 'redis'
+    (ENTITY_CACHE_REDIS_URL, needs the redis package) or 'none'. Entries are
+    dropped by ORM after_update/after_delete events and again on commit, and
+    expire after ENTITY_CACHE_TTL seconds. Memory entries are also checked
+    against row_version() on every hit, so a write in another worker is seen
+    by the next read there; the TTL only bounds writes made outside the ORM.
+    """
+    backend_name = app.config.get('ENTITY_CACHE_BACKEND', 'memory')
+    ttl = app.config.get('ENTITY_CACHE_TTL', 300)
+    if backend_name == 'none':
+        app.extensions['entity_cache'] = None
+        return
+    backend = None
+    if backend_name == 'redis':
+        try:
+            backend = RedisCache(app.config['ENTITY_CACHE_REDIS_URL'], ttl=ttl)
+        except ImportError:
+            app.logger.warning("ENTITY_CACHE_BACKEND=redis but the redis package is not installed; using memory")
+    if backend is None:
+        backend = MemoryCache(max_entries=app.config.get('ENTITY_CACHE_MAX_ENTRIES', 10000), ttl=ttl)
+    app.extensions['entity_cache'] = EntityCache(backend, verify=isinstance(backend, MemoryCache))
+
+    for model in CACHED_MODELS:
+        for name in ('after_update', 'after_delete'):
+            if not event.contains(model, name, _changed):
+                event.listen(model, name, _changed)
+    for name in ('after_insert', 'after_update', 'after_delete'):
+        if not event.contains(Medication, name, _changed):
+            event.listen(Medication, name, _changed)
+    if not event.contains(db.session, 'after_commit', _after_commit):
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
+
+
+def cached_entity(model, id, load, connection=None):
+    """
+    Read-through helper for routes; calls `load()` directly when caching is
+    off. Async views pass their `connection`, so nothing runs on db.session.
+    """
+    cache = _cache()
+    if cache is None:
+        return load()
+    if connection is not None:
+        # The async engine reads the primary already
+        return cache.get_or_load(model, id, load, connection)
+    # Fill from the primary; a lagging replica could re-cache a row that was just invalidated
+    with primary_reads():
+        return cache.get_or_load(model, id, load)
+
+
+def active_dict(obj):
+    """`obj.to_dict()`, or None for a soft-deleted row so the route can answer 404."""
+    return obj.to_dict() if obj.is_active else None
@@ -0,0 +1,32 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask.json import JSONEncoder
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def to_money(value):
+    """Coerce a client or database value (str, int, float, Decimal, None) to a 2-place Decimal."""
+    if value is None or value == '':
+        return ZERO
+    if not isinstance(value, Decimal):
+        # str() first so 0.1 becomes Decimal('0.1'), not its binary float expansion
+        value = Decimal(str(value))
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def json_default(value):
+    """`default=` hook for json.dumps: money goes out as a JSON number, as before."""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MoneyJSONEncoder(JSONEncoder):
+    """Flask JSON encoder that also serializes Decimal money columns as numbers."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return super().default(o)
@@ -0,0 +1,182 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import request
+from sqlalchemy import DateTime, and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'limit', 'paginated'])
+
+
+class PaginationError(ValueError):
+    """Raised for malformed limit, cursor or filter query parameters."""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    """The cursor value for `column`; ValueError unless it has the column's Python type."""
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    expected = column.type.python_type
+    # bool is an int to isinstance, but never a valid id
+    if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+        raise ValueError(f'cursor value for {column.key} must be {expected.__name__}')
+    return value
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque token."""
+    raw = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_columns):
+    """Decode a token produced by encode_cursor back into typed key values."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(sort_columns):
+            raise ValueError('cursor does not match sort key')
+        return [_decode_value(column, value) for column, value in zip(sort_columns, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise PaginationError('Invalid cursor')
+
+
+def _parse_limit(value):
+    if value is None or value == '':
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, MAX_LIMIT)
+
+
+def _parse_int(name, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise PaginationError(f'{name} must be an integer')
+
+
+def _parse_date(name, value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise PaginationError(f'{name} must use the YYYY-MM-DD format')
+
+
+def _after(sort_columns, values, descending):
+    """
+    Build the keyset predicate selecting rows strictly after `values`,
+    i.e. (a, b) > (x, y) expanded as a > x OR (a = x AND b > y).
+    """
+    clauses = []
+    for i, column in enumerate(sort_columns):
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[sort_columns[j] == values[j] for j in range(i)], step))
+    return or_(*clauses)
+
+
+def filter_query(query, model, date_column=None, status_column=None):
+    """
+    Apply the standard list filters from the query string:
+    patient_id, doctor_id, status, date_from and date_to (inclusive, YYYY-MM-DD).
+    """
+    args = request.args
+    for name in ('patient_id', 'doctor_id'):
+        if args.get(name) and hasattr(model, name):
+            query = query.filter(getattr(model, name) == _parse_int(name, args[name]))
+
+    if args.get('status') and status_column is not None:
+        query = query.filter(status_column == args['status'])
+
+    if date_column is not None:
+        date_from = args.get('date_from')
+        date_to = args.get('date_to')
+        if isinstance(date_column.type, DateTime):
+            if date_from:
+                query = query.filter(date_column >= _parse_date('date_from', date_from))
+            if date_to:
+                query = query.filter(date_column < _parse_date('date_to', date_to) + timedelta(days=1))
+        else:
+            # Dates stored as YYYY-MM-DD strings sort lexically
+            if date_from:
+                query = query.filter(date_column >= _parse_date('date_from', date_from).strftime('%Y-%m-%d'))
+            if date_to:
+                query = query.filter(date_column <= _parse_date('date_to', date_to).strftime('%Y-%m-%d'))
+    return query
+
+
+def page_window(query, sort_columns, descending=False):
+    """
+    The ordered query for the page requested in the query string, and its
+    limit (None when pagination was not requested). A paginated window
+    includes one extra row, which tells whether another page exists.
+    """
+    args = request.args
+    order = [column.desc() if descending else column.asc() for column in sort_columns]
+    if 'limit' not in args and 'cursor' not in args:
+        return query.order_by(*order), None
+
+    limit = _parse_limit(args.get('limit'))
+    cursor = args.get('cursor')
+    if cursor:
+        query = query.filter(_after(sort_columns, decode_cursor(cursor, sort_columns), descending))
+    return query.order_by(*order).limit(limit + 1), limit
+
+
+def fetch_all(query, connection=None):
+    """
+    Rows of `query`, from the session or, when given, by running its
+    statement on `connection` (the async mode passes an async engine's
+    connection in through run_sync).
+    """
+    if connection is None:
+        return query.all()
+    return connection.execute(query.statement).all()
+
+
+def paginate(query, sort_columns, descending=False, connection=None):
+    """
+    Run `query` ordered by `sort_columns` (which must end in a unique column)
+    using keyset pagination. Pagination is enabled by a `limit` or `cursor`
+    query parameter; without either the full ordered result is returned so
+    existing clients keep working.
+    """
+    window, limit = page_window(query, sort_columns, descending)
+    if limit is None:
+        return Page(fetch_all(window, connection), None, None, False)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = fetch_all(window, connection)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in sort_columns])
+    return Page(rows, next_cursor, limit, True)
+
+
+def page_body(page, items):
+    """Wrap serialized items in the paginated envelope when pagination was requested."""
+    if not page.paginated:
+        return items
+    return {
+        'items': items,
+        'next_cursor': page.next_cursor,
+        'limit': page.limit
+    }
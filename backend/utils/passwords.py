@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256'
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool is full or too slow; login and register answer 503."""
+
+
+def normalize_method(method):
+    """
+    The full hash parameters of PASSWORD_HASH_METHOD, as they appear in a
+    stored hash: Werkzeug methods ('pbkdf2:sha256[:iterations]') or
+    'bcrypt[:rounds]' (needs the bcrypt package).
+    """
+    name, _, parameter = method.partition(':')
+    if name == 'bcrypt':
+        return f"bcrypt:{int(parameter or DEFAULT_BCRYPT_ROUNDS)}"
+    if name == 'pbkdf2' and parameter.count(':') == 0:
+        return f"{method}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+def method_of(password_hash):
+    """The hash parameters a stored hash was made with, comparable with normalize_method()."""
+    if password_hash.startswith('$2'):
+        return f"bcrypt:{int(password_hash.split('$')[2])}"
+    return password_hash.split('$', 1)[0]
+
+
+def generate(password, method):
+    if method.startswith('bcrypt:'):
+        import bcrypt
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(int(method.split(':')[1]))).decode('ascii')
+    return generate_password_hash(password, method=method)
+
+
+def verify(password_hash, password):
+    if password_hash.startswith('$2'):
+        import bcrypt
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def hash_length(method):
+    """Length of the hashes `method` produces, found with a single cheap iteration."""
+    method = normalize_method(method)
+    if method.startswith('bcrypt:'):
+        return 60
+    name, _, iterations = method.rpartition(':')
+    if not iterations.isdigit():
+        return len(generate('', method))
+    return len(generate('', f"{name}:1")) - 1 + len(iterations)
+
+
+def _timed(fn, *args):
+    # Runs in the pool, so the caller can tell time spent hashing from time spent queued
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+def _lower_priority(nice):
+    # PRIO_PROCESS 0 is the calling thread on Linux, so this only slows the pool's own threads
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, os.getpriority(os.PRIO_PROCESS, 0) + nice)
+    except (AttributeError, OSError):
+        pass
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a bounded pool instead of the
+    request thread. At most `workers` hashes run at once, at `nice` lower CPU
+    priority than request threads, and up to `max_queue` more wait for a
+    worker; callers beyond that, or still waiting after `timeout` seconds,
+    get PasswordPoolBusy. The pool ('thread' or 'process') is started on
+    first use, after gunicorn has forked its workers. workers=0 hashes inline
+    on the request thread.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_queue=32, timeout=10.0, pool='thread', nice=10):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pool = pool
+        self.nice = nice
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = dict.fromkeys(
+            ('hashes', 'verifications', 'rehashes', 'rejected', 'timeouts', 'max_queue_depth'), 0)
+        self._wait_s = 0.0
+        self._hash_s = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                executor_class = ProcessPoolExecutor if self.pool == 'process' else ThreadPoolExecutor
+                self._executor = executor_class(self.workers, initializer=_lower_priority, initargs=(self.nice,))
+            return self._executor
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if self._slots is None:
+            result, seconds = _timed(fn, *args)
+            with self._lock:
+                self._hash_s += seconds
+            return result
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordPoolBusy('Password hashing queue is full')
+        with self._lock:
+            self._in_flight += 1
+            self._counters['max_queue_depth'] = max(self._counters['max_queue_depth'],
+                                                    self._in_flight - self.workers)
+        submitted = time.perf_counter()
+        try:
+            future = self._get_executor().submit(_timed, fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        # The slot is freed when the hash finishes, even if its caller gave up waiting
+        future.add_done_callback(self._done)
+        try:
+            result, seconds = future.result(timeout=self.timeout)
+        except TimeoutError:
+            self._count('timeouts')
+            raise PasswordPoolBusy(f'Password hashing took over {self.timeout}s')
+        with self._lock:
+            self._hash_s += seconds
+            self._wait_s += time.perf_counter() - submitted - seconds
+        return result
+
+    def hash(self, password, rehash=False):
+        self._count('rehashes' if rehash else 'hashes')
+        return self._run(generate, password, self.method)
+
+    def verify(self, password_hash, password):
+        self._count('verifications')
+        return self._run(verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return method_of(password_hash) != self.method
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+            in_flight = self._in_flight
+            wait_s, hash_s = self._wait_s, self._hash_s
+        operations = (stats['hashes'] + stats['rehashes'] + stats['verifications']
+                      - stats['rejected'] - stats['timeouts'])
+        stats.update(
+            method=self.method,
+            pool=self.pool if self.workers else 'inline',
+            workers=self.workers,
+            max_queue=self.max_queue,
+            in_flight=in_flight,
+            queue_depth=max(in_flight - self.workers, 0),
+            avg_wait_ms=round(wait_s / operations * 1000, 3) if operations else None,
+            avg_hash_ms=round(hash_s / operations * 1000, 3) if operations else None,
+        )
+        return stats
+
+    def reset(self):
+        with self._lock:
+            max_queue_depth = max(self._in_flight - self.workers, 0)
+            self._counters = dict.fromkeys(self._counters, 0)
+            self._counters['max_queue_depth'] = max_queue_depth
+            self._wait_s = self._hash_s = 0.0
+
+
+def _hasher():
+    if has_app_context():
+        return current_app.extensions.get('password_hasher')
+    return None
+
+
+def hash_password(password, rehash=False):
+    """Hash `password` on the app's pool (PasswordPoolBusy when it is saturated), or inline outside an app."""
+    hasher = _hasher()
+    if hasher is None:
+        return generate(password, normalize_method(DEFAULT_METHOD))
+    return hasher.hash(password, rehash)
+
+
+def verify_password(password_hash, password):
+    hasher = _hasher()
+    return hasher.verify(password_hash, password) if hasher is not None else verify(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Whether `password_hash` was made with other parameters than PASSWORD_HASH_METHOD."""
+    hasher = _hasher()
+    method = hasher.method if hasher is not None else normalize_method(DEFAULT_METHOD)
+    return method_of(password_hash) != method
+
+
+def init_password_hashing(app):
+    """
+    Hash and verify passwords (User.set_password / check_password) on a
+    PasswordHasher stored in app.extensions['password_hasher'], sized by
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE and PASSWORD_HASH_TIMEOUT.
+    New hashes use PASSWORD_HASH_METHOD; a successful login with a hash
+    made under other parameters stores a fresh one.
+    """
+    method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    pool = app.config.get('PASSWORD_HASH_POOL', 'thread')
+    if pool not in ('thread', 'process'):
+        raise ValueError(f"Unknown PASSWORD_HASH_POOL {pool}; choose thread or process")
+    if normalize_method(method).startswith('bcrypt:'):
+        import bcrypt  # fail at boot, not on the first login
+    from models.user import User
+    column_length = User.__table__.c.password_hash.type.length
+    if hash_length(method) > column_length:
+        raise ValueError(f"PASSWORD_HASH_METHOD {method} makes {hash_length(method)}-character hashes; "
+                         f"users.password_hash holds {column_length}")
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=method,
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_queue=app.config.get('PASSWORD_HASH_QUEUE', 32),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+        pool=pool,
+        nice=app.config.get('PASSWORD_HASH_NICE', 10),
+    )
@@ -0,0 +1,149 @@
+import re
+from difflib import SequenceMatcher
+
+from sqlalchemy import event, or_, text
+
+from extensions import db
+from models.patient import Patient
+
+FTS_TABLE = 'patients_fts'
+FTS_COLUMNS = ('first_name', 'last_name', 'phone', 'email', 'name_phonetic')
+# bm25 column weights, in FTS_COLUMNS order: names dominate, then phone, phonetic keys, email
+FTS_WEIGHTS = '10.0, 10.0, 4.0, 2.0, 3.0'
+
+_SOUNDEX = {letter: str(digit) for digit, letters in enumerate(
+    ('aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r')) for letter in letters}
+_TOKEN = re.compile(r"[^\s,;]+")
+
+
+def soundex(word):
+    """American Soundex code ('Robert' -> 'R163'), '' for words without letters."""
+    letters = [c for c in word.lower() if c.isalpha() and c.isascii()]
+    if not letters:
+        return ''
+    code, previous = [letters[0].upper()], _SOUNDEX.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = _SOUNDEX.get(letter, '')
+        if digit and digit != '0' and digit != previous:
+            code.append(digit)
+        if letter not in 'hw':
+            previous = digit
+    return (''.join(code) + '000')[:4]
+
+
+def phonetic_key(*names):
+    """Space-separated Soundex codes of every word in the given names."""
+    codes = [soundex(word) for name in names if name for word in _TOKEN.findall(name)]
+    return ' '.join(code for code in codes if code)
+
+
+def _trigrams(word):
+    word = word.lower()
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _token_score(token, row):
+    """How well one query token matches a candidate row, from 1.0 (exact) down to 0."""
+    token = token.lower()
+    best = 0.0
+    for field in ('first_name', 'last_name', 'phone', 'email'):
+        value = (row[field] or '').lower()
+        if value == token:
+            return 1.0
+        if value.startswith(token):
+            best = max(best, 0.9)
+        elif token in value:
+            best = max(best, 0.75)
+    code = soundex(token)
+    for name in (row['first_name'], row['last_name']):
+        for word in _TOKEN.findall(name or ''):
+            # Typos: edit similarity; spelling variants: same Soundex code, ordered by similarity
+            similarity = SequenceMatcher(None, token, word.lower()).ratio()
+            if code and soundex(word) == code:
+                best = max(best, 0.4 + 0.4 * similarity)
+            elif similarity >= 0.5:
+                best = max(best, 0.7 * similarity)
+    return best
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fts_candidates(match, pool):
+    # Rank inside the FTS table first, then join only the top rows back to patients
+    rows = db.session.execute(text(
+        f"SELECT p.id, p.first_name, p.last_name, p.phone, p.email "
+        f"FROM (SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND rank MATCH 'bm25({FTS_WEIGHTS})' ORDER BY rank LIMIT :pool) AS hits "
+        f"JOIN patients p ON p.id = hits.rowid WHERE p.is_active IS NOT 0 ORDER BY hits.rank"
+    ), {'match': match, 'pool': pool})
+    return [dict(row._mapping) for row in rows]
+
+
+def _sqlite_candidates(tokens, limit):
+    pool = max(limit * 5, 50)
+    searchable = [token for token in tokens if len(token) >= 3]
+    if not searchable:
+        # Trigrams need 3 characters; 1-2 character queries fall back to a name prefix scan
+        return _like_candidates(tokens, pool)
+
+    # Precise pass: every token appears as a substring of some column
+    candidates = _fts_candidates(' AND '.join(_quote(token) for token in searchable), pool)
+    if len(candidates) >= limit:
+        return candidates
+
+    # Fuzzy pass: any shared trigram or Soundex code, left to bm25 and the re-ranker to sort out
+    terms = set()
+    for token in searchable:
+        terms.update(_quote(trigram) for trigram in _trigrams(token))
+        code = soundex(token)
+        if code:
+            terms.add(f'name_phonetic : {_quote(code)}')
+    seen = {row['id'] for row in candidates}
+    candidates += [row for row in _fts_candidates(' OR '.join(sorted(terms)), pool) if row['id'] not in seen]
+    return candidates
+
+
+def _like_candidates(tokens, pool):
+    filters = []
+    for token in tokens:
+        pattern = f"{token}%"
+        filters.append(or_(Patient.first_name.ilike(pattern), Patient.last_name.ilike(pattern),
+                           Patient.phone.like(pattern), Patient.email.ilike(pattern)))
+    query = db.session.query(Patient.id, Patient.first_name, Patient.last_name, Patient.phone, Patient.email) \
+        .filter(Patient.is_active.isnot(False), *filters)
+    return [dict(row._mapping) for row in query.limit(pool)]
+
+
+def search_patients(q, limit=10):
+    """
+    Top `limit` active patients for free text `q` (names, phone or email),
+    tolerant of typos and spelling variants in names. Returns (Patient, score)
+    pairs, best first.
+    """
+    tokens = _TOKEN.findall(q or '')[:8]
+    if not tokens:
+        return []
+    if db.engine.dialect.name == 'sqlite':
+        candidates = _sqlite_candidates(tokens, limit)
+    else:
+        candidates = _like_candidates(tokens, max(limit * 5, 50))
+
+    scored = [(row, sum(_token_score(token, row) for token in tokens) / len(tokens)) for row in candidates]
+    scored = [(row, score) for row, score in scored if score > 0]
+    scored.sort(key=lambda pair: (-pair[1], pair[0]['id']))
+    scored = scored[:limit]
+    ids = [row['id'] for row, _ in scored]
+    patients = {patient.id: patient for patient in Patient.query.filter(Patient.id.in_(ids))}
+    return [(patients[row['id']], round(score, 3)) for row, score in scored if row['id'] in patients]
+
+
+def _set_phonetic_key(mapper, connection, patient):
+    patient.name_phonetic = phonetic_key(patient.first_name, patient.last_name)
+
+
+def init_patient_search(app):
+    """Keep Patient.name_phonetic current on ORM writes; the FTS table follows via triggers."""
+    for name in ('before_insert', 'before_update'):
+        if not event.contains(Patient, name, _set_phonetic_key):
+            event.listen(Patient, name, _set_phonetic_key)
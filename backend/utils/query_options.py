@@ -0,0 +1,28 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from models.appointment import Appointment
+from models.billing import BillingRecord
+from models.prescription import Prescription
+
+# Eager-loading strategy per model and view. Many-to-one relationships read by
+# to_dict() are joined into the main SELECT; one-to-many collections are fetched
+# with a single extra SELECT ... WHERE id IN (...) per page.
+QUERY_OPTIONS = {
+    (Appointment, 'list'): lambda: (joinedload(Appointment.patient), joinedload(Appointment.doctor)),
+    (Appointment, 'detail'): lambda: (joinedload(Appointment.patient), joinedload(Appointment.doctor)),
+    (Prescription, 'list'): lambda: (selectinload(Prescription.medications),),
+    (Prescription, 'detail'): lambda: (selectinload(Prescription.medications),),
+    # Batch item writes work on the whole invoice
+    (BillingRecord, 'aggregate'): lambda: (selectinload(BillingRecord.items),),
+}
+
+
+def load_options(model, view='list'):
+    """Return the registered loader options for `model` in the given view ('list', 'detail', ...)."""
+    factory = QUERY_OPTIONS.get((model, view))
+    return factory() if factory else ()
+
+
+def eager_query(model, view='list'):
+    """Start a query on `model` with its registered eager-loading options applied."""
+    return model.query.options(*load_options(model, view))
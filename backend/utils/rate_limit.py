@@ -0,0 +1,349 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, g, jsonify, request
+
+# Endpoint classes for quotas and admission; endpoints not listed are 'write' or 'read' by method
+ENDPOINT_CLASSES = {
+    'export.export_entity': 'report',
+    'bulk.bulk_import': 'report',
+    'dashboard.get_analytics': 'report',
+    'manager_dashboard.manager_dashboard': 'report',
+    'appointments.create_appointment': 'booking',
+    'appointments.update_appointment': 'booking',
+    'doctors.check_doctor_availability': 'booking',
+    'doctors.get_doctor_free_slots': 'booking',
+    'auth.login': 'auth',
+    'auth.register': 'auth',
+}
+
+# Paginated list endpoints; requested without `limit` or `cursor` they return every row and
+# count as 'list'. The frontend still loads whole lists, so no default quota applies to them.
+LIST_ENDPOINTS = (
+    'patients.get_patients',
+    'appointments.get_appointments',
+    'billing.get_billing_records',
+    'prescriptions.get_prescriptions',
+    'lab_tests.get_lab_tests',
+)
+
+# Role of requests without a valid JWT
+ANONYMOUS = 'anonymous'
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Per-key limiter state: tokens and refill time for the token bucket, this and
+# the previous window's counts and the window number for the sliding window
+State = namedtuple('State', ['value', 'previous', 'stamp'])
+
+
+def endpoint_class(endpoint=None, method=None, args=None):
+    """The endpoint class of the current request (or of `endpoint` called with `method` and `args`)."""
+    endpoint = request.endpoint if endpoint is None else endpoint
+    method = request.method if method is None else method
+    args = request.args if args is None else args
+    if endpoint in ENDPOINT_CLASSES:
+        return ENDPOINT_CLASSES[endpoint]
+    if endpoint in LIST_ENDPOINTS and 'limit' not in args and 'cursor' not in args:
+        return 'list'
+    return 'read' if method in ('GET', 'HEAD') else 'write'
+
+
+def parse_limits(value):
+    """
+    Parse RATE_LIMITS: ';'-separated 'class[:role]=N per second|minute|hour|day'
+    entries, into {(class, role or None): (N, seconds)}.
+    """
+    limits = {}
+    for entry in value.split(';'):
+        if not entry.strip():
+            continue
+        try:
+            target, rate = entry.split('=')
+            count, per, period = rate.split()
+            endpoint_class, _, role = target.strip().partition(':')
+            if per != 'per' or int(count) < 1:
+                raise ValueError
+            limits[(endpoint_class, role or None)] = (int(count), PERIODS[period.rstrip('s')])
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid RATE_LIMITS entry {entry.strip()!r}; expected 'class[:role]=N per minute'")
+    return limits
+
+
+def format_limit(limit):
+    count, seconds = limit
+    period = next(name for name, length in PERIODS.items() if length == seconds)
+    return f"{count} per {period}"
+
+
+def token_bucket(state, limit, now):
+    """A bucket of `count` tokens refilled evenly over `period`; each request takes one."""
+    count, period = limit
+    rate = count / period
+    tokens = count if state is None else min(count, state.value + (now - state.stamp) * rate)
+    if tokens >= 1:
+        return State(tokens - 1, 0, now), 0.0
+    return State(tokens, 0, now), (1 - tokens) / rate
+
+
+def sliding_window(state, limit, now):
+    """
+    Requests counted per fixed window of `period`, with the previous window's
+    count weighted by how much of it the sliding window still overlaps.
+    """
+    count, period = limit
+    window = int(now // period)
+    current = previous = 0
+    if state is not None and state.stamp == window:
+        current, previous = state.value, state.previous
+    elif state is not None and state.stamp == window - 1:
+        previous = state.value
+    overlap = 1 - (now - window * period) / period
+    if previous * overlap + current + 1 <= count:
+        return State(current + 1, previous, window), 0.0
+    if current + 1 > count:
+        retry_after = (window + 1) * period - now
+    else:
+        # The weighted previous count has to fall until one more request fits
+        retry_after = (overlap - (count - current - 1) / previous) * period
+    return State(current, previous, window), retry_after
+
+
+ALGORITHMS = {
+    'token_bucket': token_bucket,
+    'sliding_window': sliding_window,
+}
+
+
+class MemoryStore:
+    """Limiter state in a dict, private to this worker process."""
+
+    name = 'memory'
+
+    def __init__(self, prune_every=1000):
+        self._entries = {}  # key -> (State, expires_at)
+        self._lock = threading.Lock()
+        self._updates = 0
+        self._prune_every = prune_every
+
+    def update(self, key, step, now, ttl):
+        """Replace the state of `key` with step(state) atomically; returns step's retry_after."""
+        with self._lock:
+            entry = self._entries.get(key)
+            state = entry[0] if entry is not None and entry[1] > now else None
+            state, retry_after = step(state)
+            self._entries[key] = (state, now + ttl)
+            self._updates += 1
+            if self._updates % self._prune_every == 0:
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[1] > now}
+        return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteStore:
+    """
+    Limiter state in a local SQLite file shared by all worker processes on the
+    host, so a client gets one quota rather than one per worker. Each check is
+    a short BEGIN IMMEDIATE transaction on a per-thread connection; the file
+    runs in WAL mode without fsync, as losing it only resets the quotas.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, timeout=1.0, prune_every=1000):
+        self.path = path
+        self.timeout = timeout
+        self._prune_every = prune_every
+        self._local = threading.local()
+        self._updates = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Created on a throwaway connection, so none is inherited by forked workers
+        connection = self._connect()
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, value REAL, previous REAL, stamp REAL, expires_at REAL)"
+            )
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=OFF")
+        return connection
+
+    def _connection(self):
+        # Keyed by pid too: a thread's connection must not be reused in a forked child
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if pid != os.getpid():
+            connection = self._connect()
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def update(self, key, step, now, ttl):
+        """Replace the state of `key` with step(state) atomically; returns step's retry_after."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value, previous, stamp FROM rate_limits WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            state, retry_after = step(State(*row) if row else None)
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, value, previous, stamp, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, state.value, state.previous, state.stamp, now + ttl)
+            )
+            self._updates += 1
+            if self._updates % self._prune_every == 0:
+                connection.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def clear(self):
+        self._connection().execute("DELETE FROM rate_limits")
+
+    def size(self):
+        return self._connection().execute("SELECT count(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    """Quotas per endpoint class and role, checked against a shared store."""
+
+    def __init__(self, store, algorithm, limits):
+        self.store = store
+        self.algorithm = algorithm
+        self.limits = limits
+        self._step = ALGORITHMS[algorithm]
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._errors = 0
+
+    def limit_for(self, endpoint_class, role):
+        return self.limits.get((endpoint_class, role)) or self.limits.get((endpoint_class, None))
+
+    def hit(self, endpoint_class, role, client):
+        """
+        Count a request by `client` and return 0 if it is within the quota of
+        `role` for `endpoint_class`, otherwise the seconds until it would be.
+        A store failure lets the request through.
+        """
+        limit = self.limit_for(endpoint_class, role)
+        if limit is None:
+            return 0.0
+        now = time.time()
+        try:
+            # Expire state once it no longer affects the outcome: a full bucket or two windows old
+            retry_after = self.store.update(f"{endpoint_class}:{client}",
+                                            lambda state: self._step(state, limit, now), now, limit[1] * 2)
+        except Exception as e:
+            current_app.logger.warning(f"Rate limit store failed: {str(e)}")
+            with self._lock:
+                self._errors += 1
+            return 0.0
+        with self._lock:
+            counters = self._counters.setdefault(endpoint_class, {'allowed': 0, 'limited': 0})
+            counters['limited' if retry_after else 'allowed'] += 1
+        return retry_after
+
+    def snapshot(self):
+        with self._lock:
+            classes = {name: dict(counters) for name, counters in self._counters.items()}
+            errors = self._errors
+        return {
+            'backend': self.store.name,
+            'algorithm': self.algorithm,
+            'limits': {f"{cls}:{role}" if role else cls: format_limit(limit)
+                       for (cls, role), limit in self.limits.items()},
+            'classes': classes,
+            'keys': self.store.size(),
+            'errors': errors,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._errors = 0
+        self.store.clear()
+
+
+def request_client():
+    """
+    (role, client key) of the current request: the role claim and identity of
+    a valid JWT when flask_jwt_extended is set up on the app, otherwise
+    ANONYMOUS and the remote address. A bad token counts as anonymous here;
+    the view still rejects it if it requires one.
+    """
+    if 'flask-jwt-extended' in current_app.extensions and request.headers.get('Authorization'):
+        from flask_jwt_extended import get_jwt, verify_jwt_in_request
+        try:
+            verify_jwt_in_request(optional=True)
+            claims = get_jwt()
+        except Exception:
+            claims = {}
+        if claims.get('sub') is not None:
+            return claims.get('role') or ANONYMOUS, f"user:{claims['sub']}"
+    return ANONYMOUS, f"ip:{request.remote_addr}"
+
+
+def too_many_requests(endpoint_class, retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = jsonify({'error': f'Rate limit exceeded for {endpoint_class} requests', 'retry_after': seconds})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+
+def init_rate_limits(app):
+    """
+    Enforce RATE_LIMITS per client, endpoint class (ENDPOINT_CLASSES, with
+    unpaginated list dumps as 'list') and JWT role, answering 429 with
+    Retry-After once a quota is used up. RATE_LIMIT_ALGORITHM picks
+    'token_bucket' or 'sliding_window'; RATE_LIMIT_BACKEND keeps the state in
+    'memory' (per process), in the 'sqlite' file RATE_LIMIT_STORE shared by the
+    workers on the host, or turns limiting off ('none'). The limiter is
+    stored in app.extensions['rate_limiter'].
+    """
+    backend = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+    limits = parse_limits(app.config.get('RATE_LIMITS', ''))
+    app.extensions['rate_limiter'] = None
+    if backend == 'none' or not limits:
+        return
+    algorithm = app.config.get('RATE_LIMIT_ALGORITHM', 'token_bucket')
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown RATE_LIMIT_ALGORITHM {algorithm}; choose from {', '.join(ALGORITHMS)}")
+    if backend == 'sqlite':
+        store = SQLiteStore(app.config['RATE_LIMIT_STORE'])
+    elif backend == 'memory':
+        store = MemoryStore()
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend}; choose from memory, sqlite, none")
+    limiter = RateLimiter(store, algorithm, limits)
+    app.extensions['rate_limiter'] = limiter
+    app.logger.info(f"Rate limits ({algorithm}, {store.name}): {limiter.snapshot()['limits']}")
+
+    @app.before_request
+    def check_rate_limit():
+        if request.method == 'OPTIONS' or request.endpoint is None:
+            return
+        g.endpoint_class = endpoint_class()
+        role, client = request_client()
+        retry_after = limiter.hit(g.endpoint_class, role, client)
+        if retry_after:
+            return too_many_requests(g.endpoint_class, retry_after)
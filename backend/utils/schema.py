@@ -0,0 +1,185 @@
+import os
+import time
+from datetime import datetime
+
+from flask import jsonify, request
+
+import migrations
+from extensions import db
+from models.doctor import Doctor
+from models.patient import Patient
+from models.prescription import Prescription, Medication
+from utils.db_engine import is_sqlite
+
+# Migration versions already verified in this process, by database URL
+_verified = {}
+
+
+def migrate_database(app):
+    """
+    Create missing tables and apply pending migrations. Idempotent; run once
+    per deploy with `flask migrate` rather than in every worker.
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if is_sqlite(uri):
+        # Create the SQLite database directory if it doesn't exist
+        db_dir = os.path.dirname(uri.replace('sqlite:///', ''))
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+            app.logger.info(f"Created database directory: {db_dir}")
+
+    db.create_all()
+    applied = migrations.upgrade(db.engine, app.logger)
+    _verified[str(db.engine.url)] = migrations.head()
+    app.extensions['schema'] = {'version': migrations.head(), 'expected': migrations.head(),
+                                'current': True, 'checked_at': time.monotonic()}
+    return applied
+
+
+def seed_sample_data(logger):
+    """Add the sample patients, doctors and prescription to tables that are still empty."""
+    # Create sample data if no patients exist
+    if Patient.query.count() == 0:
+        # Create sample patients
+        patients = [
+            Patient(
+                first_name="John",
+                last_name="Doe",
+                date_of_birth=datetime.strptime("1980-01-01", "%Y-%m-%d").date(),
+                gender="Male",
+                address="123 Main St",
+                phone="1234567890",
+                email="john.doe@example.com"
+            ),
+            Patient(
+                first_name="Jane",
+                last_name="Smith",
+                date_of_birth=datetime.strptime("1985-05-15", "%Y-%m-%d").date(),
+                gender="Female",
+                address="456 Oak Ave",
+                phone="0987654321",
+                email="jane.smith@example.com"
+            )
+        ]
+        db.session.add_all(patients)
+        logger.info("Created sample patients")
+
+    # Create sample doctors if none exist
+    if Doctor.query.count() == 0:
+        # Create sample doctors
+        doctors = [
+            Doctor(
+                first_name="Robert",
+                last_name="Johnson",
+                specialization="Cardiology",
+                phone="1112223333",
+                email="dr.johnson@example.com"
+            ),
+            Doctor(
+                first_name="Sarah",
+                last_name="Williams",
+                specialization="General Medicine",
+                phone="4445556666",
+                email="dr.williams@example.com"
+            )
+        ]
+        db.session.add_all(doctors)
+        logger.info("Created sample doctors")
+
+    # Create sample prescriptions if none exist
+    if Prescription.query.count() == 0:
+        # Get the first patient and doctor
+        patient = Patient.query.first()
+        doctor = Doctor.query.first()
+
+        if patient and doctor:
+            # Create a sample prescription with medications
+            prescription = Prescription(
+                patient_id=patient.id,
+                doctor_id=doctor.id,
+                diagnosis="Hypertension",
+                notes="Patient should monitor blood pressure regularly",
+                medications=[
+                    Medication(
+                        name="Lisinopril",
+                        dosage="10mg",
+                        frequency="Once daily",
+                        duration="30 days",
+                        instructions="Take in the morning with water"
+                    ),
+                    Medication(
+                        name="Aspirin",
+                        dosage="81mg",
+                        frequency="Once daily",
+                        duration="30 days",
+                        instructions="Take with food"
+                    )
+                ]
+            )
+            db.session.add(prescription)
+            logger.info("Created sample prescription with medications")
+
+    db.session.commit()
+
+
+def check_schema(app, engine):
+    """
+    Compare the applied migration version with migrations.head(). One query
+    per database and process: a version verified once (e.g. by the gunicorn
+    master with --preload) is not looked up again.
+    """
+    expected = migrations.head()
+    url = str(engine.url)
+    version = _verified.get(url)
+    if version is None or version < expected:
+        version = migrations.applied_version(engine)
+        # Leave no pooled connection behind for forked workers to share
+        engine.dispose()
+    current = version is not None and version >= expected
+    if current:
+        _verified[url] = version
+        if version > expected:
+            app.logger.warning(f"Database schema is at version {version}, newer than this code ({expected})")
+    else:
+        app.logger.error(f"Database schema is at version {version or 0}, expected {expected}; run `flask migrate`")
+    app.extensions['schema'] = {'version': version, 'expected': expected, 'current': current,
+                                'checked_at': time.monotonic()}
+    return current
+
+
+def init_schema(app, db):
+    """
+    Check the schema version once at boot instead of creating tables and
+    seeding in every worker, and register `flask migrate` and `flask seed`.
+    Until the schema is current, API requests get 503 and the check is
+    repeated every SCHEMA_RECHECK_SECONDS, so workers recover once the
+    migration has run.
+    """
+    with app.app_context():
+        engine = db.engine
+    check_schema(app, engine)
+    recheck = app.config.get('SCHEMA_RECHECK_SECONDS', 5)
+
+    @app.before_request
+    def require_current_schema():
+        state = app.extensions['schema']
+        if state['current'] or request.method == 'OPTIONS':
+            return None
+        if time.monotonic() - state['checked_at'] >= recheck:
+            check_schema(app, engine)
+            state = app.extensions['schema']
+            if state['current']:
+                return None
+        return jsonify({'error': f"Database schema is at version {state['version'] or 0}, "
+                                 f"expected {state['expected']}; run `flask migrate`"}), 503
+
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Create missing tables and apply pending migrations."""
+        applied = migrate_database(app)
+        print(f"Schema at version {migrations.head()}" + (f" (applied {applied})" if applied else ''))
+
+    @app.cli.command('seed')
+    def seed_command():
+        """Load the sample patients, doctors and prescription into an empty database."""
+        seed_sample_data(app.logger)
@@ -0,0 +1,302 @@
+import json
+from functools import lru_cache
+
+from flask import current_app, request
+from sqlalchemy import Date, DateTime, Numeric
+
+from extensions import db
+from models.appointment import Appointment
+from models.doctor import Doctor
+from models.patient import Patient
+from models.prescription import Prescription, Medication
+from utils.entity_cache import cached_entity
+from utils.money import json_default
+from utils.pagination import PaginationError, fetch_all
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; stdlib json is the fallback
+    orjson = None
+
+# Columns each model's to_dict() leaves out
+HIDDEN_COLUMNS = {
+    Patient: ('name_phonetic',),
+    Prescription: ('is_active',),
+    Medication: ('is_active',),
+}
+
+# Computed keys to_dict() adds: (key, SQL expression, joined model, join condition)
+EXTRA_COLUMNS = {
+    Appointment: lambda: (
+        ('patient_name', Patient.first_name + ' ' + Patient.last_name, Patient, Patient.id == Appointment.patient_id),
+        ('doctor_name', Doctor.first_name + ' ' + Doctor.last_name, Doctor, Doctor.id == Appointment.doctor_id),
+    ),
+}
+
+# One-to-many collections to_dict() nests: (key, child model, foreign key, which children)
+NESTED = {
+    Prescription: lambda: ('medications', Medication, Medication.prescription_id, Medication.is_active == True),
+}
+
+# Related objects ?include= can embed, with the foreign key column that points at them
+INCLUDES = {
+    'patient': (Patient, 'patient_id'),
+    'doctor': (Doctor, 'doctor_id'),
+}
+
+# Parent ids per child or related IN (...) query
+NESTED_BATCH = 500
+
+
+class FieldsError(PaginationError):
+    """Raised for unknown names in ?fields= or ?include=; answered with 400 like other bad list parameters."""
+
+
+def _native_temporal():
+    """orjson writes date/datetime exactly like isoformat(); stdlib json needs them converted."""
+    return current_app.config.get('JSON_BACKEND', 'orjson') == 'orjson' and orjson is not None
+
+
+def _converter(column_type, native_temporal):
+    if isinstance(column_type, Numeric) and column_type.asdecimal:
+        # Money goes out as a JSON number, as it does through MoneyJSONEncoder
+        return float
+    if isinstance(column_type, (Date, DateTime)) and not native_temporal:
+        return lambda value: value.isoformat()
+    return None
+
+
+def includes_of(model):
+    """The ?include= names that apply to `model`."""
+    return [name for name, (_, foreign_key) in INCLUDES.items() if foreign_key in model.__table__.c]
+
+
+class RowSerializer:
+    """
+    Turns column tuples of `model` straight into the dicts its to_dict() would
+    build, skipping ORM instance hydration. The column list, joins and
+    per-column converters are worked out once from __table__ and the
+    registries above.
+
+    With `fields`, only those keys (plus id) are emitted and only the columns
+    they need are selected; `required` columns (sort keys) are selected but
+    not emitted. `include` embeds related objects, projected by
+    `related_fields`.
+    """
+
+    def __init__(self, model, native_temporal, fields=None, include=(), related_fields=(), required=()):
+        hidden = HIDDEN_COLUMNS.get(model, ())
+        columns = [column for column in model.__table__.c if column.name not in hidden]
+        extras = EXTRA_COLUMNS.get(model, lambda: ())()
+        nested = NESTED.get(model, lambda: None)()
+
+        if fields is not None:
+            known = {column.name for column in columns} | {key for key, _, _, _ in extras}
+            if nested is not None:
+                known.add(nested[0])
+            unknown = sorted(fields - known)
+            if unknown:
+                raise FieldsError(f"Unknown field(s) for {model.__tablename__}: {', '.join(unknown)}")
+            selected = set(fields) | set(required) | {'id'} | {INCLUDES[name][1] for name in include}
+            columns = [column for column in columns if column.name in selected]
+            extras = [extra for extra in extras if extra[0] in fields]
+            if nested is not None and nested[0] not in fields:
+                nested = None
+            self.output = ['id'] + [key for key in sorted(fields) if key != 'id'] + list(include)
+        else:
+            self.output = None
+
+        self.model = model
+        self.native_temporal = native_temporal
+        self.columns = columns + [expression.label(key) for key, expression, _, _ in extras]
+        self.joins = [(target, condition) for _, _, target, condition in extras]
+        self.keys = [column.name for column in columns] + [key for key, _, _, _ in extras]
+        self.converters = []
+        for i, column in enumerate(columns):
+            convert = _converter(column.type, native_temporal)
+            if convert is not None:
+                self.converters.append((i, convert))
+        self.nested = nested
+        self.include = include
+        self.related_fields = dict(related_fields)
+
+    def query(self):
+        """A column query over the serialized columns, ready for filter_query/paginate."""
+        query = db.session.query(*self.columns).select_from(self.model)
+        for target, condition in self.joins:
+            query = query.outerjoin(target, condition)
+        return query
+
+    def dicts(self, rows, connection=None):
+        """Serialize `rows`; nested and included rows are read through `connection` when given."""
+        return self._mask(self._dicts(rows, connection))
+
+    def _dicts(self, rows, connection=None):
+        keys, converters = self.keys, self.converters
+        items = []
+        for row in rows:
+            if converters:
+                row = list(row)
+                for i, convert in converters:
+                    if row[i] is not None:
+                        row[i] = convert(row[i])
+            items.append(dict(zip(keys, row)))
+        if items:
+            if self.nested is not None:
+                self._attach_children(items, connection)
+            for name in self.include:
+                self._attach_related(items, name, connection)
+        return items
+
+    def _mask(self, items):
+        if self.output is None:
+            return items
+        output = self.output
+        return [{key: item[key] for key in output} for item in items]
+
+    def _batches(self, serializer, column, ids):
+        ids = list(ids)
+        for start in range(0, len(ids), NESTED_BATCH):
+            yield serializer.query().filter(column.in_(ids[start:start + NESTED_BATCH]))
+
+    def _attach_children(self, items, connection):
+        key, child, foreign_key, condition = self.nested
+        child_rows = serializer_for(child, self.native_temporal, fields=self.related_fields.get(key),
+                                    required=(foreign_key.key,))
+        children = {}
+        for query in self._batches(child_rows, foreign_key, [item['id'] for item in items]):
+            rows = fetch_all(query.filter(condition).order_by(child.id), connection)
+            for child_item in child_rows._dicts(rows):
+                children.setdefault(child_item[foreign_key.key], []).append(child_item)
+        for item in items:
+            item[key] = child_rows._mask(children.get(item['id'], []))
+
+    def _attach_related(self, items, name, connection):
+        related, foreign_key = INCLUDES[name]
+        related_rows = serializer_for(related, self.native_temporal, fields=self.related_fields.get(name))
+        ids = {item[foreign_key] for item in items if item[foreign_key] is not None}
+        found = {}
+        for query in self._batches(related_rows, related.id, sorted(ids)):
+            for related_item in related_rows._dicts(fetch_all(query, connection)):
+                found[related_item['id']] = related_item
+        masked = dict(zip(found, related_rows._mask(list(found.values()))))
+        for item in items:
+            item[name] = masked.get(item[foreign_key])
+
+
+@lru_cache(maxsize=256)
+def _compiled(model, native_temporal, fields, include, related_fields, required):
+    return RowSerializer(model, native_temporal, fields, include, related_fields, required)
+
+
+def serializer_for(model, native_temporal=None, fields=None, include=(), related_fields=(), required=()):
+    """
+    The compiled RowSerializer of `model` for the configured JSON backend.
+    `required` names (or columns, e.g. the sort key) are always selected.
+    Projections are compiled once per distinct field set and reused.
+    """
+    if native_temporal is None:
+        native_temporal = _native_temporal()
+    fields = frozenset(fields) if fields is not None else None
+    related_fields = tuple(sorted((name, frozenset(names)) for name, names in dict(related_fields).items()))
+    required = tuple(getattr(column, 'key', column) for column in required)
+    return _compiled(model, native_temporal, fields, tuple(include), related_fields, required)
+
+
+def requested_projection(model):
+    """
+    Parse ?fields=id,first_name,patient.last_name and ?include=patient,doctor
+    for `model` into serializer_for() keyword arguments. A dotted field
+    projects an embedded object and implies its include.
+    """
+    args = request.args
+    nested = NESTED.get(model, lambda: None)()
+    allowed = includes_of(model)
+    include = {name.strip() for name in args.get('include', '').split(',') if name.strip()}
+    unknown = sorted(include - set(allowed))
+    if unknown:
+        raise FieldsError(f"Cannot include {', '.join(unknown)} on {model.__tablename__}"
+                          + (f"; use {', '.join(allowed)}" if allowed else ''))
+
+    fields, related = None, {}
+    if args.get('fields'):
+        fields = set()
+        for name in args['fields'].split(','):
+            head, _, tail = name.strip().partition('.')
+            if not tail:
+                if head:
+                    fields.add(head)
+            elif nested is not None and head == nested[0]:
+                fields.add(head)
+                related.setdefault(head, set()).add(tail)
+            elif head in allowed:
+                include.add(head)
+                related.setdefault(head, set()).add(tail)
+            else:
+                raise FieldsError(f"Unknown field: {name.strip()}")
+    return {'fields': fields, 'include': tuple(sorted(include)), 'related_fields': related}
+
+
+def _project_dict(data, fields):
+    if fields is None or data is None:
+        return data
+    unknown = sorted(set(fields) - set(data))
+    if unknown:
+        raise FieldsError(f"Unknown field(s): {', '.join(unknown)}")
+    return {key: data[key] for key in ['id'] + sorted(fields - {'id'})}
+
+
+def _related_dict(model, id, connection=None):
+    if id is None:
+        return None
+    if connection is not None:
+        # Cached next to to_dict() payloads, so dates stay ISO strings
+        serializer = serializer_for(model, native_temporal=False)
+        items = serializer.dicts(fetch_all(serializer.query().filter(model.id == id), connection), connection)
+        return items[0] if items else None
+    obj = model.query.get(id)
+    return obj.to_dict() if obj is not None else None
+
+
+def project(data, model, connection=None):
+    """
+    Apply ?fields= and ?include= to a single to_dict() payload. Detail
+    endpoints are mostly served from the entity cache, so this trims the
+    cached dict (never mutating it) and embeds related objects from the cache.
+    """
+    if 'fields' not in request.args and 'include' not in request.args:
+        return data
+    projection = requested_projection(model)
+    related_fields = projection['related_fields']
+    nested = NESTED.get(model, lambda: None)()
+
+    result = dict(data)
+    if nested is not None and nested[0] in related_fields:
+        result[nested[0]] = [_project_dict(child, related_fields[nested[0]]) for child in data[nested[0]]]
+    for name in projection['include']:
+        related, foreign_key = INCLUDES[name]
+        related_id = data.get(foreign_key)
+        embedded = cached_entity(related, related_id, lambda: _related_dict(related, related_id, connection),
+                                 connection)
+        result[name] = _project_dict(embedded, related_fields.get(name))
+
+    fields = projection['fields']
+    if fields is None:
+        return result
+    unknown = sorted(set(fields) - set(data))
+    if unknown:
+        raise FieldsError(f"Unknown field(s) for {model.__tablename__}: {', '.join(unknown)}")
+    return {key: result[key] for key in ['id'] + sorted(fields - {'id'}) + list(projection['include'])}
+
+
+def dumps(payload):
+    """Serialize with orjson when available (JSON_BACKEND='orjson', the default), else stdlib json."""
+    sort_keys = current_app.config.get('JSON_SORT_KEYS', True)
+    if _native_temporal():
+        return orjson.dumps(payload, default=json_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(payload, separators=(',', ':'), sort_keys=sort_keys, default=json_default)
+
+
+def json_response(payload, status=200):
+    """Drop-in for jsonify() on hot list endpoints."""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
@@ -1,4 +1,5 @@
 from datetime import datetime
+from functools import lru_cache
 import re
 from typing import Dict, Any, Tuple
 
@@ -28,8 +29,9 @@ def validate_phone(phone: str) -> Tuple[bool, str]:
         return False, "Invalid phone number format"
     return True, ""
 
+@lru_cache(maxsize=65536)
 def validate_date(date_str: str) -> Tuple[bool, str]:
-    """Validate date format (YYYY-MM-DD)."""
+    """Validate date format (YYYY-MM-DD). Cached, as bulk imports repeat the same dates heavily."""
     try:
         datetime.strptime(date_str, '%Y-%m-%d')
         return True, ""
@@ -9,4 +9,23 @@ const api = axios.create({
   withCredentials: true // Only set to true if your backend uses cookies for auth; set to false if using JWT in headers
 });
 
+// Read-your-writes with read replicas: after a write the backend returns the time
+// until which our reads must stay on the primary; send it back on every request
+let primaryUntil: string | null = null;
+
+api.interceptors.response.use((response) => {
+  const until = response.headers['x-primary-until'];
+  if (until) {
+    primaryUntil = until;
+  }
+  return response;
+});
+
+api.interceptors.request.use((config) => {
+  if (primaryUntil && Number(primaryUntil) * 1000 > Date.now()) {
+    config.headers['X-Primary-Until'] = primaryUntil;
+  }
+  return config;
+});
+
 export default api;
\ No newline at end of file